@@ -8,7 +8,7 @@
 # Make Predictions: Use the trained model to make predictions on new data.
 # Here is an example of how you can do this using Python and the scikit-learn library:
 
-import osbp as sb
+import osbp_optimized as sb
 import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
@@ -16,13 +16,18 @@ from sklearn.preprocessing import LabelEncoder, StandardScaler
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import accuracy_score, classification_report
 
-# Load the data
-df = pd.read_csv(sb.common_folders['cleansed_data_source_file'])
-
 # Select relevant columns based on the contract profile data elements dictionary
 columns = list(sb.contract_profile_data_elements.values())
 columns.append('Size Status')  # Add the target variable
-df = df[columns]
+
+# Load only the selected columns from the typed interim dataset.  Dates are datetimes, dollars are numeric, and text columns are categories.
+df = sb.read_interim_dataset(sb.common_folders['cleansed_data_source_file'], columns=columns)
+
+# Convert dates to ordinal days and text categories to plain text so they are handled below like the CSV columns were
+for col in df.select_dtypes(include=['datetime']).columns:
+    df[col] = df[col].map(pd.Timestamp.toordinal, na_action='ignore').astype('float64')
+for col in df.select_dtypes(include=['category', 'string']).columns:
+    df[col] = df[col].astype(object)
 
 # Handle missing values (e.g., fill with mean for numerical columns, mode for categorical columns)
 for col in df.columns:
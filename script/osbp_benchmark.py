@@ -0,0 +1,673 @@
+# Benchmark the OSBP contract profile pipeline on synthetic VCE SB Dashboard data.  The data has the real VCE column names and realistic NAICS and PSC distributions, and can be generated at any size from 10k to 5M rows.
+# Every pipeline stage, every check_* function (and its batch version), and the contract profile rendering is timed and memory-profiled.  The results are saved as a JSON file so runs on different commits can be compared with --compare.
+
+# Example usage (from the script folder):
+#   python osbp_benchmark.py --rows 10000 100000
+#   python osbp_benchmark.py --rows 10000 100000 1000000 5000000 --skip-convert
+#   python osbp_benchmark.py --rows 10000 --compare ..\reports\benchmarks\benchmark_20240101_120000_abc1234.json
+
+import argparse
+import contextlib
+import datetime
+import inspect
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import numpy as np
+import pandas as pd
+import openpyxl
+import osbp_optimized as sb
+
+# The repository folder.  The reference lists and the contract profile template are read from it.
+repository_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The Windows folder the common_folders paths start with.  The benchmark points the data folders at a work folder and everything else at the repository.
+common_folders_root = r'C:\GitHub\contract_profiles'
+
+# Excel worksheets have at most 1,048,576 rows including the header row, so the conversion stage is skipped above this size.
+excel_max_rows = 1048575
+
+# The most common NAICS of Army contract actions and their share of the actions.  The rest of the actions are spread over the size standards list with a Zipf distribution.
+common_naics_weights = {
+    541330: 0.10, 541512: 0.07, 541611: 0.05, 541715: 0.05, 336411: 0.04, 236220: 0.04, 561210: 0.03, 334511: 0.03,
+    332994: 0.02, 336992: 0.02, 541519: 0.02, 611430: 0.02, 811219: 0.02, 238210: 0.01, 332993: 0.01, 336413: 0.01,
+}
+
+# Common PSC of Army contract actions with their description, OMB levels, and share of the actions
+common_psc = [
+    ('R425', 'SUPPORT- PROFESSIONAL: ENGINEERING/TECHNICAL', 'Professional Services', 'Engineering & Technical Services', 0.12),
+    ('R408', 'SUPPORT- PROFESSIONAL: PROGRAM MANAGEMENT/SUPPORT', 'Professional Services', 'Program Management Services', 0.08),
+    ('R499', 'SUPPORT- PROFESSIONAL: OTHER', 'Professional Services', 'Other Professional Services', 0.06),
+    ('AC13', 'NATIONAL DEFENSE R&D SERVICES; DEFENSE-RELATED ACTIVITIES; EXPERIMENTAL DEVELOPMENT', 'Research and Development', 'Defense R&D', 0.06),
+    ('DA01', 'IT AND TELECOM - BUSINESS APPLICATION/APPLICATION DEVELOPMENT SUPPORT SERVICES', 'Information Technology', 'IT Software', 0.05),
+    ('D399', 'IT AND TELECOM- OTHER IT AND TELECOMMUNICATIONS', 'Information Technology', 'IT Services', 0.05),
+    ('7A21', 'IT AND TELECOM - BUSINESS APPLICATION SOFTWARE (PERPETUAL LICENSE SOFTWARE)', 'Information Technology', 'IT Software', 0.04),
+    ('7B22', 'IT AND TELECOM - COMPUTE: DESKTOP/LAPTOP/END USER COMPUTE', 'Information Technology', 'IT Hardware', 0.03),
+    ('J015', 'MAINT/REPAIR/REBUILD OF EQUIPMENT- AIRCRAFT AND AIRFRAME STRUCTURAL COMPONENTS', 'Industrial Products and Services', 'Maintenance, Repair and Overhaul', 0.05),
+    ('J023', 'MAINT/REPAIR/REBUILD OF EQUIPMENT- GROUND EFFECT VEHICLES, MOTOR VEHICLES, TRAILERS, AND CYCLES', 'Industrial Products and Services', 'Maintenance, Repair and Overhaul', 0.05),
+    ('1510', 'AIRCRAFT, FIXED WING', 'Industrial Products and Services', 'Aircraft', 0.03),
+    ('2320', 'TRUCKS AND TRUCK TRACTORS, WHEELED', 'Industrial Products and Services', 'Vehicles', 0.04),
+    ('1305', 'AMMUNITION, THROUGH 30MM', 'Industrial Products and Services', 'Ammunition', 0.04),
+    ('1315', 'AMMUNITION, 75MM THROUGH 125MM', 'Industrial Products and Services', 'Ammunition', 0.03),
+    ('5998', 'ELECTRICAL AND ELECTRONIC ASSEMBLIES, BOARDS, CARDS, AND ASSOCIATED HARDWARE', 'Industrial Products and Services', 'Electrical', 0.03),
+    ('Y1JZ', 'CONSTRUCTION OF MISCELLANEOUS BUILDINGS', 'Facilities and Construction', 'Construction', 0.04),
+    ('Z2AA', 'REPAIR OR ALTERATION OF OFFICE BUILDINGS', 'Facilities and Construction', 'Facilities Maintenance', 0.04),
+    ('S206', 'HOUSEKEEPING- GUARD', 'Facilities and Construction', 'Facility Related Services', 0.03),
+    ('U008', 'EDUCATION/TRAINING- TRAINING/CURRICULUM DEVELOPMENT', 'Professional Services', 'Training', 0.03),
+    ('V111', 'TRANSPORTATION/TRAVEL/RELOCATION- TRANSPORTATION: AIR FREIGHT', 'Transportation and Logistics', 'Transportation', 0.03),
+    ('6515', 'MEDICAL AND SURGICAL INSTRUMENTS, EQUIPMENT, AND SUPPLIES', 'Medical', 'Medical Equipment', 0.02),
+    ('8415', 'CLOTHING, SPECIAL PURPOSE', 'Industrial Products and Services', 'Clothing', 0.02),
+    ('6665', 'HAZARD-DETECTING INSTRUMENTS AND APPARATUS', 'Industrial Products and Services', 'Instruments', 0.02),
+    ('B546', 'SPECIAL STUDIES/ANALYSIS- ENVIRONMENTAL ASSESSMENTS', 'Professional Services', 'Studies and Analysis', 0.02),
+    ('H335', 'OTHER QC/TEST/INSPECT- ENGINES, TURBINES, AND COMPONENTS', 'Industrial Products and Services', 'Quality Control', 0.02),
+]
+
+# The offices of the Army contracting organizations and their share of the actions
+contracting_offices = [
+    ('ACC-RI', 'ACC-RI: ROCK ISLAND', 'W52P1J', 0.30),
+    ('ACC-RI', 'ACC-RI: JMTC', 'W519TC', 0.10),
+    ('ACC-RSA', 'ACC-RSA: REDSTONE', 'W58RGZ', 0.20),
+    ('ACC-WRN', 'ACC-WRN: WARREN', 'W56HZV', 0.15),
+    ('ACC-APG', 'ACC-APG: ABERDEEN', 'W91CRB', 0.15),
+    ('ACC-NJ', 'ACC-NJ: PICATINNY', 'W15QKN', 0.10),
+]
+
+# The set aside values as they appear in the raw pull and their share of the actions.  Blank values become "NO SET ASIDE USED" when cleaned.
+set_aside_weights = {
+    'NO SET ASIDE USED.': 0.55, '': 0.05, 'SMALL BUSINESS SET ASIDE - TOTAL': 0.18, '8A COMPETED': 0.04, '8(A) SOLE SOURCE': 0.05,
+    'SERVICE DISABLED VETERAN OWNED SMALL BUSINESS SET-ASIDE': 0.05, 'HUBZONE SET-ASIDE': 0.03, 'WOMEN OWNED SMALL BUSINESS': 0.03, 'ECONOMICALLY DISADVANTAGED WOMEN OWNED SMALL BUSINESS': 0.02,
+}
+
+# The contract action types and their share of the actions.  Modifications are most of the actions in the real pull.
+contract_action_type_weights = {
+    'MODIFICATION': 0.55, 'DELIVERY ORDER': 0.15, 'DEFINITIVE CONTRACT': 0.10, 'PURCHASE ORDER': 0.08, 'BPA CALL': 0.04, 'MATOC': 0.05, 'SATOC': 0.03,
+}
+
+# The descriptions of requirement.  Some contain the IT Buy keywords so the IT classification has work to do.
+requirement_descriptions = [
+    'ENGINEERING SUPPORT SERVICES', 'PROGRAM MANAGEMENT SUPPORT', 'SPARE PARTS', 'VEHICLE MAINTENANCE', 'AMMUNITION PRODUCTION',
+    'SOFTWARE LICENSE RENEWAL', 'NETWORK INFRASTRUCTURE UPGRADE', 'CYBERSECURITY ASSESSMENT', 'HELP DESK SUPPORT', 'FACILITY REPAIR',
+    'TRAINING DEVELOPMENT', 'LABORATORY TESTING', 'CLOUD HOSTING SERVICES', 'LAPTOP REFRESH', 'ENVIRONMENTAL STUDY',
+]
+
+# This function draws a categorical column with the given values and weights.  Categoricals keep a 5M row DataFrame small.
+def weighted_choice(rng: np.random.Generator, values: list, weights: list, size: int) -> pd.Categorical:
+    """
+    Draw values with the given weights.
+
+    Args:
+    rng (np.random.Generator): The random number generator.
+    values (list): The distinct values to draw from.
+    weights (list): The weight of each value.  They do not have to add up to 1.
+    size (int): The number of values to draw.
+
+    Returns:
+    pd.Categorical: The drawn values.
+    """
+    weights = np.asarray(weights, dtype=float)
+    codes = rng.choice(len(values), size=size, p=weights / weights.sum())
+    return pd.Categorical.from_codes(codes, categories=pd.Index(values, dtype=object), validate=False)
+
+# This function reads the NAICS codes and descriptions from the size standards list and weights them.  The common Army NAICS get their share and the rest follow a Zipf distribution.
+def naics_distribution() -> pd.DataFrame:
+    """
+    Get the NAICS codes, descriptions, and weights used by the generator.
+
+    Returns:
+    pd.DataFrame: The 'NAICS', 'NAICS Description', and 'Weight' columns.
+    """
+    size_standards_df = pd.read_csv(os.path.join(repository_folder, 'references', 'size_standards', 'size_standards_list.csv'), encoding='utf-8-sig')
+    naics_df = pd.DataFrame({'NAICS': pd.to_numeric(size_standards_df['NAICS Codes'], errors='coerce'), 'NAICS Description': size_standards_df['NAICS Industry Description'].astype(str).str.upper()})
+    naics_df = naics_df.dropna(subset=['NAICS']).drop_duplicates('NAICS')
+    naics_df['NAICS'] = naics_df['NAICS'].astype(int)
+
+    # Spread the actions that are not in a common NAICS over the rest of the list
+    rest_share = 1 - sum(common_naics_weights.values())
+    is_common = naics_df['NAICS'].isin(common_naics_weights.keys())
+    zipf_weights = 1 / np.arange(1, (~is_common).sum() + 1)
+    naics_df['Weight'] = 0.0
+    naics_df.loc[is_common, 'Weight'] = naics_df.loc[is_common, 'NAICS'].map(common_naics_weights)
+    naics_df.loc[~is_common, 'Weight'] = rest_share * zipf_weights / zipf_weights.sum()
+
+    return naics_df.reset_index(drop=True)
+
+# This function reads the contract numbers in the PCF hyperlinks listing and the forecast listings.  Some of the synthetic contracts use them so the PCF Cabinet and forecast checks find matches.
+def reference_contract_numbers() -> list:
+    """
+    Get the contract numbers from the hyperlinks and forecast listings.
+
+    Returns:
+    list: The contract numbers.
+    """
+    contract_numbers = []
+    hyperlinks_file = os.path.join(repository_folder, 'references', 'hyperlinks', 'hyperlinks_listing.csv')
+    if os.path.exists(hyperlinks_file):
+        contract_numbers += pd.read_csv(hyperlinks_file, dtype=str, encoding='utf-8-sig', usecols=['Contract'])['Contract'].dropna().tolist()
+    forecast_file = os.path.join(repository_folder, 'references', 'forecast_listing', 'osbp_dashboard_forecast.csv')
+    if os.path.exists(forecast_file):
+        contract_numbers += pd.read_csv(forecast_file, dtype=str, encoding='utf-8-sig', usecols=['FOLLOWON CONTRACT'])['FOLLOWON CONTRACT'].dropna().tolist()
+
+    return sorted({sb.normalize_piid(contract_no) for contract_no in contract_numbers} - {''})
+
+# This function generates synthetic VCE SB Dashboard data with the raw column names of the VCE schema.  The same seed and size always give the same data.
+def generate_vce_data(rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Generate a synthetic VCE SB Dashboard pull.
+
+    Args:
+    rows (int): The number of contract actions to generate.
+    seed (int): The random seed.
+
+    Returns:
+    pd.DataFrame: The raw pull with every column of sb.vce_schema.  Text columns are categoricals and dates are datetimes.
+    """
+    rng = np.random.default_rng(seed)
+    today = pd.Timestamp.today().normalize()
+    df = pd.DataFrame(index=pd.RangeIndex(rows))
+
+    # Contracts have several actions each (the base award and its orders and modifications).  About 5% of the contracts are in the PCF hyperlinks and forecast listings.
+    contract_count = max(rows // 6, 1)
+    office = rng.choice(len(contracting_offices), size=contract_count, p=[office[3] for office in contracting_offices])
+    contract_numbers = pd.Series([contracting_offices[o][2] for o in office]) + pd.Series(rng.integers(18, 26, contract_count)).astype(str) + pd.Series(rng.choice(list('CDFP'), contract_count)) + pd.Series(rng.integers(0, 10000, contract_count)).map('{:04d}'.format)
+    reference_contracts = reference_contract_numbers()
+    if reference_contracts:
+        use_reference = rng.random(contract_count) < 0.05
+        contract_numbers[use_reference] = rng.choice(reference_contracts, use_reference.sum())
+    contract = rng.zipf(1.3, rows) % contract_count
+    df['Contract No'] = pd.Categorical(contract_numbers.to_numpy()[contract])
+
+    # Actions and orders
+    df['Contract Action Type'] = weighted_choice(rng, list(contract_action_type_weights), list(contract_action_type_weights.values()), rows)
+    is_modification = np.asarray(df['Contract Action Type'] == 'MODIFICATION')
+    has_order = rng.random(rows) < 0.4
+    df['Order No'] = np.where(has_order, pd.Series(contract_numbers.to_numpy()[contract]).str[:6].to_numpy() + '25F' + pd.Series(rng.integers(0, 10000, rows)).map('{:04d}'.format).to_numpy(), '0')
+    df['Modification No'] = np.where(is_modification, 'P' + pd.Series(rng.integers(1, 60, rows)).map('{:05d}'.format).to_numpy(), '0')
+
+    # Dates.  Most contracts expire in the next three years so the insights have targets.
+    award_date = pd.Timestamp('2018-10-01') + pd.to_timedelta(rng.integers(0, (today - pd.Timestamp('2018-10-01')).days, rows), unit='D')
+    df['Award Date'] = award_date
+    df['Effective Date'] = award_date
+    df['Fiscal Year'] = award_date.year + (award_date.month >= 10)
+    expiration = pd.Series(today + pd.to_timedelta(rng.integers(-365, 3 * 365, rows), unit='D'))
+    expiration[rng.random(rows) < 0.02] = pd.NaT
+    df['Current Completion Date'] = expiration.to_numpy()
+    df['Contract Expiration Flag'] = np.where(expiration < today, 'EXPIRED', 'ACTIVE')
+
+    # The contracting organization follows the office of the contract
+    office = office[contract]
+    df['Command'] = pd.Categorical(np.full(rows, 'AMC'))
+    df['Sub Command'] = pd.Categorical(np.full(rows, 'ACC'))
+    df['Organization'] = pd.Categorical(np.asarray([office[0] for office in contracting_offices], dtype=object)[office])
+    df['Office'] = pd.Categorical(np.asarray([office[1] for office in contracting_offices], dtype=object)[office])
+    df['Office Id'] = pd.Categorical(np.asarray([office[2] for office in contracting_offices], dtype=object)[office])
+    df['Funding Office Id'] = df['Office Id']
+    df['Funding Office Name'] = df['Office']
+    df['Army Hierarchy'] = pd.Categorical(np.asarray(['AMC > ACC > ' + office[0] for office in contracting_offices], dtype=object)[office])
+    df['PEO/Command'] = weighted_choice(rng, ['AMC: TACOM', 'AMC: AMCOM', 'AMC: JMC', 'PEO GCS', 'PEO EIS', 'ASA(ALT)'], [3, 2, 2, 1, 1, 1], rows)
+    df['PM/Directorate'] = weighted_choice(rng, ['TACOM: JMTC-RI', 'AMCOM: AVIATION', 'JMC: AMMO', 'PM ABCT', 'PM DCOE', 'PM OTHER'], [3, 2, 2, 1, 1, 1], rows)
+    df['VCE-PCF Project/Program Title'] = weighted_choice(rng, [f'PROGRAM {number}' for number in range(50)], 1 / np.arange(1, 51), rows)
+    df['Awarding PCO (CWS)'] = weighted_choice(rng, [f'PCO, NAME {number}' for number in range(200)], np.ones(200), rows)
+
+    # Awardees follow a Zipf distribution.  About a third of them are small businesses.
+    vendor_count = max(rows // 20, 10)
+    vendor_names = pd.Series(np.arange(vendor_count)).map('VENDOR {:06d} LLC'.format)
+    vendor_ueis = pd.Series(np.arange(vendor_count)).map('UEI{:09d}'.format)
+    vendor = rng.zipf(1.5, rows) % vendor_count
+    df['13GG Legal Business Name (UEI)'] = pd.Categorical((vendor_names + ' (' + vendor_ueis + ')').to_numpy()[vendor])
+    df['Entity Unique Id'] = pd.Categorical(vendor_ueis.to_numpy()[vendor])
+    vendor_is_sb = rng.random(vendor_count) < 0.35
+    is_sb = vendor_is_sb[vendor]
+
+    # Dollars.  Modifications are smaller and can be negative.
+    dollars = np.round(rng.lognormal(11, 2, rows), 2)
+    dollars[is_modification] = np.round(dollars[is_modification] * rng.uniform(-0.2, 0.3, is_modification.sum()), 2)
+    df['Small Business Eligible Actions'] = 1
+    df['Small Business Eligible Dollars'] = dollars
+    df['Small Business Actions'] = is_sb.astype(int)
+    df['Small Business Dollars'] = np.where(is_sb, dollars, 0.0)
+    df['Small Business  %'] = np.where(is_sb, '100.00%', '0.00%')
+
+    # Socio-economic categories of the small businesses
+    for actions_column, dollars_column, percent_column, share in [
+        ('SDB Concern Actions', 'SDB Concern Dollars', 'SDB Concern %', 0.30),
+        ('Service Disabled Veterans Actions', 'Service Disabled Veterans Dollars', 'SVC Disabled Veteran %', 0.15),
+        ('Women Owned Actions', 'Women Owned Dollars', 'Women Owned %', 0.20),
+        ('HUB Zone Actions', 'HUB Zone Dollars', 'HUB Zone %', 0.08),
+    ]:
+        in_category = is_sb & (rng.random(vendor_count) < share)[vendor]
+        df[actions_column] = in_category.astype(int)
+        df[dollars_column] = np.where(in_category, dollars, 0.0)
+        df[percent_column] = np.where(in_category, '100.00%', '0.00%')
+
+    # Products and services
+    naics_df = naics_distribution()
+    naics = rng.choice(len(naics_df), size=rows, p=naics_df['Weight'] / naics_df['Weight'].sum())
+    df['NAICS'] = naics_df['NAICS'].to_numpy()[naics]
+    df['NAICS Description'] = pd.Categorical(naics_df['NAICS Description'].to_numpy()[naics])
+    psc = rng.choice(len(common_psc), size=rows, p=np.array([row[4] for row in common_psc]) / sum(row[4] for row in common_psc))
+    for position, column in enumerate(['PSC', 'PSC Description', 'OMB Level 1', 'OMB Level 2']):
+        df[column] = pd.Categorical(np.asarray([row[position] for row in common_psc], dtype=object)[psc])
+    df['6M Description of Requirement'] = weighted_choice(rng, requirement_descriptions, np.ones(len(requirement_descriptions)), rows)
+
+    # Competition and the remaining descriptions
+    df['10N Type Set Aside Description'] = weighted_choice(rng, list(set_aside_weights), list(set_aside_weights.values()), rows)
+    df['12C Reason for Modification Description'] = np.where(is_modification, 'FUNDING ONLY ACTION', '')
+    df['Instrument Type'] = weighted_choice(rng, ['CONTRACT', 'ORDER', 'BPA CALL', 'PURCHASE ORDER'], [3, 4, 1, 2], rows)
+    df['Congressional District - Vendor'] = weighted_choice(rng, [f'{state}{district:02d}' for state in ['IL', 'IA', 'AL', 'MI', 'MD', 'NJ', 'VA', 'TX'] for district in range(1, 8)], np.ones(56), rows)
+    df['Congressional District - POP'] = df['Congressional District - Vendor']
+    df['Subcontracting Plan Description'] = weighted_choice(rng, ['PLAN NOT REQUIRED', 'INDIVIDUAL SUBCONTRACT PLAN', 'COMMERCIAL SUBCONTRACT PLAN'], [6, 3, 1], rows)
+    df['National Interest Description'] = weighted_choice(rng, ['NONE'], [1], rows)
+    df['SBIR/STTR Type'] = weighted_choice(rng, ['', 'SBIR PROGRAM PHASE I ACTION', 'SBIR PROGRAM PHASE II ACTION'], [95, 3, 2], rows)
+    df['Bundling'] = weighted_choice(rng, ['NOT BUNDLED', 'BUNDLED'], [98, 2], rows)
+
+    # Keep the columns in the VCE schema order
+    return df[[column for column in sb.vce_schema if column in df.columns]]
+
+# This function writes the synthetic pull as an Excel workbook, the way it is downloaded from the VCE SB Dashboard.
+def write_vce_workbook(df: pd.DataFrame, excel_file: str) -> None:
+    """
+    Write the synthetic pull to an .xlsx workbook.
+
+    Args:
+    df (pd.DataFrame): The synthetic pull from generate_vce_data.
+    excel_file (str): The path to the workbook.
+
+    Returns:
+    None
+    """
+    workbook = openpyxl.Workbook(write_only=True)
+    worksheet = workbook.create_sheet('VCE SB Dashboard')
+    worksheet.append(list(df.columns))
+
+    # Dates are written as Excel dates and blanks as empty cells
+    date_columns = set(df.select_dtypes(include=['datetime']).columns)
+    for row in df.itertuples(index=False, name=None):
+        worksheet.append([None if pd.isna(value) or value == '' else value.to_pydatetime() if column in date_columns else value.item() if hasattr(value, 'item') else value for column, value in zip(df.columns, row)])
+
+    workbook.save(excel_file)
+
+# This function writes the synthetic pull as the CSV file convert_raw_data_from_excel_to_csv would write.  It is used when the conversion stage is skipped.
+def write_vce_csv(df: pd.DataFrame, csv_file: str) -> None:
+    """
+    Write the synthetic pull to a converted .csv file.
+
+    Args:
+    df (pd.DataFrame): The synthetic pull from generate_vce_data.
+    csv_file (str): The path to the CSV file.
+
+    Returns:
+    None
+    """
+    df.to_csv(csv_file, index=False, date_format='%Y-%m-%d')
+
+# This helper function reads the current memory of the process.  psutil is used when it is installed and /proc is read on Linux otherwise.
+def current_memory_mb() -> float:
+    """
+    Get the current resident memory of the process.
+
+    Returns:
+    float: The resident memory in MB, or None if it cannot be read.
+    """
+    if sb.psutil is not None:
+        return sb.psutil.Process().memory_info().rss / 2**20
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+# This class measures the wall time and the peak memory of a block of code.  The memory is sampled on a background thread so it is the peak during the block, not the peak of the whole process.
+class StageTimer:
+    """
+    Context manager that times a block and samples its peak memory.
+
+    Args:
+    interval (float): The seconds between memory samples.
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.seconds = None
+        self.start_memory_mb = None
+        self.peak_memory_mb = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            memory = current_memory_mb()
+            if memory is not None:
+                self.peak_memory_mb = max(self.peak_memory_mb or 0, memory)
+
+    def __enter__(self):
+        self.start_memory_mb = current_memory_mb()
+        self.peak_memory_mb = self.start_memory_mb
+        if self.start_memory_mb is not None:
+            self._thread = threading.Thread(target=self._sample, daemon=True)
+            self._thread.start()
+        self._start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.seconds = time.perf_counter() - self._start_time
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            memory = current_memory_mb()
+            self.peak_memory_mb = max(self.peak_memory_mb or 0, memory or 0)
+        return False
+
+    def result(self) -> dict:
+        """
+        Get the measurements of the block.
+
+        Returns:
+        dict: The 'seconds', 'peak_memory_mb', and 'memory_growth_mb' of the block.  The memory values are None if the memory cannot be read.
+        """
+        return {
+            'seconds': round(self.seconds, 4),
+            'peak_memory_mb': round(self.peak_memory_mb, 1) if self.peak_memory_mb is not None else None,
+            'memory_growth_mb': round(self.peak_memory_mb - self.start_memory_mb, 1) if self.peak_memory_mb is not None else None,
+        }
+
+# This function points common_folders at a work folder for the data and at the repository for the reference lists and template.  The load-once indexes are recreated so they read the new locations.
+def configure_work_folder(work_folder: str) -> None:
+    """
+    Point the pipeline at a benchmark work folder.
+
+    Args:
+    work_folder (str): The folder the benchmark data, interim files, and completed profiles are written to.
+
+    Returns:
+    None
+    """
+    for key, path in sb.common_folders.items():
+        if not path.startswith(common_folders_root):
+            continue
+        relative_path = path[len(common_folders_root) + 1:].replace('\\', os.sep)
+        if relative_path.startswith('data') or 'completed_profiles' in relative_path:
+            sb.common_folders[key] = os.path.join(work_folder, relative_path)
+        else:
+            sb.common_folders[key] = os.path.join(repository_folder, relative_path)
+
+    for key in ['raw_data_folder', 'interim_data_source_folder', 'insights_target1_folder', 'completed_profiles_folder']:
+        os.makedirs(sb.common_folders[key], exist_ok=True)
+    os.makedirs(os.path.dirname(sb.common_folders['profile_analysis_file']), exist_ok=True)
+
+    # Recreate the load-once indexes and clear the caches so nothing from a previous size is reused
+    sb.naics_reference = sb.NaicsReference(sb.common_folders['size_standard_list'], sb.common_folders['wosb_naics_list'], sb.common_folders['nmr_waiver_list'])
+    sb.naics_statistics = sb.NaicsStatistics(sb.common_folders['naics_statistics_file'], sb.common_folders['cleansed_data_source_file'])
+    sb.modification_index = sb.ModificationIndex(sb.common_folders['cleansed_data_source_file'])
+    sb.awardee_index = sb.AwardeeIndex(sb.common_folders['awardee_index_file'], sb.common_folders['awardee_aliases_file'])
+    sb.hyperlink_index = sb.HyperlinkIndex(sb.common_folders['hyperlinks_file'])
+    sb.forecast_index = sb.ForecastIndex(sb.forecast_sources)
+    sb.analytics_database = sb.AnalyticsDatabase(sb.common_folders['analytics_database_file'])
+    sb.profile_cache = sb.ProfileCache(sb.common_folders['profile_cache_file'])
+    sb.run_recorder = sb.RunRecorder(sb.common_folders['run_log_file'])
+    sb.sb_award_counts_cache.clear()
+    sb.financial_risk_thresholds_cache.clear()
+
+# This function finds every check_* function of the pipeline that takes a contract record.
+def find_check_functions() -> dict:
+    """
+    Get the check_* functions of osbp_optimized.
+
+    Returns:
+    dict: The check functions keyed by their name.
+    """
+    return {name: function for name, function in inspect.getmembers(sb, inspect.isfunction) if name.startswith('check_') and list(inspect.signature(function).parameters)[:1] == ['record']}
+
+# This function times every check_* function on a sample of the target contracts and every batch function on all of them.
+def benchmark_checks(targets_df: pd.DataFrame, sample_size: int) -> list:
+    """
+    Time the SB Profile Analysis checks.
+
+    Args:
+    targets_df (pd.DataFrame): The target contracts.
+    sample_size (int): The number of target contracts each check_* function is called for.
+
+    Returns:
+    list: One result per check_* function and per batch function.  The first call is reported separately because it loads the indexes the check uses.
+    """
+    results = []
+    contract_index = sb.ContractIndex(targets_df)
+    records = [contract_index.record_at(position) for position in range(min(sample_size, len(contract_index)))]
+
+    for name, function in find_check_functions().items():
+        result = {'kind': 'check', 'name': name, 'calls': len(records), 'errors': 0}
+        first_call_seconds = None
+        with StageTimer() as timer:
+            for record in records:
+                call_start = time.perf_counter()
+                try:
+                    function(record)
+                except Exception as error:
+                    result['errors'] += 1
+                    result['error'] = f"{type(error).__name__}: {error}"
+                if first_call_seconds is None:
+                    first_call_seconds = time.perf_counter() - call_start
+        result.update(timer.result())
+        result['first_call_seconds'] = round(first_call_seconds, 4) if first_call_seconds is not None else None
+        result['seconds_per_call'] = round((timer.seconds - (first_call_seconds or 0)) / max(len(records) - 1, 1), 6)
+        results.append(result)
+
+    for element, function in sb.sb_profile_analysis_batch_functions.items():
+        result = {'kind': 'batch', 'name': element, 'rows': len(targets_df)}
+        with StageTimer() as timer:
+            try:
+                function(targets_df)
+            except Exception as error:
+                result['error'] = f"{type(error).__name__}: {error}"
+        result.update(timer.result())
+        results.append(result)
+
+    return results
+
+# This function runs one pipeline stage under a StageTimer and records the result.
+def benchmark_stage(name: str, function, *args, **kwargs) -> tuple:
+    """
+    Time one pipeline stage.
+
+    Args:
+    name (str): The stage name.
+    function: The stage function.
+    *args, **kwargs: The arguments of the stage function.
+
+    Returns:
+    tuple: (the stage result, the return value of the function).
+    """
+    result = {'kind': 'stage', 'name': name}
+    value = None
+    with StageTimer() as timer:
+        try:
+            value = function(*args, **kwargs)
+        except Exception as error:
+            result['error'] = f"{type(error).__name__}: {error}"
+    result.update(timer.result())
+    print(f"  {name}: {result['seconds']:.2f} seconds, peak memory {result['peak_memory_mb']} MB" + (f" ({result['error']})" if 'error' in result else ""), file=sys.__stdout__)
+    return result, value
+
+# This function stands in for the army-wide pull, which the benchmark does not generate.  The cleansed synthetic data is copied to the army-wide data source file, so the pipeline reads the same files it reads in production.
+def write_army_data_source() -> str:
+    """
+    Copy the cleansed synthetic data source to the army-wide data source file.
+
+    Returns:
+    str: The path of the army-wide data source file.
+    """
+    source_file = sb.resolve_interim_file(sb.common_folders['cleansed_data_source_file'])
+    army_file = os.path.splitext(sb.common_folders['cleansed_all_army_data_source_file'])[0] + os.path.splitext(source_file)[1]
+    shutil.copyfile(source_file, army_file)
+    return army_file
+
+# This function runs the whole pipeline on one synthetic pull and returns the measurements of every stage and check.
+def benchmark_size(rows: int, work_folder: str, seed: int = 0, skip_convert: bool = False, check_sample: int = 200, max_profiles: int = 25, workers: int = 1) -> list:
+    """
+    Benchmark the pipeline on a synthetic pull of one size.
+
+    Args:
+    rows (int): The number of rows of the synthetic pull.
+    work_folder (str): The work folder for this size.  It is emptied first.
+    seed (int): The random seed of the generator.
+    skip_convert (bool): If True, the .xlsx conversion is not benchmarked.  It is always skipped above the Excel row limit.
+    check_sample (int): The number of target contracts each check_* function is called for.
+    max_profiles (int): The number of contract profiles rendered.
+    workers (int): The number of worker processes used to render the profiles.
+
+    Returns:
+    list: The results with the 'rows' of the pull added to each.
+    """
+    shutil.rmtree(work_folder, ignore_errors=True)
+    configure_work_folder(work_folder)
+    results = []
+
+    # Generate the pull.  Writing it is not part of the pipeline, so it is timed separately.
+    generation_result, df = benchmark_stage('generate synthetic data', generate_vce_data, rows, seed)
+    generation_result['kind'] = 'setup'
+    results.append(generation_result)
+    converted_file = os.path.join(sb.common_folders['interim_data_source_folder'], 'data_source.csv')
+
+    if skip_convert or rows > excel_max_rows:
+        write_result, _ = benchmark_stage('write synthetic csv', write_vce_csv, df, converted_file)
+        write_result['kind'] = 'setup'
+        results.append(write_result)
+        results.append({'kind': 'stage', 'name': 'convert_raw_data_from_excel_to_csv', 'skipped': 'above the Excel row limit' if rows > excel_max_rows else 'skipped with --skip-convert'})
+    else:
+        write_result, _ = benchmark_stage('write synthetic xlsx', write_vce_workbook, df, os.path.join(sb.common_folders['raw_data_folder'], 'vce_sb_dashboard.xlsx'))
+        write_result['kind'] = 'setup'
+        results.append(write_result)
+        results.append(benchmark_stage('convert_raw_data_from_excel_to_csv', sb.convert_raw_data_from_excel_to_csv)[0])
+    del df
+
+    # The pipeline stages, in the order of osbp_insight_script_optimized.py
+    results.append(benchmark_stage('clean_and_transform_data_for_contract_profiles', sb.clean_and_transform_data_for_contract_profiles, converted_file, os.path.dirname(sb.common_folders['cleansed_data_source_file']))[0])
+    army_result, _ = benchmark_stage('write army-wide data source', write_army_data_source)
+    army_result['kind'] = 'setup'
+    results.append(army_result)
+    results.append(benchmark_stage('build_naics_statistics', sb.build_naics_statistics)[0])
+    results.append(benchmark_stage('build_awardee_index', sb.build_awardee_index)[0])
+    results.append(benchmark_stage('insights_unrestricted_awarded_to_sb', sb.insights_unrestricted_awarded_to_sb)[0])
+    results.append(benchmark_stage('run_insights', sb.run_insights)[0])
+    results.append(benchmark_stage('build_analytics_database', sb.build_analytics_database)[0])
+    results.append(benchmark_stage('run_insights (analytics database)', sb.run_insights, use_analytics_database=True)[0])
+    analysis_result, targets_df = benchmark_stage('analyze_target_contracts', sb.analyze_target_contracts)
+    results.append(analysis_result)
+
+    # The checks read the same targets as the profile analysis
+    if targets_df is not None and len(targets_df) > 0:
+        targets_df = sb.read_interim_dataset(os.path.join(sb.common_folders['insights_target1_folder'], 'insights_target1.parquet'))
+        results += benchmark_checks(targets_df, check_sample)
+        # Time both renderers.  The ooxml renderer is only timed when it renders the same tables as python-docx with this template.
+        template_file = os.path.join(sb.common_folders['contract_profiles_folder'], 'template_contract_profile.docx')
+        renderers = ['python-docx', 'ooxml']
+        renderer_differences = sb.compare_profile_renderers(template_file)
+        if renderer_differences:
+            renderers.remove('ooxml')
+            results.append({'kind': 'stage', 'name': 'create_contract_profiles (ooxml)', 'skipped': f'{len(renderer_differences)} table differences from python-docx'})
+        for renderer in renderers:
+            render_result, render_value = benchmark_stage('create_contract_profiles' if renderer == 'python-docx' else f'create_contract_profiles ({renderer})', sb.create_contract_profiles, workers=workers, max_rows=max_profiles, use_saved_analysis=True, renderer=renderer, use_cache=False)
+            if render_value is not None:
+                render_result['profiles'] = len(render_value['completed'])
+                render_result['render_errors'] = len(render_value['errors'])
+            results.append(render_result)
+    else:
+        results.append({'kind': 'stage', 'name': 'create_contract_profiles', 'skipped': 'no target contracts'})
+
+    for result in results:
+        result['rows'] = rows
+    return results
+
+# This helper function gets the commit the benchmark runs on so results can be compared across commits.
+def git_commit() -> dict:
+    """
+    Get the current git commit of the repository.
+
+    Returns:
+    dict: The 'commit' hash and whether the working tree has uncommitted changes ('dirty'), or None values if git is not available.
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=repository_folder, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=repository_folder, capture_output=True, text=True, check=True).stdout.strip())
+        return {'commit': commit, 'dirty': dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {'commit': None, 'dirty': None}
+
+# This function compares the timings of two benchmark results files.
+def compare_results(baseline_file: str, results_file: str) -> pd.DataFrame:
+    """
+    Compare a benchmark run against a baseline run.
+
+    Args:
+    baseline_file (str): The results file of the baseline run.
+    results_file (str): The results file of the new run.
+
+    Returns:
+    pd.DataFrame: The seconds and peak memory of both runs for every stage and check they share, with the 'speedup' (baseline seconds / new seconds).
+    """
+    def load(file):
+        with open(file) as results:
+            results_df = pd.DataFrame(json.load(results)['results'])
+        return results_df[results_df['seconds'].notna()].set_index(['rows', 'kind', 'name'])[['seconds', 'peak_memory_mb']] if 'seconds' in results_df else pd.DataFrame()
+
+    comparison_df = load(baseline_file).join(load(results_file), how='inner', lsuffix=' baseline', rsuffix=' new')
+    comparison_df['speedup'] = (comparison_df['seconds baseline'] / comparison_df['seconds new']).round(2)
+    return comparison_df
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the OSBP contract profile pipeline on synthetic VCE SB Dashboard data.')
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000], help='The sizes of the synthetic pulls, from 10k to 5M rows.')
+    parser.add_argument('--seed', type=int, default=0, help='The random seed of the generator.')
+    parser.add_argument('--work-folder', default=None, help='Where the benchmark data is written.  Defaults to a temporary folder that is removed afterwards.')
+    parser.add_argument('--output', default=None, help='The results file.  Defaults to reports/benchmarks/benchmark_<timestamp>_<commit>.json.')
+    parser.add_argument('--skip-convert', action='store_true', help='Do not benchmark the .xlsx conversion (writing large workbooks is slow).')
+    parser.add_argument('--check-sample', type=int, default=200, help='The number of target contracts each check_* function is called for.')
+    parser.add_argument('--max-profiles', type=int, default=25, help='The number of contract profiles rendered.')
+    parser.add_argument('--workers', type=int, default=1, help='The number of worker processes used to render the profiles.')
+    parser.add_argument('--compare', default=None, help='A results file of an earlier run to compare this run against.')
+    parser.add_argument('--verbose', action='store_true', help='Show the output of the pipeline stages.')
+    args = parser.parse_args()
+
+    work_folder = args.work_folder or tempfile.mkdtemp(prefix='osbp_benchmark_')
+    run = {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        **git_commit(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'settings': {key: value for key, value in vars(args).items() if key not in ['output', 'compare', 'verbose']},
+        'results': [],
+    }
+
+    try:
+        for rows in args.rows:
+            print(f"Benchmarking {rows:,} rows", file=sys.__stdout__)
+            # The pipeline prints a line per stage and per profile.  It is hidden unless --verbose is used.
+            with contextlib.redirect_stdout(sys.stdout if args.verbose else io.StringIO()):
+                run['results'] += benchmark_size(rows, os.path.join(work_folder, f'rows_{rows}'), seed=args.seed, skip_convert=args.skip_convert, check_sample=args.check_sample, max_profiles=args.max_profiles, workers=args.workers)
+    finally:
+        if args.work_folder is None:
+            shutil.rmtree(work_folder, ignore_errors=True)
+
+    # Save the results
+    output_file = args.output or os.path.join(repository_folder, 'reports', 'benchmarks', f"benchmark_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}_{run['commit'] or 'unknown'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
+    with open(output_file, 'w') as results:
+        json.dump(run, results, indent=2)
+    print(f"Benchmark results saved to: {output_file}")
+
+    # Print the stage summary, and the comparison with the baseline if one was given
+    results_df = pd.DataFrame(run['results'])
+    print(results_df[results_df['kind'] == 'stage'].pivot_table(index='name', columns='rows', values='seconds', sort=False).round(2).to_string())
+    if args.compare:
+        print(compare_results(args.compare, output_file).to_string())
+
+if __name__ == '__main__':
+    main()
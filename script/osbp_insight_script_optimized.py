@@ -1,26 +1,70 @@
-# Convert initial data pull which comes from VCE SB Dashboard as .xlsx file to .csv file to prepare the data for data cleansing and analysis.  Once converted, move the .csv file to the processed data folder.  This script can be rerun with new or updated data from the VCE SB Dashboard.  
+# Convert initial data pull which comes from VCE SB Dashboard as .xlsx file to .csv file to prepare the data for data cleansing and analysis.  Once converted, move the .csv file to the processed data folder.  This script can be rerun with new or updated data from the VCE SB Dashboard.
 
 # This script can be rerun with new or updated data from the VCE SB Dashboard or data source. Potentially every Quarter.
 
 # Import the OSBP Module
-import osbp_optimized as sb 
+import os
+import datetime
+import osbp_optimized as sb
 
-# Convert the raw data folder location and the file pattern to search for the latest file in the raw data folder.  #This function will first check to see if the file is older than 30 days.  If < 30, skips the cleanse and transform process.  If > 30, it will convert the file to a csv and then cleanse and transform the data.  The final file will be saved in the interim data folder. https://x.com/i/grok/share/1qrwk5gLfh8orhxLslTG1fAdE
-sb.convert_raw_data_from_excel_to_csv()
+# The pipeline runs inside the __main__ block because the render stage uses worker processes, which re-import this script on Windows.
+if __name__ == '__main__':
+    # Every stage below runs through the stage cache.  A stage is skipped if its input files, parameters, and the code it runs (the stage function and the functions and settings it uses) are unchanged since it last ran, and the files it wrote are reused.  For example, after a template-only change or an edit to the renderer only the render stage runs again.
+    stage_cache = sb.StageCache(sb.common_folders['stage_cache_file'])
 
-# Clean and transform the raw csv file and save it in the .  This will become the main file, named 'Data source.csv' to process and rovide a general cleanse of the data and create a dataframe based on it.
-sb.clean_and_transform_data_for_contract_profiles()
-# df.to_csv(output_file, index=False)
+    # Define the files passed between the stages
+    raw_data_file = sb.find_latest_file(sb.common_folders['raw_data_folder'], '*.xlsx')
+    converted_file = os.path.join(sb.common_folders['interim_data_source_folder'], 'data_source.csv')
+    data_source_file = sb.common_folders['cleansed_data_source_file']
+    army_data_source_file = sb.common_folders['cleansed_all_army_data_source_file']
+    insights_target1_file = os.path.join(sb.common_folders['insights_target1_folder'], 'insights_target1.parquet')
+    template_file = os.path.join(sb.common_folders['contract_profiles_folder'], 'template_contract_profile.docx')
+    reference_files = [sb.common_folders['size_standard_list'], sb.common_folders['wosb_naics_list'], sb.common_folders['nmr_waiver_list'], sb.common_folders['hyperlinks_file'], sb.common_folders['osbp_forecast_file'], sb.common_folders['amc_forecast_file']]
+    today = datetime.date.today().isoformat()
 
-# Start processing data to meet different requirements based on the cleansed data source file.
-# Insights Target1 are Full and Opens soliciations that were ultimately awarded to SBs, SBSAs with potential for socio set asides.
-# sb.insight_unrestricted_awarded_to_sb()
+    # Convert the raw data folder location and the file pattern to search for the latest file in the raw data folder.  #This function will first check to see if the file is older than 30 days.  If < 30, skips the cleanse and transform process.  If > 30, it will convert the file to a csv and then cleanse and transform the data.  The final file will be saved in the interim data folder. https://x.com/i/grok/share/1qrwk5gLfh8orhxLslTG1fAdE
+    # The stage cache replaces the 30 day rule: the conversion only runs again when the latest raw file's contents change.
+    stage_cache.run('convert', sb.convert_raw_data_from_excel_to_csv, [raw_data_file], [converted_file])
 
-# Insights Target2 are SBSAs with potential for socio set asides.
-# sb.insight_sbsa_with_potential_for_socio_set_asides()
+    # Clean and transform the raw csv file and save it in the .  This will become the main file, named 'Data source.csv' to process and rovide a general cleanse of the data and create a dataframe based on it.
+    # The incremental mode only cleans the rows that are new or changed since the last quarterly pull and merges them into the stored data source.  The first run (or a run without a stored data source) cleans everything.
+    stage_cache.run('clean', sb.clean_and_transform_data_for_contract_profiles, [converted_file], [data_source_file], params={'df': converted_file, 'destination_folder': os.path.dirname(data_source_file), 'incremental': True})
+    # df.to_csv(output_file, index=False)
 
-# # Insights Target3 are 8(a) awards, both competitive and sole source, where the incumbent 8(a) has a exit date that occurs before the contract expiratino date.
-# sb.insight_8a_with_exit_before_expiration()
+    # Build the NAICS statistics table (SB dollar and action totals, ranks, and percentile bands for every NAICS) from the cleansed data source file.  The Top, Strong, and Weak NAICS checks read from this table instead of the full data source file.
+    stage_cache.run('naics statistics', sb.build_naics_statistics, [data_source_file], [sb.common_folders['naics_statistics_file']])
 
-# Industry Insights.  Process data to provide insights on the industry.
-# sb.insight_test2(df)as
\ No newline at end of file
+    # Build the awardee index, the award history of every awardee across the ACC-RI and Army data.  The awardees are resolved to one entity by the UEI in the Awardee name (or the Entity Unique Id) and otherwise by their normalized name, so the Awardee SB Dollars, NAICS Spread, and Recent Wins checks are dictionary lookups.
+    stage_cache.run('awardee index', sb.build_awardee_index, [data_source_file, army_data_source_file], [sb.common_folders['awardee_index_file'], sb.common_folders['awardee_aliases_file']])
+
+    # Build the optional analytics database, a SQLite copy of the cleansed ACC-RI and Army data and every reference list indexed on Contract No, Order No, NAICS, and Awardee.  While it is current the ACC-RI and Army award count checks run as indexed queries, and ad-hoc questions can be answered from it with sb.analytics_database (e.g. sb.analytics_database.sb_awards('541330', fiscal_years=3)) or any SQLite browser.  Remove this stage to run without it.
+    stage_cache.run('analytics database', sb.build_analytics_database, [data_source_file, army_data_source_file, sb.common_folders['naics_statistics_file'], sb.common_folders['awardee_index_file'], sb.common_folders['awardee_aliases_file']] + reference_files, [sb.common_folders['analytics_database_file']])
+
+    # Start processing data to meet different requirements based on the cleansed data source file.
+    # Every insight target list is built from one read of the cleansed data source file:
+    # Insights Target1 are Full and Opens soliciations that were ultimately awarded to SBs.
+    # Insights Target2 are SBSAs with potential for socio set asides.
+    # Insights Target3 are 8(a) awards, both competitive and sole source, to be screened for an incumbent 8(a) exit date that occurs before the contract expiration date.
+    # Months Remaining is measured from today, so today's date is part of the stage key.
+    insights_files = [sb.common_folders[definition['file_key']] for definition in sb.insight_definitions.values()]
+    stage_cache.run('insights', sb.run_insights, [data_source_file], insights_files, key_values={'today': today})
+
+    # Compute the SB Profile Analysis for the Insights Target1 contracts.
+    stage_cache.run('profile analysis', sb.analyze_target_contracts, [insights_target1_file, data_source_file, army_data_source_file, sb.common_folders['naics_statistics_file'], sb.common_folders['awardee_index_file'], sb.common_folders['awardee_aliases_file']] + reference_files, [sb.common_folders['profile_analysis_file']])
+
+    # Render the contract profiles from the saved SB Profile Analysis.  The fast ooxml renderer is only used when it renders the same tables as python-docx with this template, otherwise the differences are printed and python-docx is used.
+    renderer_differences = sb.compare_profile_renderers(template_file)
+    for difference in renderer_differences:
+        print(f"Renderer difference: {difference}")
+    renderer = 'python-docx' if renderer_differences else 'ooxml'
+    stage_cache.run('render', sb.create_contract_profiles, [sb.common_folders['profile_analysis_file'], template_file], [os.path.join(sb.common_folders['completed_profiles_folder'], 'completed_profiles_log.txt')], params={'use_saved_analysis': True, 'renderer': renderer})
+
+    # Export every contract profile to one workbook (a row per contract) and one HTML report (a section per contract) for review, with a link to each PCF cabinet.
+    export_files = [os.path.join(sb.common_folders['completed_profiles_folder'], f'contract_profiles_{today}.{output}') for output in ['xlsx', 'html']]
+    stage_cache.run('export', sb.create_contract_profiles, [sb.common_folders['profile_analysis_file']], export_files, params={'use_saved_analysis': True, 'outputs': ['xlsx', 'html']})
+
+    # Industry Insights.  Process data to provide insights on the industry.
+    # sb.insight_test2(df)as
+
+    # Save the run records (time, rows, and peak memory of every stage and the time of every SB Profile Analysis check) and print the summary tables
+    sb.run_recorder.finish()
@@ -5,9 +5,39 @@ import pandas as pd #This is the pandas library which is used to read, clean, an
 import numpy as np #This is the numpy library which is used to support the pandas library.
 import datetime #This is the datetime library which is used to support the pandas library.
 import os #This is the os library which is used to support the pandas library.
+import pathlib
 import glob #This is the glob library which is used to support the pandas library.
 import openpyxl
 import re
+import shutil
+import hashlib
+import inspect
+import ast
+import csv
+import difflib
+import io
+import html
+import zipfile
+import tempfile
+import xml.etree.ElementTree as ElementTree
+from xml.sax.saxutils import escape as xml_escape
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from openpyxl.utils import get_column_letter
+import concurrent.futures
+import contextlib
+import json
+import sqlite3
+import sys
+import time
+try:
+    import psutil # Optional.  Used to report the peak memory of the pipeline.
+except ImportError:
+    psutil = None
+try:
+    import resource # Not available on Windows.  Used to report the peak memory when psutil is not installed.
+except ImportError:
+    resource = None
 from docx import Document
 from docx.shared import Pt, RGBColor
 from docx.oxml.ns import qn
@@ -25,21 +55,49 @@ common_folders = {
     
     # The interime folder is where the clean and transformed data source files is stored and used to build all insights target lists from.  This is the most important folder in the data pipeline.
     'interim_data_source_folder': r'C:\GitHub\contract_profiles\data\interim',
-    'interim_data_source_file': r'C:\GitHub\contract_profiles\data\interim\acc-ri_data_source.csv',
+    'interim_data_source_file': r'C:\GitHub\contract_profiles\data\interim\data_source.parquet',
     'interim_army_data_source_folder': r'C:\GitHub\contract_profiles\data\interim',
-    'interim_army_data_source_file': r'C:\GitHub\contract_profiles\data\interim\army_data_source.csv',
-    
+    'interim_army_data_source_file': r'C:\GitHub\contract_profiles\data\interim\army_data_source.parquet',
+
+    # The cleansed keys are what the SB Profile Analysis checks read from.  They point at the interim data source files above: data_source.parquet is the file clean_and_transform_data_for_contract_profiles writes.
+    'cleansed_data_source_folder': r'C:\GitHub\contract_profiles\data\interim',
+    'cleansed_data_source_file': r'C:\GitHub\contract_profiles\data\interim\data_source.parquet',
+    'cleansed_all_army_data_source_file': r'C:\GitHub\contract_profiles\data\interim\army_data_source.parquet',
+
+    # The NAICS statistics file is built once from the cleansed data source file and holds the SB dollar and action totals, ranks, and percentile bands for every NAICS.  The Top, Strong and Weak NAICS checks read from it.
+    'naics_statistics_file': r'C:\GitHub\contract_profiles\data\interim\naics_statistics.parquet',
+
+    # The awardee index holds the award history (SB dollars, awards, recent wins, and NAICS spread) of every awardee across the ACC-RI and Army data sources, with the awardees resolved to one entity by their UEI or their normalized name.  The aliases file maps every Awardee value to its entity.
+    'awardee_index_file': r'C:\GitHub\contract_profiles\data\interim\awardee_index.parquet',
+    'awardee_aliases_file': r'C:\GitHub\contract_profiles\data\interim\awardee_aliases.parquet',
+
+    # The stage cache file records the inputs, parameters, and code version of every pipeline stage the last time it ran.  A stage is skipped if none of them changed.
+    'stage_cache_file': r'C:\GitHub\contract_profiles\data\interim\stage_cache.json',
+
+    # The run log records the wall time, rows in and out, and peak memory of every pipeline stage and the time of every SB Profile Analysis check, one JSON record per line.
+    'run_log_file': r'C:\GitHub\contract_profiles\data\interim\pipeline_run_log.jsonl',
+
+    # The analytics database is an optional SQLite copy of the cleansed ACC-RI and Army data and every reference list, indexed on Contract No, Order No, NAICS, and Awardee.  The award count checks and the insights run as indexed queries against it when it is current.
+    'analytics_database_file': r'C:\GitHub\contract_profiles\data\interim\osbp_analytics.sqlite',
+
     # The processed folder is the location where all the target lists are created and stored.  These target lists is what the contract profiles are built from.
     'inights_folder': r'C:\GitHub\contract_profiles\data\processed',
+
+    # The profile analysis file holds every target contract with all of the SB Profile Analysis elements precomputed as columns.  The contract profiles are rendered from it.
+    'profile_analysis_file': r'C:\GitHub\contract_profiles\data\processed\profile_analysis.parquet',
+
+    # The profile cache keeps the SB Profile Analysis values and the rendered document of every target contract with the hashes of its inputs.  A contract whose inputs are unchanged since the last run is not analyzed or rendered again.
+    'profile_cache_file': r'C:\GitHub\contract_profiles\data\processed\profile_cache.json',
     
     'insight_unrestricted_awarded_to_sb_folder': r'C:\GitHub\contract_profiles\data\processed\unrestricted_awarded_to_sb',
-    'insight_unrestricted_awarded_to_sb_file': r'C:\GitHub\contract_profiles\data\processed\unrestricted_awarded_to_sb\insights_target1.csv',
+    'insight_unrestricted_awarded_to_sb_file': r'C:\GitHub\contract_profiles\data\processed\unrestricted_awarded_to_sb\insights_target1.parquet',
+    'insights_target1_folder': r'C:\GitHub\contract_profiles\data\processed\unrestricted_awarded_to_sb',
     
     'insight_sbsa_with_potential_for_socio_set_aside_folder': r'C:\GitHub\contract_profiles\data\processed\sbsa_with_potential_for_socio_set_asides',
-    'insight_sbsa_with_potential_for_socio_set_aside_file': r'C:\GitHub\contract_profiles\data\processed\sbsa_with_potential_for_socio_set_asides.csv',
+    'insight_sbsa_with_potential_for_socio_set_aside_file': r'C:\GitHub\contract_profiles\data\processed\sbsa_with_potential_for_socio_set_asides\insights_target2.parquet',
     
     'insight_8a_with_exit_before_expiration_folder': r'C:\GitHub\contract_profiles\data\processed\8a_with_exit_before_expiration',
-    'insight_8a_with_exit_before_expiration_file': r'C:\GitHub\contract_profiles\data\processed\8a_with_exit_before_expira.csv',
+    'insight_8a_with_exit_before_expiration_file': r'C:\GitHub\contract_profiles\data\processed\8a_with_exit_before_expiration\insights_target3.parquet',
     
     # The reports folder is where the initial contract profiles are stored.  This is the final step in the data pipeline before using them to support proactive market research.
     'contract_profiles_folder': r'C:\GitHub\contract_profiles\reports\contract_profiles',
@@ -54,8 +112,9 @@ common_folders = {
     # The Size Standard list comes from the SBA website and is used to identify the size standard for each NAICS code.
     'size_standard_list' : r'C:\GitHub\contract_profiles\references\size_standards\size_standards_list.csv',
     'forecast_folder' : r'C:\GitHub\contract_profiles\references\forecast_listing',
-    'osbp_forecast_file' : r'C:\GitHub\contract_profiles\references\forecast_listing\osbp_forecast.csv',
-    'amc_forecast_file' : r'C:\GitHub\contract_profiles\references\forecast_listing\amc_forecast.csv',
+    # The forecast listings come from the OSBP dashboard and the AMC forecast.  Both are used to identify forecasted actions that follow on a current contract.
+    'osbp_forecast_file' : r'C:\GitHub\contract_profiles\references\forecast_listing\osbp_dashboard_forecast.csv',
+    'amc_forecast_file' : r'C:\GitHub\contract_profiles\references\forecast_listing\amc_forecast_listing.csv',
     'hyperlinks_folder' : r'C:\GitHub\contract_profiles\references\hyperlinks',
     'hyperlinks_file' : r'C:\GitHub\contract_profiles\references\hyperlinks\hyperlinks_listing.csv',
 }
@@ -123,11 +182,71 @@ def remove_old_files(folder_path: str, file_pattern: str) -> None:
         if file != latest_file_to_keep:
             os.remove(file)
 
+# This helper function converts one Excel cell value to the text written to the CSV file.  Dates are written as ISO dates so they are parsed the same way on every read.
+def excel_value_to_csv(value):
+    """
+    Convert an Excel cell value read by openpyxl to a CSV value.
+
+    Args:
+    value: The cell value (None, str, int, float, bool, datetime, or date).
+
+    Returns:
+    The value to write.  None is written as an empty string, dates as YYYY-MM-DD (or YYYY-MM-DD HH:MM:SS when they have a time).
+    """
+    if value is None:
+        return ''
+    if isinstance(value, datetime.datetime):
+        return value.strftime('%Y-%m-%d') if value.time() == datetime.time() else value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, datetime.date):
+        return value.strftime('%Y-%m-%d')
+    return value
+
+# This function streams an Excel workbook to a CSV file row by row.  The workbook is opened in openpyxl read-only mode and rows are written in batches, so the whole sheet is never held in memory.
+def stream_excel_to_csv(excel_file: str, csv_file: str, batch_size: int = 50000, sheet_name: str = None) -> int:
+    """
+    Convert an .xlsx worksheet to a .csv file without loading the whole worksheet.
+
+    Args:
+    excel_file (str): The path to the .xlsx file.
+    csv_file (str): The path to the .csv file to write.
+    batch_size (int): The number of rows written at a time.  Memory use depends on this, not on the size of the worksheet.
+    sheet_name (str): The worksheet to convert.  Defaults to the first worksheet (same as pd.read_excel).
+
+    Returns:
+    int: The number of data rows written (not counting the header row).
+    """
+    workbook = openpyxl.load_workbook(excel_file, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet_name] if sheet_name else workbook.worksheets[0]
+        row_count = 0
+
+        with open(csv_file, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            batch = []
+            for row in worksheet.iter_rows(values_only=True):
+                # Skip rows that are completely empty (read-only mode can return padding rows at the end of the sheet)
+                if all(value is None for value in row):
+                    continue
+                batch.append([excel_value_to_csv(value) for value in row])
+                if len(batch) >= batch_size:
+                    writer.writerows(batch)
+                    row_count += len(batch)
+                    batch = []
+            writer.writerows(batch)
+            row_count += len(batch)
+    finally:
+        workbook.close()
+
+    # The first row written is the header row
+    return max(row_count - 1, 0)
+
 # This function will find the latest file and convert the raw data file from .xlsx to .csv and move it to the interim data folder.  It will also log the conversion details in a log file.
 def convert_raw_data_from_excel_to_csv() -> str:
     """
     Convert the raw data file from .xlsx to .csv and move it to the interim data folder.
     https://x.com/i/grok/share/nUScJIxpbmfLVBcnSCQqO8xQ1
+
+    The workbook is streamed row by row (see stream_excel_to_csv) so memory stays flat and the conversion time grows linearly with the number of rows.
     
     Args:
     None
@@ -136,10 +255,10 @@ def convert_raw_data_from_excel_to_csv() -> str:
     str: The path to the converted file in the interim data folder.
     """
     # Define the raw data folder location and the file pattern to search for the latest file in the raw data folder.
-    raw_data_folder = 'raw_data_folder'
+    raw_data_folder = common_folders['raw_data_folder']
     
     # Define the destination folder and the naming convention of the converted file
-    interim_data_folder = 'interim_data_folder'
+    interim_data_folder = common_folders['interim_data_source_folder']
      
     # Get today's date
     today_date = datetime.datetime.now().strftime('%Y-%m-%d') 
@@ -158,163 +277,619 @@ def convert_raw_data_from_excel_to_csv() -> str:
     # Define the destination folder and the naming convention of the converted file
     interim_data_file = os.path.join(interim_data_folder, f"data_source.csv")
     
-    # Read the latest raw data file 
-    df = pd.read_excel(latest_file)
-    
-    # Convert the latest raw data file to a CSV file and save it to the cleansed data folder
-    df.to_csv(interim_data_file, index=False)
+    # Stream the latest raw data file to a CSV file in the interim data folder
+    row_count = stream_excel_to_csv(latest_file, interim_data_file)
+    run_recorder.set_rows(rows_in=row_count, rows_out=row_count)
     
     
     # Print the conversion details to the console
-    print(f"{latest_file} was successfully converted to {interim_data_file} on {today_date}.")
+    print(f"{latest_file} was successfully converted to {interim_data_file} ({row_count} rows) on {today_date}.")
 
     # Log the conversion details
     log_file = os.path.join(raw_data_folder, 'OSBP-RI_data_conversion_log.txt') 
     with open(log_file, 'a') as log:
-        log.write(f"The raw data to for the OSBP Insights was converted on {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\nRaw data file: {latest_file}\nConverted file: {interim_data_file}\nConverted csv file location: {interim_data_folder}\n\n")
+        log.write(f"The raw data to for the OSBP Insights was converted on {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\nRaw data file: {latest_file}\nConverted file: {interim_data_file}\nConverted csv file location: {interim_data_folder}\nRows converted: {row_count}\n\n")
     print(f"Conversion details logged in {log_file}")
     
     return interim_data_file
 
 
-# This functions provides a general cleanse of the data.  It removes any rows and columns that are completely empty, removes any duplicate rows, reduces the memory usage of the DataFrame by converting columns with object dtype to category dtype, removes unique_values "Modification", "MATOC", "SATOC" from the 'Contract Action Type' column, replaces any blank values in "10N Type Set Aside Description" with "NO SET ASIDE USED.", converts the 'Current Completion' column to datetime to match format with today_date, calculates the number of months remaining to complete the contract and inputs the number of months remaining in a new 'Months Remaining' column.
-def clean_and_transform_data_for_contract_profiles(df, destination_folder: str):
+# The VCE schema declares every column the pipeline reads from the VCE SB Dashboard pull.  The key is the column name in the raw pull and each entry gives the 'target' column name after cleaning (defaults to the raw name), the 'dtype' it is stored as, the date 'format', the 'fill' value for blanks, text to 'remove' from the values, and values to 'replace'.  The raw CSV is read once with only these columns and these types, so nothing is inferred and no column is converted twice.
+vce_schema = {
+    'Contract No': {'dtype': 'string'},
+    'Order No': {'dtype': 'string'},
+    'Modification No': {'dtype': 'string'},
+    'Award Date': {'dtype': 'datetime64[ns]', 'format': 'ISO8601'},
+    'Effective Date': {'dtype': 'datetime64[ns]', 'format': 'ISO8601'},
+    'Fiscal Year': {'dtype': 'Int64'},
+    'Command': {'dtype': 'category'},
+    'Sub Command': {'dtype': 'category'},
+    'Organization': {'dtype': 'category'},
+    'Office': {'dtype': 'category'},
+    'Office Id': {'dtype': 'category'},
+    'Army Hierarchy': {'dtype': 'category'},
+    'PEO/Command': {'dtype': 'category'},
+    'PM/Directorate': {'dtype': 'category'},
+    'VCE-PCF Project/Program Title': {'dtype': 'category'},
+    'Funding Office Id': {'dtype': 'category'},
+    'Funding Office Name': {'dtype': 'category'},
+    '13GG Legal Business Name (UEI)': {'target': 'Awardee', 'dtype': 'category'},
+    'Entity Unique Id': {'dtype': 'category'},
+    'Small Business Eligible Actions': {'dtype': 'Int64'},
+    'Small Business Eligible Dollars': {'dtype': 'float64'},
+    'Small Business Actions': {'target': 'Size Status', 'dtype': 'category', 'replace': {'0': 'OTSB', '1': 'SB'}},
+    'Small Business Dollars': {'target': 'SB Dollars', 'dtype': 'float64'},
+    'Small Business  %': {'dtype': 'category'},
+    'SDB Concern Actions': {'dtype': 'Int64'},
+    'SDB Concern Dollars': {'dtype': 'float64'},
+    'SDB Concern %': {'dtype': 'category'},
+    'Service Disabled Veterans Actions': {'dtype': 'Int64'},
+    'Service Disabled Veterans Dollars': {'dtype': 'float64'},
+    'SVC Disabled Veteran %': {'dtype': 'category'},
+    'Women Owned Actions': {'dtype': 'Int64'},
+    'Women Owned Dollars': {'dtype': 'float64'},
+    'Women Owned %': {'dtype': 'category'},
+    'HUB Zone Actions': {'dtype': 'Int64'},
+    'HUB Zone Dollars': {'dtype': 'float64'},
+    'HUB Zone %': {'dtype': 'category'},
+    'OMB Level 1': {'dtype': 'category'},
+    'OMB Level 2': {'dtype': 'category'},
+    'PSC': {'dtype': 'category'},
+    'PSC Description': {'dtype': 'category'},
+    'NAICS': {'dtype': 'category'},
+    'NAICS Description': {'dtype': 'category'},
+    'Congressional District - Vendor': {'dtype': 'category'},
+    'Congressional District - POP': {'dtype': 'category'},
+    'Subcontracting Plan Description': {'dtype': 'category'},
+    'National Interest Description': {'dtype': 'category'},
+    'SBIR/STTR Type': {'dtype': 'category'},
+    'Bundling': {'dtype': 'category'},
+    'Contract Expiration Flag': {'dtype': 'category'},
+    'Current Completion Date': {'target': 'Expiration', 'dtype': 'datetime64[ns]', 'format': 'ISO8601'},
+    'Awarding PCO (CWS)': {'dtype': 'category'},
+    '10N Type Set Aside Description': {'target': 'Type Set Aside Description', 'dtype': 'category', 'remove': '.', 'fill': 'NO SET ASIDE USED'},
+    '6M Description of Requirement': {'target': 'Requirements Description', 'dtype': 'string'},
+    '12C Reason for Modification Description': {'dtype': 'category'},
+    'Contract Action Type': {'dtype': 'category'},
+    'Instrument Type': {'dtype': 'category'},
+    # The other Contract Profile Data Elements are read when the pull includes them
+    'Contract Type': {'dtype': 'category'},
+    'Place of Performance': {'dtype': 'category'},
+    'Limited Competition': {'dtype': 'category'},
+    'Number of Offerors': {'dtype': 'category'},
+    'SubK Plan': {'dtype': 'category'},
+    'GWAC': {'dtype': 'category'},
+    'CPARS Rating': {'dtype': 'category'},
+    'SubK Achievement': {'dtype': 'category'},
+}
+
+# The interim schema declares the data type of every column the pipeline reads from the interim and processed datasets.  The datasets are stored as Parquet with these types so readers do not have to re-parse dates, NAICS, and dollar text.  Any other text column is stored as a category.  The cleaned VCE columns take their types from the VCE schema and the rest are the columns added during cleaning.
+interim_schema = {field.get('target', column): field['dtype'] for column, field in vce_schema.items()}
+interim_schema.update({
+    'Months Remaining': 'Int64',
+    'Row Key': 'uint64',
+    'Row Hash': 'uint64',
+    'Socio Flags': 'uint8',
+    'IT Buy': 'bool',
+})
+
+# The profile analysis file replaces the IT Buy flag of the data source with the "Yes" and "No" text of the SB Profile Analysis, so it is stored as a category there
+profile_analysis_schema = dict(interim_schema, **{'IT Buy': 'category'})
+
+# This function applies the interim schema to a DataFrame.  It is used before writing a dataset and when an older CSV dataset is read.
+def apply_interim_schema(df: pd.DataFrame, schema: dict = None) -> pd.DataFrame:
+    """
+    Convert the columns of a DataFrame to the types declared in interim_schema.
+
+    Args:
+    df (pd.DataFrame): The DataFrame to convert.
+    schema (dict): The column types to apply.  Defaults to interim_schema.
+
+    Returns:
+    pd.DataFrame: The converted DataFrame.  NAICS is normalized to six digits, dollars are numeric, and dates are datetimes.
+    """
+    schema = schema or interim_schema
+    for column in df.columns:
+        dtype = schema.get(column)
+
+        # Skip the columns that already have their type.  The NAICS is always normalized, which only maps its categories when it is already a category.
+        current_dtype = df[column].dtype
+        if column != 'NAICS' and (str(current_dtype) == dtype or (dtype is None and isinstance(current_dtype, pd.CategoricalDtype))):
+            continue
+
+        if column == 'NAICS':
+            naics = df[column].map(normalize_naics, na_action='ignore')
+            df[column] = naics.astype('category')
+        elif dtype == 'datetime64[ns]':
+            if not pd.api.types.is_datetime64_any_dtype(df[column]):
+                df[column] = pd.to_datetime(df[column].astype('string').str[:10], format='%Y-%m-%d', errors='coerce')
+        elif dtype == 'float64':
+            df[column] = to_numeric_dollars(df[column])
+        elif dtype == 'Int64':
+            df[column] = pd.to_numeric(df[column], errors='coerce').round().astype('Int64')
+        elif dtype == 'string':
+            df[column] = df[column].astype('string')
+        elif dtype in ('uint8', 'uint64'):
+            df[column] = df[column].fillna(0).astype(dtype)
+        elif dtype == 'bool':
+            # The CSV copies hold "True" and "False" text and SQLite holds 1 and 0
+            if pd.api.types.is_numeric_dtype(df[column]):
+                df[column] = df[column].fillna(0).astype(bool)
+            else:
+                df[column] = df[column].astype('string').str.lower().isin(['true', '1'])
+        elif dtype == 'category' or pd.api.types.is_object_dtype(df[column]) or pd.api.types.is_string_dtype(df[column]):
+            df[column] = df[column].astype('category')
+
+    return df
+
+# This helper function finds the stored copy of an interim dataset.  The Parquet copy is preferred and the CSV copy is used if it is the only one.
+def resolve_interim_file(file_path: str) -> str:
+    """
+    Get the path of the stored copy of an interim dataset.
+
+    Args:
+    file_path (str): The path of the dataset with either a .parquet or .csv extension.
+
+    Returns:
+    str: The .parquet path if it exists, otherwise the .csv path if it exists, otherwise file_path.
+    """
+    base_path = os.path.splitext(file_path)[0]
+    for candidate in [base_path + '.parquet', base_path + '.csv']:
+        if os.path.exists(candidate):
+            return candidate
+
+    return file_path
+
+# This function writes an interim or processed dataset as Parquet with the interim schema.  A CSV copy can also be written for people to open in Excel.
+def write_interim_dataset(df: pd.DataFrame, file_path: str, export_csv: bool = False, schema: dict = None) -> str:
+    """
+    Save a dataset as a typed Parquet file.
+
+    Args:
+    df (pd.DataFrame): The dataset to save.
+    file_path (str): Where to save it.  The extension is replaced with .parquet.
+    export_csv (bool): If True, a .csv copy is also saved next to the Parquet file.
+    schema (dict): The column types to save the dataset with.  Defaults to interim_schema.
+
+    Returns:
+    str: The path to the Parquet file.
+    """
+    parquet_file = os.path.splitext(file_path)[0] + '.parquet'
+    df = apply_interim_schema(df, schema)
+    df.to_parquet(parquet_file, index=False)
+
+    if export_csv:
+        df.to_csv(os.path.splitext(file_path)[0] + '.csv', index=False)
+
+    return parquet_file
+
+# This function reads an interim or processed dataset.  Only the requested columns are loaded from the Parquet file and they come back with the interim schema types.
+def read_interim_dataset(file_path: str, columns: list = None, schema: dict = None) -> pd.DataFrame:
+    """
+    Read a dataset saved by write_interim_dataset.
+
+    Args:
+    file_path (str): The path of the dataset with either a .parquet or .csv extension.
+    columns (list): The columns to read.  Defaults to all columns.
+    schema (dict): The column types of a CSV copy.  Defaults to interim_schema.
+
+    Returns:
+    pd.DataFrame: The dataset with the interim schema types.
+    """
+    file_path = resolve_interim_file(file_path)
+
+    if file_path.endswith('.parquet'):
+        return pd.read_parquet(file_path, columns=columns)
+
+    # Older datasets were only saved as CSV.  Apply the schema after reading so the types match the Parquet copy.
+    return apply_interim_schema(pd.read_csv(file_path, usecols=columns), schema)
+
+# This function reads the converted VCE SB Dashboard CSV file with the VCE schema.  Only the declared columns are read, every column is read straight into its declared type, and the columns are renamed once.
+def read_vce_data(csv_file: str) -> pd.DataFrame:
+    """
+    Read the converted VCE SB Dashboard data with the VCE schema.
+
+    Args:
+    csv_file (str): The path to the converted CSV file.
+
+    Returns:
+    pd.DataFrame: The data with the target column names.  Dates are still text and are parsed with their declared format by apply_vce_field.
+    """
+    # Read only the header to find the declared columns in this pull
+    header = pd.read_csv(csv_file, nrows=0).columns
+    columns = [column for column in header if column in vce_schema]
+    skipped_columns = [column for column in header if column not in vce_schema]
+    if skipped_columns:
+        print(f"Skipped {len(skipped_columns)} columns that are not in the VCE schema: {', '.join(skipped_columns)}")
+
+    # Dates are read as text and parsed with their declared format so pandas does not have to infer it
+    read_dtypes = {column: 'string' if vce_schema[column]['dtype'].startswith('datetime') else vce_schema[column]['dtype'] for column in columns}
+    df = pd.read_csv(csv_file, usecols=columns, dtype=read_dtypes)
+
+    return df.rename(columns={column: vce_schema[column]['target'] for column in columns if 'target' in vce_schema[column]})
+
+# This helper function applies the value rules of one VCE schema entry to a column.  The text rules are applied to the categories of a category column, so each distinct value is only cleaned once.
+def apply_vce_field(series: pd.Series, field: dict) -> pd.Series:
+    """
+    Apply the 'remove', 'replace', 'fill', and date 'format' rules of a VCE schema entry.
+
+    Args:
+    series (pd.Series): The column as read by read_vce_data.
+    field (dict): The VCE schema entry of the column.
+
+    Returns:
+    pd.Series: The cleaned column.
+    """
+    if 'remove' in field or 'replace' in field:
+        values = series.cat.categories if isinstance(series.dtype, pd.CategoricalDtype) else series
+        cleaned = values.str.replace(field['remove'], '', regex=False) if 'remove' in field else values
+        cleaned = cleaned.map(lambda value: field.get('replace', {}).get(value, value))
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # Two categories can become the same value, so the mapped column is converted back to a category
+            series = series.map(dict(zip(series.cat.categories, cleaned))).astype('category')
+        else:
+            series = pd.Series(cleaned, index=series.index, dtype=series.dtype)
+
+    if field['dtype'].startswith('datetime') and not pd.api.types.is_datetime64_any_dtype(series):
+        series = pd.to_datetime(series, format=field.get('format', 'ISO8601'), errors='coerce')
+
+    if 'fill' in field and series.isna().any():
+        if isinstance(series.dtype, pd.CategoricalDtype) and field['fill'] not in series.cat.categories:
+            series = series.cat.add_categories([field['fill']])
+        series = series.fillna(field['fill'])
+
+    return series
+
+# The columns that identify one contract action in the VCE SB Dashboard data.  Their hash is the row key used to match rows between quarterly pulls.
+row_key_columns = ['Contract No', 'Order No', 'Modification No', 'Award Date']
+
+# This function adds the row fingerprints used by the incremental refresh.  The 'Row Key' is a hash of the row_key_columns and the 'Row Hash' is a hash of the whole raw row, so a row with the same key but a new 'Row Hash' has changed since the last pull.
+def add_row_fingerprints(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Add the 'Row Key' and 'Row Hash' fingerprint columns to the raw data.
+
+    Args:
+    df (pd.DataFrame): The raw data as read from the converted CSV file.
+
+    Returns:
+    pd.DataFrame: The raw data with the two uint64 fingerprint columns added.
+    """
+    key_columns = [column for column in row_key_columns if column in df.columns]
+    content_columns = [column for column in df.columns if column not in ['Row Key', 'Row Hash']]
+
+    # Hash every row in one vectorized pass.  The index is left out so the hash only depends on the values.
+    df['Row Key'] = pd.util.hash_pandas_object(df[key_columns], index=False).to_numpy()
+    df['Row Hash'] = pd.util.hash_pandas_object(df[content_columns], index=False).to_numpy()
+
+    return df
+
+# This helper function calculates the months remaining until the contract expires.  It is recalculated for every stored row on each refresh because it depends on today's date.
+def calculate_months_remaining(expiration: pd.Series) -> pd.Series:
+    """
+    Calculate the months remaining from today until the expiration date.
+
+    Args:
+    expiration (pd.Series): The 'Expiration' dates.
+
+    Returns:
+    pd.Series: The whole number of 30 day months remaining.
+    """
+    return (pd.to_datetime(expiration, errors='coerce') - pd.Timestamp.today()).dt.days // 30
+
+# This helper function gets the first day of a range of fiscal years ending with the current fiscal year.  The fiscal year starts on October 1st.
+def fiscal_years_start_date(fiscal_years: int) -> datetime.date:
+    """
+    Get the start date of the last fiscal years.
+
+    Args:
+    fiscal_years (int): The number of fiscal years, counting the current fiscal year.
+
+    Returns:
+    datetime.date: October 1st of the first of those fiscal years.
+    """
+    today = datetime.date.today()
+    current_fiscal_year = today.year + 1 if today.month >= 10 else today.year
+    return datetime.date(current_fiscal_year - fiscal_years, 10, 1)
+
+# This function holds the cleaning steps for the VCE SB Dashboard data.  It does not read or save anything so it can be used on the whole pull or only on the new and changed rows.
+def transform_contract_data(df: pd.DataFrame, drop_empty_columns: bool = True) -> pd.DataFrame:
+    """
+    Apply the cleaning steps to the VCE SB Dashboard rows read by read_vce_data.
+
+    Args:
+    df (pd.DataFrame): The rows with the VCE schema column names and types.
+    drop_empty_columns (bool): If True, columns that are empty in every row are removed.
+
+    Returns:
+    pd.DataFrame: The cleaned rows with the interim schema types.
+    """
+    # Remove any rows and columns that are completely empty.  Columns are kept when only some of the rows are being cleaned because a column can be empty in the new rows but not in the stored ones.  The DataFrame is only copied when there is something to remove.
+    empty_rows = df.isna().all(axis=1)
+    if empty_rows.any():
+        df = df.loc[~empty_rows]
+    if drop_empty_columns:
+        empty_columns = df.columns[df.isna().all()]
+        if len(empty_columns) > 0:
+            df = df.drop(columns=empty_columns)
+
+    # Remove any duplicate rows.  The 'Row Hash' already identifies identical rows, so the rows do not have to be compared again.
+    duplicate_rows = df['Row Hash'].duplicated() if 'Row Hash' in df.columns else df.duplicated()
+    if duplicate_rows.any():
+        df = df.loc[~duplicate_rows]
+
+    # Apply the fills, removals, replacements, and date formats declared in the VCE schema.  For example, "." is removed from the 'Type Set Aside Description', a blank one becomes "NO SET ASIDE USED", and 'Size Status' 0 and 1 become "OTSB" and "SB".
+    for column, field in vce_schema.items():
+        target = field.get('target', column)
+        if target in df.columns:
+            df[target] = apply_vce_field(df[target], field)
+
+    # # Remove unique_values "Modification", "MATOC", "SATOC" from the 'Contract Action Type' column
+    # df = df[~df['Contract Action Type'].str.upper().isin(["MODIFICATION", "MATOC", "SATOC"])]
+
+    # For each row, calulate the number of months remaining to complete the contract and input the number of months remaining in the 'Months Remaining' column
+    df['Months Remaining'] = calculate_months_remaining(df['Expiration'])
+
+    # Add a new column next to the 'Current Completion' column and insert the 'Months Remaining' column
+    df.insert(df.columns.get_loc('Expiration') + 1, 'Months Remaining', df.pop('Months Remaining'))
+
+    # Pack the SB and socio-economic categories of every row into one uint8 bitmask column
+    df['Socio Flags'] = encode_socio_flags(df)
+
+    # Classify every row as an IT Buy or not and keep the matched keywords
+    it_buy_df = it_classifier.classify(df)
+    df['IT Buy'] = it_buy_df['IT Buy']
+    df['IT Keywords'] = it_buy_df['IT Keywords']
+
+    # Normalize the NAICS and give the added columns their interim schema types
+    return apply_interim_schema(df)
+
+# This helper function reports the peak memory used by the pipeline so far.  psutil is used when it is installed, otherwise the resource module.
+def peak_memory_mb() -> float:
+    """
+    Get the peak memory of the current process.
+
+    Returns:
+    float: The peak memory in MB, or None if neither psutil nor resource is available.
+    """
+    if psutil is not None:
+        memory_info = psutil.Process().memory_info()
+        # The peak working set is only reported on Windows.  Other platforms report the current memory.
+        return getattr(memory_info, 'peak_wset', memory_info.rss) / 2**20
+    if resource is not None:
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+    return None
+
+# This functions provides a general cleanse of the data.  The cleaning steps are in transform_contract_data: it removes any rows and columns that are completely empty, removes any duplicate rows, reduces the memory usage of the DataFrame by converting columns with object dtype to category dtype, replaces any blank values in "10N Type Set Aside Description" with "NO SET ASIDE USED.", and calculates the number of months remaining to complete the contract in a new 'Months Remaining' column.
+def clean_and_transform_data_for_contract_profiles(df, destination_folder: str, export_csv: bool = False, incremental: bool = False):
     """
     Clean and transforme the data. Ensure the proper data types are used; rename any columns to align with desired result.  Also, save any formatting for the point in which it will be analyzed.  For example, don't add currency formatting at this point.  Just make sure numbers are numeric, dates are dates, and text is text.
 
+    The cleaned data is saved as data_source.parquet with the interim_schema types.  In incremental mode only the rows that are new or changed since the stored data source are cleaned; the unchanged rows are kept from the stored file and rows no longer in the pull are removed.
+
     Args:
     df (pd.DataFrame): The DataFrame containing the data to be cleaned.
+    destination_folder (str): The folder to save the cleaned data to.
+    export_csv (bool): If True, a data_source.csv copy is also saved for people to open in Excel.
+    incremental (bool): If True, only clean the rows whose fingerprint is not in the stored data source.  Falls back to a full clean if there is no stored data source with fingerprints.
 
     Returns:
     pd.DataFrame: The cleaned DataFrame.
     """
   
-    # Read the latest CSV file
-    df = pd.read_csv(df)
-    
-    # Remove any rows and columns that are completely empty
-    df = df.dropna(how='all')
-    df = df.dropna(axis=1, how='all')
+    # Time the clean so the run reports how long it took and how much memory it needed
+    start_time = time.perf_counter()
 
-    # Remove any duplicate rows
-    df = df.drop_duplicates()
+    # Read the latest CSV file with the VCE schema
+    df = read_vce_data(df)
+    run_recorder.set_rows(rows_in=len(df))
 
-    # Reduce the memory usage of the DataFrame by converting columns with object dtype to category dtype
-    df = df.astype({col: 'category' for col in df.select_dtypes('object').columns})
-    
-    # Rename column "13GG Legal Business Name (UEI)" to "Awardee"
-    df = df.rename(columns={"13GG Legal Business Name (UEI)": "Awardee"})
-    
-    # Rename column "10N Type Set Aside Description" to "Type Set Aside Description"
-    df = df.rename(columns={"10N Type Set Aside Description": "Type Set Aside Description"})
-    
-    # Remove the . from the values in the 'Type Set Aside Description' column
-    df['Type Set Aside Description'] = df['Type Set Aside Description'].str.replace('.', '')
-    
-    # Rename column "6M Desription of Requirement" to "Requirements Description"
-    df = df.rename(columns={"6M Description of Requirement": "Requirements Description"})
-        
-    # Rename column "Current Completion Date" to "Exipriation"
-    df = df.rename(columns={"Current Completion Date": "Expiration"})
-    
-    # Rename column "Small Business Actions" to "Size Status"
-    df = df.rename(columns={"Small Business Actions": "Size Status"})
-    
-    # Within Size Status column, replace "0" with "OTSB" and "1" with "SB"
-    df['Size Status'] = df['Size Status'].replace({0: 'OTSB', 1: 'SB'})
-    
-    # Rename column "Small Business Dollars" to "SB Dollars"
-    df = df.rename(columns={"Small Business Dollars": "SB Dollars"})
-        
-    # Remove any value after the six digit in the NAICS column
-    df['NAICS'] = df['NAICS'].astype(str).str[:6]   
-    
-    # # Remove unique_values "Modification", "MATOC", "SATOC" from the 'Contract Action Type' column
-    # df = df[~df['Contract Action Type'].str.upper().isin(["MODIFICATION", "MATOC", "SATOC"])]
+    # Fingerprint every raw row so the next pull can be compared against this one.  The rows are fingerprinted with the VCE schema types, so the fingerprints do not depend on the types pandas would infer from each pull.
+    empty_rows = df.isna().all(axis=1)
+    if empty_rows.any():
+        df = df.loc[~empty_rows]
+    df = add_row_fingerprints(df)
 
-    # If a blank value exsits in "10N Type Set Aside Description" replace it with "NO SET ASIDE USED."
-    df['Type Set Aside Description'] = df['Type Set Aside Description'].fillna("NO SET ASIDE USED")
+    # Define the stored data source from the last refresh
+    destination_file = os.path.join(destination_folder, 'data_source.parquet')
+    stored_df = None
+    if incremental and os.path.exists(resolve_interim_file(destination_file)):
+        stored_df = read_interim_dataset(destination_file)
+        if 'Row Hash' not in stored_df.columns:
+            stored_df = None
 
-    # Convert the 'Expiration' column to datetime to match format with today_date and make it only 10 characters long
-    df['Expiration'] = df['Expiration'].str[:10]
-    df['Expiration'] = pd.to_datetime(df['Expiration'], errors='coerce')
-    
-    # Convert the "Award Date" column to datetime to match format with today_date
-    df['Award Date'] = pd.to_datetime(df['Award Date'], errors='coerce')
+    if stored_df is None:
+        # Clean the whole pull
+        df = transform_contract_data(df)
+    else:
+        # Split the pull into the rows already stored and the rows that are new or changed
+        is_stored = df['Row Hash'].isin(stored_df['Row Hash'])
+        changed_df = df.loc[~is_stored]
+        is_kept = stored_df['Row Hash'].isin(df['Row Hash'])
+        changed_keys = changed_df['Row Key'].isin(stored_df['Row Key'])
+        removed_keys = ~is_kept & ~stored_df['Row Key'].isin(df['Row Key'])
+        print(f"Incremental refresh: {int(is_kept.sum())} unchanged, {int((~changed_keys).sum())} new, {int(changed_keys.sum())} changed, and {int(removed_keys.sum())} removed rows.")
 
-    # For each row, calulate the number of months remaining to complete the contract and input the number of months remaining in the 'Months Remaining' column
-    df['Months Remaining'] = (df['Expiration'] - pd.Timestamp.today()).dt.days // 30
+        # Only clean the new and changed rows, then merge them with the unchanged stored rows
+        changed_df = transform_contract_data(changed_df, drop_empty_columns=False)
+        changed_contracts = pd.concat([changed_df['Contract No'], stored_df.loc[~is_kept, 'Contract No']]).astype(str).unique()
+        stored_df = stored_df.loc[is_kept]
 
-    # Add a new column next to the 'Current Completion' column and insert the 'Months Remaining' column
-    df.insert(df.columns.get_loc('Expiration') + 1, 'Months Remaining', df.pop('Months Remaining'))
-    
-    # Save the cleaned data copy to the cleansed data folder using the destination_folder argument
-    df.to_csv(os.path.join(destination_folder, 'data_source.csv'), index=False)
+        # Give both sides the same categories so the merged columns stay categories instead of being converted back to text
+        for column in stored_df.columns.intersection(changed_df.columns):
+            if isinstance(stored_df[column].dtype, pd.CategoricalDtype) and isinstance(changed_df[column].dtype, pd.CategoricalDtype):
+                categories = stored_df[column].cat.categories.union(changed_df[column].cat.categories)
+                stored_df[column] = stored_df[column].cat.set_categories(categories)
+                changed_df[column] = changed_df[column].cat.set_categories(categories)
 
-    # If any older files exist call the remove_old_files function and remove them
-    remove_old_files(destination_folder, '*.csv')
+        df = pd.concat([stored_df, changed_df], ignore_index=True)
+
+        # Update the months remaining for the stored rows since the last refresh
+        df['Months Remaining'] = calculate_months_remaining(df['Expiration'])
+
+    # Save the cleaned data copy to the cleansed data folder using the destination_folder argument.  The interim folder also holds the other interim datasets, so old files are no longer removed here.
+    write_interim_dataset(df, destination_file, export_csv=export_csv)
+
+    # Update the stored modification index for only the contracts with new, changed, or removed rows
+    if stored_df is not None and os.path.exists(modification_index_file(destination_file)):
+        build_modification_index(destination_file, contracts=changed_contracts)
+
+    # Report the time and the peak memory of the clean
+    run_recorder.set_rows(rows_out=len(df))
+    peak_memory = peak_memory_mb()
+    print(f"Cleaned {len(df)} rows in {time.perf_counter() - start_time:.1f} seconds" + (f" (peak memory {peak_memory:.0f} MB)." if peak_memory is not None else "."))
     
     return df
     
     # Example usage of the clean_data function
     # df = clean_data(df, 'path/to/destination_folder')
     
-# This function will make a copy of the cleaned data and move it to the "targets" folder which is in the "processed" data folder.  This data will be used to sort for the targeted contracts within the next 6-18 months for contract profile development.  This includes Full and Opens that were awarded to SBs, SBSAs with potential for socio set asides.
-def insights_unrestricted_awarded_to_sb() -> None:
+# Insight engine.  Each insight target list is declared as a named predicate over the cleansed data source with the register_insight decorator.  run_insights reads the cleansed data source once, evaluates every predicate in one vectorized pass, and writes all of the target lists together, so adding an insight does not add another read of the data.
+insight_definitions = {}
+
+# This decorator registers an insight target list.
+def register_insight(name: str, file_key: str, sort_by: str = 'Months Remaining'):
     """
-    Process the data to sort for the targeted contracts.
+    Register a function as the predicate of an insight target list.
 
     Args:
-    df (pd.DataFrame): The DataFrame containing the data to be processed.
+    name (str): The insight name.
+    file_key (str): The common_folders key of the target list file.
+    sort_by (str): The column the target list is sorted by (ascending).
+
+    Returns:
+    function: The decorator.  The decorated function takes the cleansed DataFrame and the shared insight_terms and returns a boolean Series of the target rows.
+    """
+    def decorator(predicate):
+        insight_definitions[name] = {'predicate': predicate, 'file_key': file_key, 'sort_by': sort_by}
+        return predicate
+    return decorator
+
+# This function computes the filters shared by several insights once per run.
+def insight_terms(df: pd.DataFrame) -> dict:
+    """
+    Compute the boolean filters the insight predicates are built from.
+
+    Args:
+    df (pd.DataFrame): The cleansed data source.
+
+    Returns:
+    dict: A boolean Series for each filter, aligned to df.
+    """
+    set_aside = df['Type Set Aside Description'].astype('string').str.upper().fillna('')
+    months_remaining = df['Months Remaining']
+
+    return {
+        # Awards only.  Modifications are not new awards.
+        'award': (df['Contract Action Type'].astype('string').str.upper() != "MODIFICATION").fillna(True),
+        # The contracts that expire in the next 6 to 18 months
+        'target window': ((months_remaining >= 6) & (months_remaining <= 18)).fillna(False),
+        # The contracts that are still active
+        'active': (months_remaining > 0).fillna(False),
+        # Full and Opens ("NO SET ASIDE USED" or blank)
+        'unrestricted': set_aside.isin(["NO SET ASIDE USED", ""]),
+        # Total and partial small business set-asides (not the socio-economic set-asides)
+        'sb set aside': set_aside.str.contains(r'^(?:TOTAL |PARTIAL )?SMALL BUSINESS SET[- ]?ASIDE', regex=True),
+        # Everything that was not awarded to an other than small business
+        'not otsb': (df['Size Status'].astype('string') != "OTSB").fillna(True),
+    }
+
+# Insights Target1 are Full and Opens that were ultimately awarded to SBs and expire in the next 6 to 18 months.
+@register_insight("Insights Target1", 'insight_unrestricted_awarded_to_sb_file')
+def target_unrestricted_awarded_to_sb(df: pd.DataFrame, terms: dict) -> pd.Series:
+    """
+    Select the Full and Open awards made to SBs that expire in the next 6 to 18 months.
+    """
+    return terms['award'] & terms['unrestricted'] & terms['target window'] & terms['not otsb']
+
+# Insights Target2 are SB set-asides awarded to SBs with a socio-economic category, which could be set aside for that category next time.
+@register_insight("Insights Target2", 'insight_sbsa_with_potential_for_socio_set_aside_file')
+def target_sbsa_with_potential_for_socio_set_asides(df: pd.DataFrame, terms: dict) -> pd.Series:
+    """
+    Select the SB set-aside awards made to socio-economic SBs that expire in the next 6 to 18 months.
+    """
+    socio_categories = [category for category in sb_categories.values() if category != 'SB']
+    return terms['award'] & terms['sb set aside'] & terms['target window'] & filter_socio_flags(df['Socio Flags'], socio_categories)
+
+# Insights Target3 are 8(a) awards, both competitive and sole source, that are still active.  The VCE data has no 8(a) exit dates, so the list is sorted by expiration to be screened against the incumbents' program exit dates.
+@register_insight("Insights Target3", 'insight_8a_with_exit_before_expiration_file', sort_by='Expiration')
+def target_8a_with_exit_before_expiration(df: pd.DataFrame, terms: dict) -> pd.Series:
+    """
+    Select the active 8(a) awards.
+    """
+    return terms['award'] & terms['active'] & filter_socio_flags(df['Socio Flags'], ['8(a)'])
+
+# This function builds every registered insight target list from one read of the cleansed data source and saves them to the "processed" data folder.  These target lists are what the contract profiles are built from.
+def run_insights(names: list = None, source_file: str = None, use_analytics_database: bool = False) -> dict:
+    """
+    Build and save the insight target lists.
+
+    Args:
+    names (list): The insights to build.  Defaults to every registered insight.
+    source_file (str): The cleansed data source file.  Defaults to common_folders['cleansed_data_source_file'].
+    use_analytics_database (bool): If True and the analytics database holds the current ACC-RI data source, the target lists are built with indexed queries (see insight_queries) instead of reading the data source.
+
+    Returns:
+    dict: The target list DataFrame of every insight, keyed by the insight name.
+    """
+    names = names or list(insight_definitions)
+    source_file = source_file or common_folders['cleansed_data_source_file']
+
+    if use_analytics_database and os.path.abspath(resolve_interim_file(source_file)) == os.path.abspath(resolve_interim_file(common_folders['cleansed_data_source_file'])) and analytics_database.is_current('acc_ri_actions'):
+        target_dfs = {name: analytics_database.insight(name) for name in names}
+        run_recorder.set_rows(rows_in=analytics_database.tables['acc_ri_actions']['Rows'])
+    else:
+        # Read the cleansed data source once for every insight
+        df = read_interim_dataset(source_file)
+        run_recorder.set_rows(rows_in=len(df))
+
+        # Months Remaining is measured from today, so it is updated in case the data source was cleaned on an earlier day
+        df['Months Remaining'] = calculate_months_remaining(df['Expiration'])
+
+        # Evaluate every predicate before any target list is written
+        terms = insight_terms(df)
+        masks = {name: insight_definitions[name]['predicate'](df, terms) for name in names}
+        target_dfs = {name: df.loc[mask.to_numpy(dtype=bool)].sort_values(by=insight_definitions[name]['sort_by'], ascending=True, kind='stable') for name, mask in masks.items()}
+
+    targets = {}
+    for name, target_df in target_dfs.items():
+        definition = insight_definitions[name]
+
+        # Save the target list.  SB Dollars stays numeric and is formatted as currency when the profiles are rendered.  A CSV copy is saved for review.
+        target_file = common_folders[definition['file_key']]
+        target_folder = os.path.dirname(target_file)
+        os.makedirs(target_folder, exist_ok=True)
+        target_file = write_interim_dataset(target_df, target_file, export_csv=True)
+
+        # If any older files exist call the remove_old_files function and remove them
+        remove_old_files(target_folder, '*.parquet')
+        remove_old_files(target_folder, '*.csv')
+
+        print(f"{name}: {len(target_df)} target contracts saved to: {target_file}")
+        targets[name] = target_df
+
+    run_recorder.set_rows(rows_out=sum(len(target_df) for target_df in targets.values()))
+
+    return targets
+
+# This function builds only the Insights Target1 list: Full and Opens that were awarded to SBs and expire in the next 6 to 18 months.  The pipeline builds every insight at once with run_insights.
+def insights_unrestricted_awarded_to_sb() -> None:
+    """
+    Build and save the Insights Target1 list.
 
     Returns:
     None
     """
-    # Define the targets folder location. If the targets folder does not exist, create it.
-    if not os.path.exists(common_folders['insights_target1_folder']):
-        os.makedirs(common_folders['insights_target1_folder'])
-    
-    # Define the cleansed data source file to create a DataFrame (df)
-    df = pd.read_csv(find_latest_file(common_folders['cleansed_data_source_folder'], '*.csv'))
-    
-    # Filter the DataFrame for rows where 'Contract Action Type' is not "MODIFICATION".
-    df = df[df['Contract Action Type'].str.upper() != "MODIFICATION"]
-           
-    # # Keep "ACC-RI" in the "organization" column.  Remove any other values.
-    # df = df[df['Organization'] == 'ACC-RI']
-    
-    # Ensure the NAICS code is only first six digits
-    df['NAICS'] = df['NAICS'].astype(str).str[:6]
-    
-    # Convert the "SB Dollars" column to currency format
-    df['SB Dollars'] = df['SB Dollars'].map('${:,.2f}'.format)
-    
-     # Within Size Status column, replace "0" with "OTSB" and "1" with "SB"
-    df['Size Status'] = df['Size Status'].replace({0: 'OTSB', 1: 'SB'})
-   
-    # Remove any rows that are not "NO SET ASIDE USED" or blank in the "10N Type Set Aside Description" column
-    df = df[df['Type Set Aside Description'].isin(["NO SET ASIDE USED", ""])]
-    
-    # Remove any rows with Months reaminining less than 6 months and more than 18 months
-    df = df[(df['Months Remaining'] >= 6) & (df['Months Remaining'] <= 18)]
-    
-    # Remove any rows with "OTSB in the "Size Status"
-    df = df[df['Size Status'] != "OTSB"]
-    
-    # Sort "Months Remaining" in ascending order
-    df = df.sort_values(by='Months Remaining', ascending=True)
-    
-    # Save the target processed data copy to the targets data folder
-    df.to_csv(os.path.join(common_folders["insights_target1_folder"], 'insights_target1.csv'), index=False)
-    
-    # If any older files exist call the remove_old_files function and remove them
-    remove_old_files(common_folders['insights_target1_folder'], '*.csv')
+    run_insights(["Insights Target1"])
     
 # Create a dictionary of Contract Profile Data Elements to populate the Contract Profile Data Elements table in the Contract Profile Word Document.
 contract_profile_data_elements = {
     "1A" : "Contract No",
     "1A2" : "Order No",
     "1B" : "Modification No",
+    "1B2" : "Modification Count",
+    "1B3" : "Last Modification Date",
     "2A" : "Award Date",
     "2B" : "Effective Date",
     "2D" : "Expiration",
@@ -335,6 +910,7 @@ contract_profile_data_elements = {
     "SB$" : "SB Dollars",
     "STS" : "Size Status", #originally "Small Business Actions" (0 = OTSB and 1 = SB)
     "FC" : "Forecast No", # Identify the forecast solicitation/PANCOC number
+    "FCV" : "Forecasted Value", # Forecasted contract value of the follow-on
     "PCF" : "PCF Cabinet", #Provide link to PCF Cabinet
     # "FCL" : "Forecast Link", #Provide link to Forecast PCF Cabinet
 }
@@ -350,47 +926,171 @@ sb_categories = {
     "hz" : "HUBZone",
 }
 
-sb_profile_analysis_elements = {
-    "IT" : "IT Buy", 
-    "ITSS" : "IT Services SONA",
-    "SComp" : "Strong Competition",
-    "SStd" : "Size Standard",
-    "TNAICS:" : "Top NAICS",
-    "TgtNAICS" : "Target NAICS",
-    "WElg" : "WOSB Eligible",
-    # "SoSSElg" : "Socio SS Eligible",
-    "SNAICS" : "Strong NAICS",
-    "WNAICS" : "Weak NAICS",
-    "RIAwd" : "ACC RI Awards", #Awards that went to small under the identified NAICS
-    "AAwd" : "All ACC Awards", #All awards made by ACC across the enterprise
-    "SkR" : "Subcontract MQRs Realistic",
-    "AwdSB" : "Awardee SB",
-    "AwdSoc" : "Awardee Socio",
-    "Mult" : "Multiple Products or Services",
-    "NMRW" : "NMR Waiver Available", #Does an NMR waiver exist based on NAICS
-    "NMRP" : "NMR Potential", #Potential for NMR based on requirements
-    "FinC" : "Financial Risk", #Financial risk to industry based on distribution of SB awards under identified NAICS
-    # "Rmks" : "Remarks"
+# Define a dictionary mapping the socio-economic action columns to their corresponding categories
+socioeconomic_columns = {
+    'SDB Concern Actions': 'SDB',
+    'Service Disabled Veterans Actions': 'SDVOSB',
+    'Women Owned Actions': 'WOSB',
+    'HUB Zone Actions': 'HUBZone'
 }
 
-# def add_hyperlink(paragraph, text, url):
-#     """
-#     Add a hyperlink to a paragraph.
+# Each sb_categories flag is one bit of the 'Socio Flags' column (SB = 1, SDB = 2, WOSB = 4, EDWOSB = 8, VOSB = 16, SDVOSB = 32, 8(a) = 64, HUBZone = 128)
+sb_category_bits = {category: 1 << position for position, category in enumerate(sb_categories.values())}
 
-#     Args:
-#     paragraph (docx.text.paragraph.Paragraph): The paragraph to add the hyperlink to.
-#     text (str): The text to display for the hyperlink.
-#     url (str): The URL to link to.
+# The set-aside descriptions that identify the categories without an action column in the VCE data (8(a), EDWOSB, and VOSB), and the ones that also confirm the other categories
+socio_set_aside_patterns = {
+    'SDB': r'SMALL DISADVANTAGED|\bSDB\b',
+    'WOSB': r'WOMEN|\bWOSB\b',
+    'EDWOSB': r'ECONOMICALLY DISADVANTAGED WOMEN|\bEDWOSB\b',
+    'VOSB': r'VETERAN|\bVOSB\b',
+    'SDVOSB': r'SERVICE[- ]DISABLED|\bSDVOSB\b',
+    '8(a)': r'8\s*\(?A\)?',
+    'HUBZone': r'HUB ?ZONE',
+}
 
-#     Returns:
-#     None
-#     """
+# The 256 possible 'Socio Flags' values decoded to their comma separated socio categories (SB is not a socio category).  Decoding a column is then a single array lookup.
+socio_flag_labels = np.array([', '.join(category for category, bit in sb_category_bits.items() if category != 'SB' and flags & bit) or "None" for flags in range(256)], dtype=object)
 
-#     # Create a new run for the hyperlink
-#     run = paragraph.add_run()
-#     run.text = text
-    
-#     # Create the hyperlink element
+# This function packs every sb_categories flag of every row into one uint8 'Socio Flags' value.  SB comes from the Size Status, SDB, SDVOSB, WOSB and HUBZone from their action columns, and 8(a), EDWOSB and VOSB (which have no action column) from the set-aside description.
+def encode_socio_flags(df: pd.DataFrame) -> pd.Series:
+    """
+    Build the 'Socio Flags' bitmask of every row.
+
+    Args:
+    df (pd.DataFrame): Rows with the 'Size Status', socioeconomic action, and 'Type Set Aside Description' columns.  Missing columns are treated as not set.
+
+    Returns:
+    pd.Series: The uint8 bitmask of every row, see sb_category_bits.
+    """
+    flags = np.zeros(len(df), dtype=np.uint8)
+
+    if 'Size Status' in df.columns:
+        flags |= np.where(df['Size Status'].astype(object) == "SB", sb_category_bits['SB'], 0).astype(np.uint8)
+
+    for column, category in socioeconomic_columns.items():
+        if column in df.columns:
+            flags |= np.where(pd.to_numeric(df[column], errors='coerce').fillna(0).to_numpy() > 0, sb_category_bits[category], 0).astype(np.uint8)
+
+    if 'Type Set Aside Description' in df.columns:
+        set_asides = df['Type Set Aside Description'].astype('string').str.upper()
+        for category, pattern in socio_set_aside_patterns.items():
+            flags |= np.where(set_asides.str.contains(pattern, regex=True).fillna(False).to_numpy(dtype=bool), sb_category_bits[category], 0).astype(np.uint8)
+
+    # Every SDVOSB is also a VOSB
+    flags |= np.where(flags & sb_category_bits['SDVOSB'], sb_category_bits['VOSB'], 0).astype(np.uint8)
+
+    return pd.Series(flags, index=df.index, name='Socio Flags')
+
+# This function decodes a 'Socio Flags' column back to the comma separated socio categories.
+def decode_socio_flags(flags: pd.Series) -> pd.Series:
+    """
+    Decode the 'Socio Flags' bitmask to the socio categories.
+
+    Args:
+    flags (pd.Series): The 'Socio Flags' column.
+
+    Returns:
+    pd.Series: The comma separated socio categories of every row (for example "SDB, 8(a)"), or "None".
+    """
+    return pd.Series(socio_flag_labels[flags.fillna(0).to_numpy(dtype=np.uint8)], index=flags.index)
+
+# This helper function gives the bitmask of a list of sb_categories values.
+def socio_flag_mask(categories: list) -> int:
+    """
+    Get the bitmask of a list of categories.
+
+    Args:
+    categories (list): sb_categories values, for example ['WOSB', 'EDWOSB'].
+
+    Returns:
+    int: The bits of the categories combined.
+    """
+    mask = 0
+    for category in categories:
+        mask |= sb_category_bits[category]
+
+    return mask
+
+# This function filters rows by their socio categories with a single bitwise operation on the 'Socio Flags' column.
+def filter_socio_flags(flags: pd.Series, categories: list, match: str = 'any') -> pd.Series:
+    """
+    Check which rows have the given categories.
+
+    Args:
+    flags (pd.Series): The 'Socio Flags' column.
+    categories (list): sb_categories values, for example ['SDVOSB', 'HUBZone'].
+    match (str): 'any' if one of the categories is enough, 'all' if every category is required.
+
+    Returns:
+    pd.Series: A boolean mask of the rows.
+    """
+    mask = socio_flag_mask(categories)
+    values = flags.fillna(0).to_numpy(dtype=np.uint8)
+
+    if match == 'all':
+        return pd.Series((values & mask) == mask, index=flags.index)
+
+    return pd.Series((values & mask) != 0, index=flags.index)
+
+# This function counts the rows in every sb_categories category with one bitwise operation per category.
+def count_socio_flags(flags: pd.Series) -> pd.Series:
+    """
+    Count the rows in every category.
+
+    Args:
+    flags (pd.Series): The 'Socio Flags' column.
+
+    Returns:
+    pd.Series: The number of rows of every sb_categories value.
+    """
+    values = flags.fillna(0).to_numpy(dtype=np.uint8)
+    return pd.Series({category: int(np.count_nonzero(values & bit)) for category, bit in sb_category_bits.items()})
+
+sb_profile_analysis_elements = {
+    "IT" : "IT Buy", 
+    "ITK" : "IT Keywords", #IT Buy keywords found in the descriptions
+    "ITSS" : "IT Services SONA",
+    "SComp" : "Strong Competition",
+    "SStd" : "Size Standard",
+    "TNAICS:" : "Top NAICS",
+    "TgtNAICS" : "Target NAICS",
+    "WElg" : "WOSB Eligible",
+    # "SoSSElg" : "Socio SS Eligible",
+    "SNAICS" : "Strong NAICS",
+    "WNAICS" : "Weak NAICS",
+    "RIAwd" : "ACC RI Awards", #Awards that went to small under the identified NAICS
+    "AAwd" : "All ACC Awards", #All awards made by ACC across the enterprise
+    "SkR" : "Subcontract MQRs Realistic",
+    "AwdSB" : "Awardee SB",
+    "AwdSoc" : "Awardee Socio",
+    "AwdSB$" : "Awardee SB Dollars", #Total SB dollars of the awardee across the ACC-RI and Army data sources
+    "AwdNAICS" : "Awardee NAICS Spread", #Number of NAICS the awardee won awards under and its top NAICS
+    "AwdWins" : "Awardee Recent Wins", #Awards the awardee won in the last three fiscal years
+    "Mult" : "Multiple Products or Services",
+    "NMRW" : "NMR Waiver Available", #Does an NMR waiver exist based on NAICS
+    "NMRP" : "NMR Potential", #Potential for NMR based on requirements
+    "FinC" : "Financial Risk", #Financial risk to industry based on distribution of SB awards under identified NAICS
+    # "Rmks" : "Remarks"
+}
+
+# def add_hyperlink(paragraph, text, url):
+#     """
+#     Add a hyperlink to a paragraph.
+
+#     Args:
+#     paragraph (docx.text.paragraph.Paragraph): The paragraph to add the hyperlink to.
+#     text (str): The text to display for the hyperlink.
+#     url (str): The URL to link to.
+
+#     Returns:
+#     None
+#     """
+
+#     # Create a new run for the hyperlink
+#     run = paragraph.add_run()
+#     run.text = text
+    
+#     # Create the hyperlink element
 #     hyperlink = run._r
 #     hyperlink.add_rPr()
 #     hyperlink.rPr.add_hlinkClick(url, qn('r:id'), qn('r:uri'))
@@ -416,869 +1116,3963 @@ def set_cell_font(cell, font_name='Calibri', font_size=9, bold=False, color=None
             run.font.size = Pt(font_size)
             run.bold = bold
             if color:
-                run.font.color.rgb = RGBColor(*color) 
+                run.font.color.rgb = RGBColor(*color)
 
-def check_size_standard(df, contract_no) -> str:
+# This helper function normalizes a NAICS value to the six-digit string used as the key for all of the NAICS lookups.  NAICS values come through as int, float (541330.0), or text with exception notes (541330 (Exception 1)).
+def normalize_naics(naics) -> str:
     """
-    Check if the NAICS code value is present in the Size Standard listing (size_standard_list.xlsx).
+    Normalize a NAICS value to its six-digit string form.
 
     Args:
-    df (pd.DataFrame): The DataFrame containing the data to be processed.
-    contract_no (str): The contract number being processed.
+    naics: The NAICS value to normalize (int, float, or str).
 
     Returns:
-    str: Value from from the 'Size standards in millions of dollars' column.  If 'Size standards in millions of dollars' is not present, return value from 'Size standards in number of employees' column.  If the NAICS value is not present, return "No".
-    """
-    
-    # Select the 'NAICS' value from the DataFrame based on the current contract number being processed
-    naics = df.loc[df['Contract No'] == contract_no, 'NAICS'].values[0]
-    
-    # makre sure naics is a string and only the first six digits are used
-    naics = str(naics)[:6]
-
-    # Read the Size Standard listing
-    size_standard_df = pd.read_csv(common_folders['size_standard_list'])
-    
-    # Remove any value after the six digit in the NAICS Code column
-    size_standard_df['NAICS Code'] = size_standard_df['NAICS Codes'].astype(str).str[:6]
-    
-    # Make sure the "Size standards in millions of dollars" column is string type
-    size_standard_df['Size standards in millions of dollars'] = size_standard_df['Size standards in millions of dollars'].astype(str)
-    
-    # Make sure the "Size standards in number of employees" column is string type
-    size_standard_df['Size standards in number of employees'] = size_standard_df['Size standards in number of employees'].astype(str)
-    
-    # Check if naics is in the size_standard_df['NAICS Codes'] column. Search the 'Size standards in millions of dollars' column for a value. If a value exists return that value. If no value found move over one column and return its value.  Otherwise, return naics not found message
-    if naics in size_standard_df['NAICS Codes'].values:
-        if size_standard_df.loc[size_standard_df['NAICS Code'] == naics, 'Size standards in millions of dollars'].values[0] != 'nan':
-            return str(size_standard_df.loc[size_standard_df['NAICS Code'] == naics, 'Size standards in millions of dollars'].values[0]).strip() + "M"
-        else:
-            return str(size_standard_df.loc[size_standard_df['NAICS Code'] == naics, 'Size standards in number of employees'].values[0]).strip() + " Employees"
-    else:
-        return f'{naics} not found'  
-     
-def check_wosb_naics(df, contract_no) -> str:
+    str: The first six digits of the NAICS value.
     """
-    Check if the NAICS code value is present in the Underrepresented WOSB NAICS listing (wosb_naics_list.xlsx).
+    naics = str(naics).strip()
 
-    Args
-    Datframe (df): The NAICS value to be checked based on the current contract number being processed.  Should be insight_target.csv.
-    
-    Contract_no (str): The contract number being processed in create_contract_profiles() function.
+    # Remove the trailing ".0" that pandas adds when the NAICS column is read as a float
+    if naics.endswith('.0'):
+        naics = naics[:-2]
 
-    Returns:
-    str: "WOSB" or "EDWOSB" from the 'Set-Aside' column if the NAICS value is present, "No" otherwise.
-    """
-    
-    # Select the NAICS value from the DataFrame based on the current contract number being processed
-    naics = df.loc[df['Contract No'] == contract_no, 'NAICS'].values[0]
-    # makre sure naics is a string and only the first six digits are used
-    naics = str(naics)[:6]
-        
-    # Read the WOSB NAICS listing
-    wosb_naics_df = pd.read_csv(common_folders['wosb_naics_list'])
-    
-    # Remove any value after the six digit in the NAICS Code column
-    wosb_naics_df['NAICS Code'] = wosb_naics_df['NAICS Code'].astype(str).str[:6]
-    
-    # Make sure the "Set-aside" column is string type
-    wosb_naics_df['Set-aside'] = wosb_naics_df['Set-aside'].astype(str)
-    
-    # Check if naics is in the wosb_naics_df['NAICS Code'] column. If yes, return the value in the 'Set-aside' column. If no, return "No"
-    if naics in wosb_naics_df['NAICS Code'].values:
-        return wosb_naics_df.loc[wosb_naics_df['NAICS Code'] == naics, 'Set-aside'].values[0]
-    else:
-        return "No"
+    return naics[:6]
 
-def check_if_awardee_sb(df, contract_no) -> str:
+# This helper function normalizes a whole NAICS column.  The NAICS is a category in the interim datasets, so the result is converted to plain text for the batch lookups.
+def normalize_naics_column(naics: pd.Series) -> pd.Series:
     """
-    Check if the awardee is a small business based on the 'Size Status' column.
+    Normalize a NAICS column to six-digit strings.
 
     Args:
-    df (pd.DataFrame): The DataFrame containing the data to be processed.
-    contract_no (str): The contract number being processed.
+    naics (pd.Series): The NAICS column (int, float, str, or category).
 
     Returns:
-    str: "SB" if the awardee is a small business, "No" otherwise.
+    pd.Series: The six-digit NAICS strings.
     """
-    
-    # Select the 'Size Status' value from the DataFrame based on the current contract number being processed
-    size_status = df.loc[df['Contract No'] == contract_no, 'Size Status'].values[0]
-    
-    # Check if the 'Size Status' value is "SB". If yes, return "Yes". If no, return "No"
-    if size_status == "SB":
-        return "Yes"
-    else:
-        return "No"
-    
-def check_awardee_socioeconomic_status(df, contract_no) -> str:
+    return naics.map(normalize_naics).astype(str)
+
+# This helper function returns the modification time of a file and, when asked, the hash of its contents.  It is used to determine if a reference file has changed since it was last loaded.
+def file_signature(file_path: str, include_hash: bool = False) -> tuple:
     """
-    Check if the awardee is a socio-economic status based on the 'Size Status' column.
+    Get the signature of a file based on its modification time and optionally the hash of its contents.
 
     Args:
-    df (pd.DataFrame): The DataFrame containing the data to be processed.
-    contract_no (str): The contract number being processed.
+    file_path (str): The path to the file.
+    include_hash (bool): If True, the MD5 hash of the file contents is included in the signature.
 
     Returns:
-    str: All socio categories they are identified as based on the "WOSB", "EDWOSB", "VOSB", "SDVOSB", "8(a)", "HUBZone", or "No" based on the socio-economic status.  If multiple categories are identified, they will be separated by a comma.
+    tuple: (mtime, md5 hash or None).
     """
-    
-    # Select the 'Size Status' value from the DataFrame based on the current contract number being processed
-    socioeconomic_status = df.loc[df['Contract No'] == contract_no, 'Size Status'].values[0]
-    
-    # Create a list of all socioeconomic status the Awardee is.  Check the "SDB Concern Action", "Service Disabled Veterans Actions", "Women Owned Actions", and "HUB Zone Actions" columns to determine size status.  If the value is "1" then the Awardee is that socio-economic status and add it to the list. After reviewing all columns, return the list of socio-economic status as string seperated by a comma based on list and if list is empty return "None".
-    socioeconomic_categories = []
-    
-    # Define a dictionary mapping column names to their corresponding categories
-    socioeconomic_columns = {
-        'SDB Concern Actions': 'SDB',
-        'Service Disabled Veterans Actions': 'SDVOSB',
-        'Women Owned Actions': 'WOSB',
-        'HUB Zone Actions': 'HUBZone'
-    }
+    mtime = os.path.getmtime(file_path)
 
-    # Iterate through the dictionary and check each column
-    for column, category in socioeconomic_columns.items():
-        if df.loc[df['Contract No'] == contract_no, column].values[0] == 1:
-            socioeconomic_categories.append(category)
-    
-    if socioeconomic_categories:
-        return ', '.join(socioeconomic_categories)
-    else:
-        return "None"
- 
-def check_if_nmr_waiver_available(df, contract_no) -> str:
-    """
-    Check if an NMR waiver exists based on the NAICS code from the current contract being processed.
+    if not include_hash:
+        return (mtime, None)
 
-    Args:
-    df (pd.DataFrame): The DataFrame containing the data to be processed.
-    contract_no (str): The contract number being processed.
+    # Read the file in blocks so large files are not loaded into memory at once
+    md5 = hashlib.md5()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(1024 * 1024), b''):
+            md5.update(block)
 
-    Returns:
-    str: "Yes" if an NMR waiver exists, "No" otherwise.
-    """
-    
-    # Select the 'NAICS' value from the DataFrame based on the current contract number being processed
-    naics = df.loc[df['Contract No'] == contract_no, 'NAICS'].values[0]
-        
-    # makre sure naics is a string and only the first six digits are used
-    naics = str(naics)[:6]
-    
-    # Define path for nmr_waiver_list
-    # wosb_naics_path = common_folders['wosb_naics_list']
-    
-    # Read the nmr_waiver_list (needs to be saved as CSV UTF-8)
-    nmr_waiver_list_df = pd.read_csv(common_folders['nmr_waiver_list'])
-    
-    # Remove any value after the six digit in the NAICS Code column
-    nmr_waiver_list_df['NAICS CODE'] = nmr_waiver_list_df['NAICS CODE'].astype(str).str[:6]
-    
-    # Make sure the "NAICS DESCRIPTOR" column is string type
-    nmr_waiver_list_df['NAICS DESCRIPTOR'] = nmr_waiver_list_df['NAICS DESCRIPTOR'].astype(str)
-    
-    # Check if naics is in the nmr_waiver_list_df['NAICS Code'] column. If yes, return the value in the 'Set-aside' column. If no, return "No"
-    if naics in nmr_waiver_list_df['NAICS CODE'].values:
-        return "Yes"
-        # return nmr_waiver_list_df.loc[nmr_waiver_list_df['NAICS CODE'] == naics, 'NAICS DESCRIPTOR'].values[0]
-    else:
-        return "No"
-    
-def check_acc_ri_awards(df, contract_no) -> str:
+    return (mtime, md5.hexdigest())
+
+# This class records structured timing records of a pipeline run.  Each stage records its wall time, rows in and out, and the peak memory, and each SB Profile Analysis element records its cumulative time and number of calls.  The records are appended to a JSON-lines file so runs can be compared, and a summary table is printed at the end of the run.
+class RunRecorder:
     """
-    Get the number of awards made by ACC-RI to small businesses based on the NAICS code from the current contract being processed.
+    Structured stage and check timing records of a pipeline run.
 
     Args:
-    df (pd.DataFrame): The DataFrame containing the data to be processed.
-    contract_no (str): The contract number being processed.
-
-    Returns:
-    int: The number of awards made.
+    log_file (str): The JSON-lines file the run records are appended to.
     """
-    # Select the 'NAICS' value from the DataFrame based on the current contract number being processed
-    naics = df.loc[df['Contract No'] == contract_no, 'NAICS'].values[0]
-    
-    # makre sure naics is a string and only the first six digits are used
-    naics = str(naics)[:6]
-    # print(naics)
-    # print("")
-    
-    # Read into df the data source file that will be used to develop the percentiles from the SB Dollars column 
-    acc_ri_awards_df = pd.read_csv(common_folders['cleansed_data_source_file'])
-    
-    # Filter df to only show Contract Action Types that are not "MODIFICATION", "SATOC", and "MATOC"
-    acc_ri_awards_df = acc_ri_awards_df[~acc_ri_awards_df['Contract Action Type'].str.upper().isin(["MODIFICATION", "MATOC", "SATOC"])]
-    # print("Dataframe before filter:", acc_ri_awards_df)
-    # print("")
-    
-    # # Ensure the NAICS column is of the same type as naics
-    # acc_ri_awards_df['NAICS'] = acc_ri_awards_df['NAICS'].astype(type(naics))
-   
-    # Ensure the NAICS column is of the same type as naics and only six digits are used
-    acc_ri_awards_df['NAICS'] = acc_ri_awards_df['NAICS'].astype(str).str[:6].astype(type(naics))
 
-    # Ensure the Size Status column is of the same type as "SB"
-    acc_ri_awards_df['Size Status'] = acc_ri_awards_df['Size Status'].astype(str).str.strip()
+    def __init__(self, log_file: str):
+        self.log_file = log_file
+        self.start_run()
 
-    acc_ri_awards_df = acc_ri_awards_df.loc[(acc_ri_awards_df['NAICS'] == naics) & (acc_ri_awards_df['Size Status'] == "SB")]
-    # print("Dataframe after filter:", acc_ri_awards_df)
-    # print("")
-    
-    # If dataframe is empty return "0", else return the number of rows remaining after filter to get the award count
-    if acc_ri_awards_df.empty:
-        return str(0)
-    else:
-        return str(acc_ri_awards_df.shape[0])
-    
-def check_all_acc_awards(df, contract_no):
-    """
-    Get the number of awards made by the Army enterprise to small businesses based on the NAICS code from the current contract being processed.
+    def start_run(self) -> None:
+        """
+        Start a new run.  The records of the previous run are cleared.
+        """
+        self.run_id = f"{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+        self.stages = []
+        self.checks = {}
+        self._active_stages = []
 
-    Args:
-    df (pd.DataFrame): The DataFrame containing the data to be processed.
-    contract_no (str): The contract number being processed.
+    def write(self, records: list) -> None:
+        """
+        Append records to the run log.
 
-    Returns:
-    int: The number of awards made.
-    """
-    # Select the 'NAICS' value from the DataFrame based on the current contract number being processed
-    naics = df.loc[df['Contract No'] == contract_no, 'NAICS'].values[0]
-    
-    # makre sure naics is a string and only the first six digits are used
-    naics = str(naics)[:6]
-    # print(contract_no)
-    # print(naics)
-    # print("")
-    
-    # Only read the 'NAICS', 'Size Status', and ' columns into df the data source file that will be used to determine award count.
-    acc_awards_df = pd.read_csv(common_folders['cleansed_all_army_data_source_file'], usecols=['NAICS', 'Size Status', 'Contract Action Type'])
-    # acc_awards_df = pd.read_csv(common_folders['cleansed_all_army_data_source_file'])
-  
-    # Remove unique_values "Modification", "MATOC", "SATOC" from the 'Contract Action Type' column
-    acc_awards_df = acc_awards_df[~acc_awards_df['Contract Action Type'].str.upper().isin(["MODIFICATION", "MATOC", "SATOC"])]
-    
-    # # Rename column "Small Business Actions" to "Size Status"
-    # acc_awards_df = acc_awards_df.rename(columns={"Small Business Actions": "Size Status"})
-    
-    # # Within Size Status column, replace "0" with "OTSB" and ">0" with "SB"
-    # acc_awards_df['Size Status'] = acc_awards_df['Size Status'].replace({0: 'OTSB', 1: 'SB'})
-                      
-    # Ensure the NAICS column is of the same type as naics and only six digits are used
-    acc_awards_df['NAICS'] = acc_awards_df['NAICS'].astype(str).str[:6].astype(type(naics))
-    # acc_awards_df['NAICS'] = acc_awards_df['NAICS'].astype(type(naics))
-        
-    # Ensure the Size Status column is of the same type as "SB" and only six digits are used
-    acc_awards_df['Size Status'] = acc_awards_df['Size Status'].astype(str).str.strip()
-    
-    # print("Dataframe before filter:", acc_awards_df)
-    # print("")
-    # Filter the acc_awards_df based on the naics identified from the contract being processed
-    acc_awards_df = acc_awards_df.loc[(acc_awards_df['NAICS'] == naics) & (acc_awards_df['Size Status'] == "SB")]
-    # print("Dataframe after filter:", acc_awards_df)
-    # print("")
-    
-    # If dataframe is empty return "0", else return the number of rows remaining after filter to get the award count
-    if acc_awards_df.empty:
-        return str(0)
-    else:
-        return str(acc_awards_df.shape[0])
-    
-def check_financial_risk(df, contract_no) -> str:
-    """
-    Check the financial risk to industry based on the distribution of SB dollars against the identified NAICS.
-    Percentiles will be 50% for Low, 75% for Medium, and 90% and above for High. 
+        Args:
+        records (list): The records (dicts) to append, one JSON line each.
+        """
+        os.makedirs(os.path.dirname(self.log_file), exist_ok=True)
+        with open(self.log_file, 'a') as log:
+            for record in records:
+                log.write(json.dumps(record, default=str) + '\n')
 
-    Args:
-    df (pd.DataFrame): The DataFrame containing the data to be processed.
-    contract_no (str): The contract number being processed.
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        """
+        Time a pipeline stage.  The stage record is written when the stage ends, even if it fails.
 
-    Returns:
-    str: "High", "Medium", "Low", or "No" based on the financial risk.
-    """
-    
-    # Read into df the data source file that will be used to develop the percentiles from the SB Dollars column 
-    # Use the below for testing the logic.  It's a smaller data sample.
-    # cleansed_file_df = pd.read_csv(common_folders['cleansed_data_source_file'])
-    cleansed_file_df = pd.read_csv(common_folders['cleansed_all_army_data_source_file'], usecols=['NAICS', 'Size Status', 'SB Dollars'])
-    
-    # Define the NAICS values from the DataFrame argument (NOT THE FULL RAW CLEANSED FILE) based on the current contract number being processed.  This will be used to sort the cleansed_file_df to get the percentiles.
-    naics = df.loc[df['Contract No'] == contract_no, 'NAICS'].values[0]
-    
-    # # Print the unique values in the 'NAICS' column to verify the expected value is present
-    # print("Unique NAICS values in the DataFrame:", df['NAICS'].unique())
-    # print("")
-    # print(contract_no)
-    # print(naics)
-    # print("")
+        Args:
+        name (str): The stage name.
 
-    # Make sure the 'SB Dollars' column is numeric from the DataFrame argument (NOT THE FULL RAW CLEANSED FILE).  This value will be used to compare against the percentiles from the cleansed_file_df.
-    # Ensure 'SB Dollars' column is string before removing currency formatting
-    df['SB Dollars'] = df['SB Dollars'].astype(str)
+        Returns:
+        The context manager.  It yields the stage record, whose 'rows_in' and 'rows_out' can be set by the stage (see set_rows).
+        """
+        record = {'run_id': self.run_id, 'record': 'stage', 'stage': name, 'status': 'completed', 'started': datetime.datetime.now().isoformat(timespec='seconds'), 'seconds': None, 'rows_in': None, 'rows_out': None, 'peak_rss_mb': None}
+        self._active_stages.append(record)
+        start_time = time.perf_counter()
+        try:
+            yield record
+        except Exception as error:
+            record['status'] = 'failed'
+            record['error'] = f"{type(error).__name__}: {error}"
+            raise
+        finally:
+            self._active_stages.remove(record)
+            record['seconds'] = round(time.perf_counter() - start_time, 3)
+            # The peak memory is the peak of the process up to the end of the stage
+            peak_memory = peak_memory_mb()
+            record['peak_rss_mb'] = round(peak_memory, 1) if peak_memory is not None else None
+            self.stages.append(record)
+            self.write([record])
 
-    # Remove currency formatting from the SB Dollars column
-    df['SB Dollars'] = df['SB Dollars'].str.replace('$', '').str.replace(',', '')
+    def skip_stage(self, name: str) -> None:
+        """
+        Record a stage that was skipped by the stage cache.
 
-    # Convert the SB Dollars column to numeric
-    df['SB Dollars'] = pd.to_numeric(df['SB Dollars'], errors='coerce')
+        Args:
+        name (str): The stage name.
+        """
+        record = {'run_id': self.run_id, 'record': 'stage', 'stage': name, 'status': 'skipped', 'started': datetime.datetime.now().isoformat(timespec='seconds'), 'seconds': 0.0, 'rows_in': None, 'rows_out': None, 'peak_rss_mb': None}
+        self.stages.append(record)
+        self.write([record])
 
-    # Make sure the 'SB Dollars' column is numeric from the DataFrame argument (NOT THE FULL RAW CLEANSED FILE). This value will be used to compare against the percentiles from the cleansed_file_df.
-    sb_dollars = df.loc[df['Contract No'] == contract_no, 'SB Dollars'].values[0]
-    # print('SB Dollars before conversion: ', sb_dollars)
-    
-    # sb_dollars = pd.to_numeric(df.loc[df['Contract No'] == contract_no, 'SB Dollars'].values[0], errors='coerce')
-    # print('SB Dollars after conversion: ', sb_dollars)
-    # print("")
+    def set_rows(self, rows_in: int = None, rows_out: int = None) -> None:
+        """
+        Record the rows read and written by the stage that is running.  Nothing is recorded if no stage is running.  The first rows_in and the last rows_out are kept, so a stage that calls other stage functions reports its own input and output.
 
-    # Filter the cleased_file_df based on the naics identified from the contract being processed and print the filtered result to check if it matches the expected rows
-    filtered_df = cleansed_file_df.loc[(cleansed_file_df['NAICS'] == naics) & (cleansed_file_df['Size Status'] == "SB")]
-    # print("Filtered DataFrame based on NAICS:", filtered_df)
+        Args:
+        rows_in (int): The number of rows the stage read.
+        rows_out (int): The number of rows the stage wrote.
+        """
+        if not self._active_stages:
+            return
+        record = self._active_stages[-1]
+        if rows_in is not None and record['rows_in'] is None:
+            record['rows_in'] = int(rows_in)
+        if rows_out is not None:
+            record['rows_out'] = int(rows_out)
 
-    # Check if the 'SB Dollars' column contains the expected values from the full raw cleansed file (latest_cleansed_file_df)
-    if not filtered_df.empty:
-        # Print the 'SB Dollars' column before conversion
-        # print("SB Dollars column before conversion:", filtered_df['SB Dollars'])
-        
-        # Convert 'SB Dollars' column to numeric values
-        filtered_df.loc[:, 'SB Dollars'] = pd.to_numeric(filtered_df['SB Dollars'], errors='coerce')
-        
-        # Print the 'SB Dollars' column after conversion
-        # print("SB Dollars column after conversion:", filtered_df['SB Dollars'])
-        
-        sb_dollars_values = filtered_df['SB Dollars'].values
-        # print("SB Dollars Values:", sb_dollars_values)
-        
-        # Calculate the percentiles
-        p50 = np.percentile(sb_dollars_values, 50)
-        p75 = np.percentile(sb_dollars_values, 75)
-        p90 = np.percentile(sb_dollars_values, 90)
-        
-        # print(f"50th Percentile (Low Risk): ${p50}")
-        # print(f"75th Percentile (Medium Risk): ${p75}")
-        # print(f"90th Percentile (High Risk): ${p90}")
-        
-        # Determine the risk level for the current contract's SB Dollars
-        if sb_dollars <= p50:
-            risk_level = "Low Risk"
-        elif sb_dollars <= p75:
-            risk_level = "Medium Risk"
-        else:
-            risk_level = "High Risk"
-        
-        return risk_level
+    @contextlib.contextmanager
+    def check(self, element: str, calls: int = 1, rows: int = 0):
+        """
+        Add the time of an SB Profile Analysis element to its cumulative time.
 
-def check_targeted_naics(df, contract_no) -> str:
+        Args:
+        element (str): The element name from sb_profile_analysis_functions.
+        calls (int): The number of function calls the block makes (1 for a batch function, one per record for a check function).
+        rows (int): The number of target rows the block analyzes.
+
+        Returns:
+        The context manager.
+        """
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            totals = self.checks.setdefault(element, {'calls': 0, 'rows': 0, 'seconds': 0.0})
+            totals['calls'] += calls
+            totals['rows'] += rows
+            totals['seconds'] += time.perf_counter() - start_time
+
+    def summary(self) -> tuple:
+        """
+        Get the stage and check records of the run as tables.
+
+        Returns:
+        tuple: (stage DataFrame, check DataFrame).  The checks are sorted by their cumulative time with their share of the total.
+        """
+        stage_df = pd.DataFrame(self.stages, columns=['stage', 'status', 'seconds', 'rows_in', 'rows_out', 'peak_rss_mb'])
+        check_df = pd.DataFrame([{'element': element, **totals} for element, totals in self.checks.items()], columns=['element', 'calls', 'rows', 'seconds'])
+        check_df = check_df.sort_values('seconds', ascending=False).reset_index(drop=True)
+        check_df['seconds'] = check_df['seconds'].round(4)
+        check_df['share'] = (check_df['seconds'] / check_df['seconds'].sum() * 100).round(1) if len(check_df) else []
+        return stage_df, check_df
+
+    def finish(self) -> tuple:
+        """
+        Write the check records and the run total to the run log, print the summary tables, and start a new run.
+
+        Returns:
+        tuple: The (stage DataFrame, check DataFrame) of the finished run.
+        """
+        stage_df, check_df = self.summary()
+        check_records = [{'run_id': self.run_id, 'record': 'check', **row} for row in check_df.to_dict('records')]
+        run_record = {'run_id': self.run_id, 'record': 'run', 'finished': datetime.datetime.now().isoformat(timespec='seconds'), 'seconds': round(float(stage_df['seconds'].sum()), 3), 'stages': len(stage_df), 'failed_stages': int((stage_df['status'] == 'failed').sum())}
+        self.write(check_records + [run_record])
+
+        print(f"\nPipeline run {self.run_id} ({run_record['seconds']:.1f} seconds)")
+        print(stage_df.astype(object).fillna('-').to_string(index=False))
+        if len(check_df):
+            print("\nSB Profile Analysis checks")
+            print(check_df.to_string(index=False))
+        print(f"Run records saved to: {self.log_file}")
+
+        self.start_run()
+        return stage_df, check_df
+
+# Create the run recorder used by the stage cache and the SB Profile Analysis.  Stages and checks that run outside of a recorded stage are still timed, and nothing is written until a stage ends or the run is finished.
+run_recorder = RunRecorder(common_folders['run_log_file'])
+
+# The source of every top-level function and class of a module file, keyed by the file path.  Filled by definition_source.
+definition_sources_cache = {}
+
+# This helper function gets the source of a top-level function or class.  inspect.getsource parses the whole module again for every class, so the module is parsed once and the source of every definition is kept until the file changes.
+def definition_source(value) -> str:
     """
-    Check if the NAICS code value is one of the Targeted Econcomic Sector (first two digits of NAICS) identified.
+    Get the source of a function or class.
 
     Args:
-    df (pd.DataFrame): The DataFrame containing the data to be processed.
-    contract_no (str): The contract number being processed.
+    value: The function or class.
 
     Returns:
-    str:  If NAICS is present, return "Yes". Otherwise, return "No".
+    str: The source, including its decorators.
     """
-    
-    # Select the 'NAICS' value from the DataFrame based on the current contract number being processed
-    naics = df.loc[df['Contract No'] == contract_no, 'NAICS'].values[0]
-    
-    # makre sure naics is a string and only the first two digits are used
-    naics = str(naics)[:2]
-    
-    # Define the targeted NAICS values.  Based on OSBP or Contracting goals.
-    targeted_naics = ['33', '51', '54']
-    
-    # Check if the 'NAICS' value is in the targeted_naics list. If yes, return "Yes". If no, return "No"
-    if naics in targeted_naics:
-        return "Yes"
-    else:
-        return "No"
+    source_file = inspect.getsourcefile(value)
+    signature = file_signature(source_file)
+    cached = definition_sources_cache.get(source_file)
+    if cached is None or cached[0] != signature:
+        with open(source_file, 'r', encoding='utf-8') as file:
+            lines = file.read().splitlines(keepends=True)
+        definitions = {}
+        for node in ast.parse(''.join(lines)).body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                start = min([node.lineno] + [decorator.lineno for decorator in node.decorator_list])
+                definitions[node.name] = ''.join(lines[start - 1:node.end_lineno])
+        cached = (signature, definitions)
+        definition_sources_cache[source_file] = cached
+
+    # Nested and redefined functions are not in the top-level definitions
+    source = cached[1].get(value.__qualname__)
+    return source if source is not None else inspect.getsource(value)
 
-def check_top_naics(df, contract_no) -> str:
+# This function finds the code that a set of functions, classes, and settings runs: their own source and every function, class, and setting of their module they use, directly or through the others.  The stage cache and the profile cache hash it, so an edit only invalidates the stages and profiles whose code it touches.
+def code_dependencies(roots: dict, module_globals: dict, sources: dict = None) -> dict:
     """
-    Check if the NAICS code value is one of the Top 25 NAICS identified by the amount of SB Actions or SB Dollars.
+    Find the code that the roots run.
 
     Args:
-    df (pd.DataFrame): The DataFrame containing the data to be processed.
-    contract_no (str): The contract number being processed.
+    roots (dict): The functions, classes, and settings (such as sb_profile_analysis_functions) to start from, keyed by their name.
+    module_globals (dict): The globals of the module they belong to.
+    sources (dict): The source of every function and class found so far, keyed by the object.  Pass the same dictionary to reuse the sources across calls.
 
     Returns:
-    str:  If NAICS is present, return "Yes". Otherwise, return "No".
+    dict: The source of every function and class (or the value of every setting) keyed by its name.
     """
-    
-    cleansed_file_df = pd.read_csv(common_folders['cleansed_data_source_file'], usecols=['NAICS', 'Size Status', 'SB Dollars'])
-    
-    # Select the 'NAICS' value from the DataFrame based on the current contract number being processed
-    naics = df.loc[df['Contract No'] == contract_no, 'NAICS'].values[0]
-    
-    # makre sure naics is a string and only the first six digits are used
-    naics = str(naics)[:6]
-    
-  
-    # Get the count for top 30% of NAICS based on SB Dollars or SB actions
-    top_naics_count = 25
-    
-    
-    # Make sure the 'SB Dollars' column is numeric from the DataFrame argument (NOT THE FULL RAW CLEANSED FILE).  This value will be used to compare against the percentiles from the cleansed_file_df.
-    # Ensure 'SB Dollars' column is string before removing currency formatting
-    cleansed_file_df['SB Dollars'] = cleansed_file_df['SB Dollars'].astype(str)
+    sources = {} if sources is None else sources
+    module_name = module_globals['__name__']
+    dependencies = {}
+    pending = []
 
-    # Remove currency formatting from the SB Dollars column
-    cleansed_file_df['SB Dollars'] = cleansed_file_df['SB Dollars'].str.replace('$', '').str.replace(',', '')
+    def is_module_code(value) -> bool:
+        return (inspect.isfunction(value) or inspect.isclass(value)) and value.__module__ == module_name
 
-    # Convert the SB Dollars column to numeric
-    cleansed_file_df['SB Dollars'] = pd.to_numeric(cleansed_file_df['SB Dollars'], errors='coerce')
-    
-    # Ensure the 'NAICS' column is of the same type as naics and only six digits are used
-    cleansed_file_df['NAICS'] = cleansed_file_df['NAICS'].astype(str).str[:6].astype(type(naics))
-    
-    # Filter the cleased_file_df based on the naics identified from the contract being processed and print the filtered result to check if it matches the expected rows
-    # filtered_df = cleansed_file_df.loc[(cleansed_file_df['NAICS'] == naics) & (cleansed_file_df['Size Status'] == "SB")]
-    filtered_df = cleansed_file_df.loc[(cleansed_file_df['Size Status'] == "SB")]
-    # print("Filtered DataFrame based on NAICS and Size Status:", filtered_df)
-    # print("")
-    
-    # Define the targeted NAICS values based on the top 30% of unique NAICS based on total SB Dollars
-    filtered_df = filtered_df.groupby('NAICS').agg({'SB Dollars': 'sum'}).reset_index()
-    filtered_df = filtered_df.sort_values(by=['SB Dollars'], ascending=False)
-    top_naics_by_dollars = filtered_df['NAICS'].head(top_naics_count).tolist()
-    # print("Top NAICS by SB Dollars:", top_naics_by_dollars)
-    # print("")
-    
-    # Define the targeted NAICS values based on the top 30% of unique NAICS based on total SB Actions (determined by "Size Status" column).
-    filtered_df = cleansed_file_df.loc[(cleansed_file_df['Size Status'] == "SB")]
-    filtered_df = filtered_df.groupby('NAICS').agg({'Size Status': 'count'}).reset_index()
-    filtered_df = filtered_df.sort_values(by=['Size Status'], ascending=False)
-    top_naics_by_actions = filtered_df['NAICS'].head(top_naics_count).tolist()
-    # print("Top NAICS by SB Actions:", top_naics_by_actions)
-    # print("")
+    def add_code(name: str, value) -> None:
+        if name not in dependencies:
+            if value not in sources:
+                sources[value] = definition_source(value)
+            dependencies[name] = sources[value]
+            pending.append(value)
+
+    # A setting is stored as JSON.  The functions and classes it holds (such as the check functions in sb_profile_analysis_functions) are stored by name and their code is added too.
+    def describe(value):
+        if is_module_code(value):
+            add_code(value.__name__, value)
+            return value.__qualname__
+        if isinstance(value, dict):
+            return {str(key): describe(item) for key, item in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [describe(item) for item in value]
+        if isinstance(value, (set, frozenset)):
+            return sorted((describe(item) for item in value), key=str)
+        if value is None or isinstance(value, (str, int, float, bool)):
+            return value
+        return str(value)
+
+    for name, value in roots.items():
+        if is_module_code(value):
+            add_code(name, value)
+        else:
+            dependencies[name] = json.dumps(describe(value), sort_keys=True)
+
+    while pending:
+        obj = pending.pop()
+
+        # Collect the global names used by the function, or by every method of the class, including their nested functions
+        code_objects = [obj.__code__] if inspect.isfunction(obj) else [member.__code__ for _, member in inspect.getmembers(obj, inspect.isfunction) if member.__module__ == module_name]
+        names = set()
+        while code_objects:
+            code = code_objects.pop()
+            names.update(code.co_names)
+            code_objects.extend(constant for constant in code.co_consts if inspect.iscode(constant))
+
+        for name in sorted(names - set(dependencies)):
+            value = module_globals.get(name)
+            if name.endswith('_cache') or name.startswith('__'):
+                # The *_cache dictionaries are filled while the pipeline runs, so they are not part of the code
+                continue
+            if is_module_code(value):
+                add_code(name, value)
+            elif type(value).__module__ == module_name:
+                # A module-level instance, such as naics_statistics, runs the code of its class
+                add_code(name, type(value))
+            elif isinstance(value, (dict, list, tuple, set, frozenset, str, int, float, bool)):
+                dependencies[name] = json.dumps(describe(value), sort_keys=True)
+
+    return dependencies
+
+# The version of the stage keys.  Increase it to run every stage again on the next run, for example after a change the code versions cannot see (a new package version that changes how the files are read).
+stage_cache_version = 1
+
+# This class records a key for every pipeline stage (convert, clean, each insight, profile analysis, render) in a small JSON manifest.  The key is a hash of the stage's input file contents, its parameters, and the code version of the stage function.  The code version only covers the stage function and the functions, classes, and settings of the module it uses, so an edit to the renderer does not run the convert and clean stages again.  A stage whose key has not changed and whose outputs still exist is skipped.
+class StageCache:
+    """
+    Content-hash cache that skips pipeline stages whose inputs have not changed.
+
+    Args:
+    manifest_file (str): The path to the JSON manifest.
+    code_files (list): Other source files whose contents are part of every stage key.  Defaults to none.
+    """
+
+    def __init__(self, manifest_file: str, code_files: list = None):
+        self.manifest_file = manifest_file
+        self.code_files = code_files or []
+        self.sources = {}
+        self.manifest = {'files': {}, 'stages': {}}
+        if os.path.exists(manifest_file):
+            with open(manifest_file, 'r') as file:
+                self.manifest = json.load(file)
+
+    def file_hash(self, file_path: str) -> str:
+        """
+        Get the MD5 hash of a file's contents.  The hash is only recomputed if the file's modification time or size changed since it was last hashed.
+
+        Args:
+        file_path (str): The path to the file.
+
+        Returns:
+        str: The MD5 hash, or "missing" if the file does not exist.
+        """
+        if not os.path.exists(file_path):
+            return "missing"
+
+        mtime, size = os.path.getmtime(file_path), os.path.getsize(file_path)
+        known = self.manifest['files'].get(file_path)
+        if known is not None and known[0] == mtime and known[1] == size:
+            return known[2]
+
+        _, md5 = file_signature(file_path, include_hash=True)
+        self.manifest['files'][file_path] = [mtime, size, md5]
+
+        return md5
+
+    def code_dependencies(self, function) -> dict:
+        """
+        Find the code a stage function runs: the function and every function, class, and setting of its module it uses, directly or through the others.
+
+        Args:
+        function: The stage function.
+
+        Returns:
+        dict: The source of every function and class (or the value of every setting) keyed by its name.
+        """
+        return code_dependencies({function.__name__: function}, function.__globals__, self.sources)
+
+    def code_version(self, function) -> str:
+        """
+        Get the hash of the code a stage function runs.
+
+        Args:
+        function: The stage function.
+
+        Returns:
+        str: The MD5 hash of the source of the stage function and its dependencies, the stage_cache_version, and the code_files.
+        """
+        code = {
+            'version': stage_cache_version,
+            'dependencies': self.code_dependencies(function),
+            'code_files': [self.file_hash(file_path) for file_path in self.code_files],
+        }
+        return hashlib.md5(json.dumps(code, sort_keys=True).encode()).hexdigest()
+
+    def stage_key(self, stage: str, function, input_files: list, params: dict = None) -> str:
+        """
+        Build the key of a stage from its inputs, parameters, and the code version of its function.
+
+        Args:
+        stage (str): The stage name.
+        function: The function that runs the stage.
+        input_files (list): The files the stage reads.
+        params (dict): The parameters the stage is called with.
+
+        Returns:
+        str: The MD5 hash of the stage key.
+        """
+        key = {
+            'stage': stage,
+            'inputs': {file_path: self.file_hash(file_path) for file_path in input_files},
+            'params': params or {},
+            'code_version': self.code_version(function),
+        }
+        return hashlib.md5(json.dumps(key, sort_keys=True, default=str).encode()).hexdigest()
+
+    def save(self) -> None:
+        """
+        Save the manifest.
+        """
+        os.makedirs(os.path.dirname(self.manifest_file), exist_ok=True)
+        with open(self.manifest_file, 'w') as file:
+            json.dump(self.manifest, file, indent=2)
+
+    def run(self, stage: str, function, input_files: list, output_files: list, params: dict = None, key_values: dict = None):
+        """
+        Run a stage unless its key is unchanged since the last run and its outputs still exist.
+
+        Args:
+        stage (str): The stage name.
+        function: The function that runs the stage.  It is called with params as keyword arguments.
+        input_files (list): The files the stage reads.
+        output_files (list): The files the stage writes.
+        params (dict): The keyword arguments for function.  They are part of the stage key.
+        key_values (dict): Other values that are part of the stage key but are not passed to function (for example today's date for a stage that filters on Months Remaining).
+
+        Returns:
+        The result of function, or None if the stage was skipped.
+        """
+        params = params or {}
+        key = self.stage_key(stage, function, input_files, {**params, **(key_values or {})})
+        previous = self.manifest['stages'].get(stage, {})
+
+        # Skip the stage and reuse its stored outputs
+        if previous.get('key') == key and all(os.path.exists(resolve_interim_file(file_path)) for file_path in output_files):
+            print(f"Skipping {stage}: inputs, parameters, and code are unchanged since {previous.get('completed')}.")
+            run_recorder.skip_stage(stage)
+            return None
+
+        # Run the stage and record its time, rows, and memory.  A stage that returns a DataFrame without reporting its rows out reports the returned rows.
+        with run_recorder.stage(stage) as stage_record:
+            result = function(**params)
+            if stage_record['rows_out'] is None and isinstance(result, pd.DataFrame):
+                stage_record['rows_out'] = len(result)
+
+        # Record the key of the inputs the stage ran with
+        self.manifest['stages'][stage] = {
+            'key': key,
+            'outputs': output_files,
+            'completed': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        self.save()
+
+        return result
+
+# This class loads the Size Standard, WOSB NAICS and NMR Waiver listings once and keeps each as a dictionary keyed by the normalized six-digit NAICS.  The SB Profile Analysis checks use it instead of reading the reference files for every contract.
+class NaicsReference:
+    """
+    Load-once NAICS reference index for the size standard, WOSB and NMR waiver lookups.
+
+    The listings are loaded on the first lookup.  Before each lookup the modification time of every source file is checked; if it changed, the file is hashed and the listings are only reloaded when the contents actually changed.
+
+    Args:
+    size_standard_file (str): The path to the Size Standard listing.
+    wosb_naics_file (str): The path to the Underrepresented WOSB NAICS listing.
+    nmr_waiver_file (str): The path to the NMR Waiver listing.
+    """
+
+    def __init__(self, size_standard_file: str, wosb_naics_file: str, nmr_waiver_file: str):
+        self.source_files = {
+            'size_standard': size_standard_file,
+            'wosb_naics': wosb_naics_file,
+            'nmr_waiver': nmr_waiver_file,
+        }
+        self.size_standards = {}
+        self.wosb_naics = {}
+        self.nmr_waivers = {}
+        self._signatures = {}
+
+    def refresh(self) -> bool:
+        """
+        Reload the listings if any source file changed since it was last loaded.
+
+        Returns:
+        bool: True if the listings were reloaded, False otherwise.
+        """
+        changed = False
+        for name, file_path in self.source_files.items():
+            previous = self._signatures.get(name)
+            mtime, _ = file_signature(file_path)
+
+            # Nothing to do if the file was loaded before and has not been touched since
+            if previous is not None and previous[0] == mtime:
+                continue
+
+            # The file was touched (or never loaded).  Only count it as changed if the contents differ.
+            signature = file_signature(file_path, include_hash=True)
+            if previous is None or previous[1] != signature[1]:
+                changed = True
+            self._signatures[name] = signature
+
+        if changed:
+            self._load()
+
+        return changed
+
+    def _load(self) -> None:
+        """
+        Read the three listings and build the NAICS dictionaries.
+        """
+        # Size standards are stored as the formatted answer, millions of dollars first and number of employees second.  The base NAICS entry is listed before its exceptions so the first entry is kept.
+        size_standard_df = pd.read_csv(self.source_files['size_standard'], dtype=str)
+        self.size_standards = {}
+        for naics, dollars, employees in zip(size_standard_df['NAICS Codes'], size_standard_df['Size standards in millions of dollars'], size_standard_df['Size standards in number of employees']):
+            naics = normalize_naics(naics)
+            if naics in self.size_standards or not naics.isdigit():
+                continue
+            if pd.notna(dollars) and dollars.strip():
+                self.size_standards[naics] = dollars.strip() + "M"
+            else:
+                self.size_standards[naics] = str(employees).strip() + " Employees"
+
+        # WOSB NAICS are stored with their 'Set-aside' value (WOSB or EDWOSB)
+        wosb_naics_df = pd.read_csv(self.source_files['wosb_naics'], dtype=str)
+        self.wosb_naics = {}
+        for naics, set_aside in zip(wosb_naics_df['NAICS Code'], wosb_naics_df['Set-aside']):
+            self.wosb_naics.setdefault(normalize_naics(naics), str(set_aside))
+
+        # NMR waivers are stored with their NAICS descriptor
+        nmr_waiver_list_df = pd.read_csv(self.source_files['nmr_waiver'], dtype=str)
+        self.nmr_waivers = {}
+        for naics, descriptor in zip(nmr_waiver_list_df['NAICS CODE'], nmr_waiver_list_df['NAICS DESCRIPTOR']):
+            self.nmr_waivers.setdefault(normalize_naics(naics), str(descriptor))
+
+    def size_standard(self, naics) -> str:
+        """
+        Get the size standard for a NAICS code.
+
+        Args:
+        naics: The NAICS value to look up.
+
+        Returns:
+        str: The size standard in millions of dollars ("$25.50M") or number of employees ("500 Employees").  If the NAICS value is not present, return "<naics> not found".
+        """
+        self.refresh()
+        naics = normalize_naics(naics)
+        return self.size_standards.get(naics, f'{naics} not found')
+
+    def wosb_set_aside(self, naics) -> str:
+        """
+        Get the WOSB set-aside type for a NAICS code.
+
+        Args:
+        naics: The NAICS value to look up.
+
+        Returns:
+        str: "WOSB" or "EDWOSB" if the NAICS value is present, "No" otherwise.
+        """
+        self.refresh()
+        return self.wosb_naics.get(normalize_naics(naics), "No")
+
+    def nmr_waiver_available(self, naics) -> str:
+        """
+        Check if an NMR class waiver exists for a NAICS code.
+
+        Args:
+        naics: The NAICS value to look up.
+
+        Returns:
+        str: "Yes" if an NMR waiver exists, "No" otherwise.
+        """
+        self.refresh()
+        return "Yes" if normalize_naics(naics) in self.nmr_waivers else "No"
+
+# Create the NAICS reference index used by the SB Profile Analysis checks.  Nothing is read until the first lookup.
+naics_reference = NaicsReference(common_folders['size_standard_list'], common_folders['wosb_naics_list'], common_folders['nmr_waiver_list'])
+
+# This helper function converts a dollar column to numeric.  It removes any currency formatting ($1,234.00) that was added for display.
+def to_numeric_dollars(series: pd.Series) -> pd.Series:
+    """
+    Convert a column of dollar values to numeric.
+
+    Args:
+    series (pd.Series): The dollar values, either numeric or currency formatted text.
+
+    Returns:
+    pd.Series: The dollar values as floats.  Values that cannot be converted are NaN.
+    """
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype(float)
+
+    # Remove the currency formatting and convert to numeric
+    series = series.astype(str).str.replace('$', '', regex=False).str.replace(',', '', regex=False)
+    return pd.to_numeric(series, errors='coerce')
+
+# This function builds the NAICS statistics table in one pass over the cleansed data source file.  For every NAICS with SB awards it computes the SB dollar total, SB action count, dollar and action ranks, percentile bands, and the Top, Strong, and Weak NAICS flags used by the SB Profile Analysis.
+def build_naics_statistics(source_file: str = None, destination_file: str = None) -> pd.DataFrame:
+    """
+    Build the per-NAICS SB statistics table and save it as a small Parquet file.
+
+    Top NAICS are the top 25 NAICS by SB Dollars or SB Actions.  Strong NAICS are the top 30% of unique NAICS by SB Dollars or SB Actions, and Weak NAICS are the bottom 30%.
+
+    Args:
+    source_file (str): The cleansed data source file.  Defaults to common_folders['cleansed_data_source_file'].
+    destination_file (str): Where to save the table.  Defaults to common_folders['naics_statistics_file'].
+
+    Returns:
+    pd.DataFrame: One row per NAICS with the SB statistics.
+    """
+    source_file = source_file or common_folders['cleansed_data_source_file']
+    destination_file = destination_file or common_folders['naics_statistics_file']
+
+    # Only read the columns needed for the statistics.  The NAICS is already normalized and the SB Dollars are already numeric in the interim dataset.
+    cleansed_file_df = read_interim_dataset(source_file, columns=['NAICS', 'Size Status', 'SB Dollars'])
+    run_recorder.set_rows(rows_in=len(cleansed_file_df))
+
+    # The Strong and Weak NAICS cutoffs are 30% of the unique NAICS in the file
+    band_count = int(cleansed_file_df['NAICS'].nunique() * .3)
+    top_naics_count = 25
+
+    # Total the SB Dollars and count the SB Actions for every NAICS in a single grouping
+    sb_df = cleansed_file_df.loc[cleansed_file_df['Size Status'] == "SB"]
+    naics_statistics_df = sb_df.groupby('NAICS', observed=True).agg(**{'SB Dollars': ('SB Dollars', 'sum'), 'SB Actions': ('Size Status', 'count')}).reset_index()
+
+    # Rank the NAICS by SB Dollars and SB Actions (1 is the highest) and get the percentile of each
+    naics_count = len(naics_statistics_df)
+    for column, rank_column, percentile_column in [('SB Dollars', 'Dollar Rank', 'Dollar Percentile'), ('SB Actions', 'Action Rank', 'Action Percentile')]:
+        naics_statistics_df[rank_column] = naics_statistics_df[column].rank(method='first', ascending=False).astype(int)
+        naics_statistics_df[percentile_column] = naics_statistics_df[column].rank(method='average', pct=True).round(4)
+
+    # Place each NAICS in a band based on the better of its two percentiles
+    best_percentile = naics_statistics_df[['Dollar Percentile', 'Action Percentile']].max(axis=1)
+    naics_statistics_df['Percentile Band'] = pd.cut(best_percentile, bins=[0, .1, .3, .7, .9, 1], labels=['Bottom 10%', 'Bottom 30%', 'Middle', 'Top 30%', 'Top 10%'], include_lowest=True).astype(str)
+
+    # Flag the Top, Strong, and Weak NAICS.  A NAICS qualifies by either SB Dollars or SB Actions.
+    dollar_rank_ascending = naics_count - naics_statistics_df['Dollar Rank'] + 1
+    action_rank_ascending = naics_count - naics_statistics_df['Action Rank'] + 1
+    naics_statistics_df['Top NAICS'] = (naics_statistics_df['Dollar Rank'] <= top_naics_count) | (naics_statistics_df['Action Rank'] <= top_naics_count)
+    naics_statistics_df['Strong NAICS'] = (naics_statistics_df['Dollar Rank'] <= band_count) | (naics_statistics_df['Action Rank'] <= band_count)
+    naics_statistics_df['Weak NAICS'] = (dollar_rank_ascending <= band_count) | (action_rank_ascending <= band_count)
+
+    # Save the NAICS statistics table
+    destination_file = write_interim_dataset(naics_statistics_df, destination_file)
+    print(f"NAICS statistics for {naics_count} NAICS saved to: {destination_file}")
+    run_recorder.set_rows(rows_out=naics_count)
+
+    return naics_statistics_df
+
+# This class loads the NAICS statistics table once and keeps it as a dictionary keyed by the normalized NAICS.  If the table does not exist or is older than the cleansed data source file it is rebuilt first.
+class NaicsStatistics:
+    """
+    Load-once index of the NAICS statistics table for the Top, Strong, and Weak NAICS checks.
+
+    Args:
+    statistics_file (str): The path to the NAICS statistics table.
+    source_file (str): The cleansed data source file the table is built from.
+    """
+
+    def __init__(self, statistics_file: str, source_file: str):
+        self.statistics_file = statistics_file
+        self.source_file = source_file
+        self.statistics = {}
+        self._signature = None
+
+    def refresh(self) -> bool:
+        """
+        Rebuild the table if it is missing or out of date and reload it if it changed.
+
+        Returns:
+        bool: True if the table was reloaded, False otherwise.
+        """
+        # Rebuild the table if the cleansed data source file is newer than it
+        statistics_file = resolve_interim_file(self.statistics_file)
+        source_file = resolve_interim_file(self.source_file)
+        if not os.path.exists(statistics_file) or (os.path.exists(source_file) and os.path.getmtime(source_file) > os.path.getmtime(statistics_file)):
+            build_naics_statistics(self.source_file, self.statistics_file)
+            statistics_file = resolve_interim_file(self.statistics_file)
+
+        signature = file_signature(statistics_file)
+        if signature == self._signature:
+            return False
+
+        naics_statistics_df = read_interim_dataset(statistics_file)
+        self.statistics = {normalize_naics(row['NAICS']): row for row in naics_statistics_df.to_dict('records')}
+        self._signature = signature
+
+        return True
+
+    def lookup(self, naics) -> dict:
+        """
+        Get the statistics for a NAICS code.
+
+        Args:
+        naics: The NAICS value to look up.
+
+        Returns:
+        dict: The NAICS statistics row, or an empty dict if the NAICS has no SB awards.
+        """
+        self.refresh()
+        return self.statistics.get(normalize_naics(naics), {})
+
+    def flag(self, naics, flag_column: str) -> str:
+        """
+        Check a Top, Strong, or Weak NAICS flag for a NAICS code.
+
+        Args:
+        naics: The NAICS value to look up.
+        flag_column (str): 'Top NAICS', 'Strong NAICS', or 'Weak NAICS'.
+
+        Returns:
+        str: "Yes" if the flag is set for the NAICS, "No" otherwise.
+        """
+        return "Yes" if self.lookup(naics).get(flag_column, False) else "No"
+
+# Create the NAICS statistics index used by the Top, Strong, and Weak NAICS checks.  Nothing is read until the first lookup.
+naics_statistics = NaicsStatistics(common_folders['naics_statistics_file'], common_folders['cleansed_data_source_file'])
+
+# Analytics database.  An optional SQLite file (no server) that holds the cleansed ACC-RI and Army data and every reference list, so the award counts, the insights, and ad-hoc questions run as indexed queries instead of reading the flat files.
+# Each table is listed with the common_folders key of its source file, whether the source is an interim dataset (read with the interim schema) or a reference list (read as text), and its indexes.  An index is a column or a tuple of columns.  The NAICS index of the contract actions also holds the Size Status and the Contract Action Type so the SB award counts are answered from the index alone.
+analytics_database_tables = {
+    'acc_ri_actions': {'file': 'cleansed_data_source_file', 'dataset': True, 'indexes': [('Contract No', 'Order No'), 'Order No', ('NAICS', 'Size Status', 'Contract Action Type'), 'Awardee']},
+    'army_actions': {'file': 'cleansed_all_army_data_source_file', 'dataset': True, 'indexes': [('Contract No', 'Order No'), 'Order No', ('NAICS', 'Size Status', 'Contract Action Type'), 'Awardee']},
+    'naics_statistics': {'file': 'naics_statistics_file', 'dataset': True, 'indexes': ['NAICS']},
+    'awardee_index': {'file': 'awardee_index_file', 'dataset': True, 'indexes': ['Awardee Key', 'UEI']},
+    'awardee_aliases': {'file': 'awardee_aliases_file', 'dataset': True, 'indexes': ['Awardee', 'Awardee Key']},
+    'size_standards': {'file': 'size_standard_list', 'dataset': False, 'indexes': ['NAICS Codes']},
+    'wosb_naics': {'file': 'wosb_naics_list', 'dataset': False, 'indexes': ['NAICS Code']},
+    'nmr_waivers': {'file': 'nmr_waiver_list', 'dataset': False, 'indexes': ['NAICS CODE']},
+    'hyperlinks': {'file': 'hyperlinks_file', 'dataset': False, 'indexes': ['Contract', 'Order']},
+    'osbp_forecast': {'file': 'osbp_forecast_file', 'dataset': False, 'indexes': ['FOLLOWON CONTRACT']},
+    'amc_forecast': {'file': 'amc_forecast_file', 'dataset': False, 'indexes': ['If Follow-on, Provide Current Contract Number']},
+}
+
+# The Awardee index ignores case so a search by the start of the awardee name (LIKE 'ACME%') can use it
+analytics_nocase_columns = ['Awardee']
+
+# This function converts a data source or reference list to the column types SQLite stores.  Dates are stored as ISO text (YYYY-MM-DD) so they sort and compare as dates, and categories are stored as text.
+def prepare_analytics_table(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert a DataFrame to the SQLite column types.
+
+    Args:
+    df (pd.DataFrame): The data source or reference list.
+
+    Returns:
+    pd.DataFrame: The converted DataFrame.
+    """
+    df = df.copy()
+    for column in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[column]):
+            df[column] = df[column].dt.strftime('%Y-%m-%d').astype(object)
+        elif isinstance(df[column].dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(df[column]):
+            df[column] = df[column].astype(object)
+        elif df[column].dtype == 'uint64':
+            # SQLite integers are signed.  The row fingerprints are stored with the same 64 bits and apply_interim_schema converts them back.
+            df[column] = df[column].astype('int64')
+
+    return df
+
+# This function builds the analytics database from the cleansed data sources and the reference lists.  It is built into a temporary file and swapped in when complete, so a reader never sees a partly built database.
+def build_analytics_database(database_file: str = None) -> dict:
+    """
+    Build the SQLite analytics database.
+
+    Args:
+    database_file (str): Where to save the database.  Defaults to common_folders['analytics_database_file'].
+
+    Returns:
+    dict: The number of rows loaded into each table.
+    """
+    database_file = database_file or common_folders['analytics_database_file']
+    os.makedirs(os.path.dirname(database_file) or '.', exist_ok=True)
+    building_file = database_file + '.building'
+    if os.path.exists(building_file):
+        os.remove(building_file)
+
+    table_rows = {}
+    connection = sqlite3.connect(building_file)
+    try:
+        # The database is rebuilt from scratch if the build fails, so it is loaded without a journal
+        connection.execute('PRAGMA journal_mode = OFF')
+        connection.execute('PRAGMA synchronous = OFF')
+
+        # The analytics_tables table records the source file of every table and its modification time when it was loaded.  A table is only queried while its source file is unchanged.
+        connection.execute('CREATE TABLE analytics_tables ("Table" TEXT PRIMARY KEY, "Source File" TEXT, "Source Modified" REAL, "Rows" INTEGER)')
+
+        for table, definition in analytics_database_tables.items():
+            source_file = common_folders[definition['file']]
+            if definition['dataset']:
+                source_file = resolve_interim_file(source_file)
+            if not os.path.exists(source_file):
+                print(f"Skipped the {table} table.  The source file does not exist: {source_file}")
+                continue
+
+            if definition['dataset']:
+                df = read_interim_dataset(source_file)
+            else:
+                df = pd.read_csv(source_file, dtype=str, encoding_errors='replace')
+                # The forecast listings have line breaks in their column names
+                df.columns = [' '.join(str(column).split()) for column in df.columns]
+
+            prepare_analytics_table(df).to_sql(table, connection, index=False, chunksize=100000)
+
+            for index in definition['indexes']:
+                columns = [index] if isinstance(index, str) else list(index)
+                if not set(columns).issubset(df.columns):
+                    continue
+                index_name = 'idx_' + table + '_' + re.sub(r'\W+', '_', columns[0].lower()).strip('_')
+                index_columns = ', '.join(f'"{column}"' + (' COLLATE NOCASE' if column in analytics_nocase_columns else '') for column in columns)
+                connection.execute(f'CREATE INDEX "{index_name}" ON "{table}" ({index_columns})')
+
+            connection.execute('INSERT INTO analytics_tables VALUES (?, ?, ?, ?)', (table, os.path.abspath(source_file), os.path.getmtime(source_file), len(df)))
+            table_rows[table] = len(df)
+            print(f"Loaded {len(df)} rows into the {table} table")
+
+        # Collect the index statistics the query planner uses
+        connection.execute('ANALYZE')
+        connection.commit()
+    finally:
+        connection.close()
+
+    # Close the open connection to the old database before it is replaced
+    analytics_database.close()
+    os.replace(building_file, database_file)
+    run_recorder.set_rows(rows_in=sum(table_rows.values()), rows_out=sum(table_rows.values()))
+    print(f"Analytics database saved to: {database_file}")
+
+    return table_rows
+
+# This helper function is registered with SQLite as MONTHS_REMAINING so the insight queries measure the months remaining from today, the same as calculate_months_remaining.
+def sqlite_months_remaining(expiration):
+    """
+    Get the months remaining until an ISO expiration date.
+
+    Args:
+    expiration (str): The expiration date as YYYY-MM-DD text, or None.
+
+    Returns:
+    int: The whole 30-day months from now until the expiration date, or None if there is no date.
+    """
+    if expiration is None:
+        return None
+    return (datetime.datetime.fromisoformat(expiration) - datetime.datetime.now()).days // 30
+
+# This helper function is registered with SQLite so "value REGEXP pattern" can be used in the queries
+def sqlite_regexp(pattern, value) -> bool:
+    """
+    Check if a value matches a regular expression.
+
+    Args:
+    pattern (str): The regular expression.
+    value (str): The value to check, or None.
+
+    Returns:
+    bool: True if the pattern is found in the value, False otherwise.
+    """
+    return value is not None and re.search(pattern, value) is not None
+
+# The SQL version of every insight filter in insight_terms
+insight_sql_terms = {
+    'award': "UPPER(COALESCE(\"Contract Action Type\", '')) <> 'MODIFICATION'",
+    'target window': 'MONTHS_REMAINING("Expiration") BETWEEN 6 AND 18',
+    'active': 'MONTHS_REMAINING("Expiration") > 0',
+    'unrestricted': "UPPER(COALESCE(\"Type Set Aside Description\", '')) IN ('NO SET ASIDE USED', '')",
+    'sb set aside': "UPPER(\"Type Set Aside Description\") REGEXP '^(?:TOTAL |PARTIAL )?SMALL BUSINESS SET[- ]?ASIDE'",
+    'not otsb': "COALESCE(\"Size Status\", '') <> 'OTSB'",
+}
+
+# The WHERE clause of every registered insight.  Each one selects the same rows as the insight predicate.
+insight_queries = {
+    "Insights Target1": ' AND '.join(insight_sql_terms[term] for term in ['award', 'unrestricted', 'target window', 'not otsb']),
+    "Insights Target2": ' AND '.join([insight_sql_terms[term] for term in ['award', 'sb set aside', 'target window']] + [f'("Socio Flags" & {socio_flag_mask([category for category in sb_categories.values() if category != "SB"])}) <> 0']),
+    "Insights Target3": ' AND '.join([insight_sql_terms[term] for term in ['award', 'active']] + [f'("Socio Flags" & {socio_flag_mask(["8(a)"])}) <> 0']),
+}
+
+# This class opens the analytics database read-only and answers the award count, contract, awardee, and insight queries.  Ad-hoc SQL can be run with query().
+class AnalyticsDatabase:
+    """
+    Load-once connection to the SQLite analytics database.
+
+    Args:
+    database_file (str): The path to the database built by build_analytics_database.
+    """
+
+    def __init__(self, database_file: str):
+        self.database_file = database_file
+        self.connection = None
+        self.tables = {}
+        self._signature = None
+
+    def refresh(self) -> bool:
+        """
+        Reopen the database if it was rebuilt since it was last opened.
+
+        Returns:
+        bool: True if the database was reopened, False otherwise.
+        """
+        if not os.path.exists(self.database_file):
+            self.close()
+            return False
+
+        signature = file_signature(self.database_file)
+        if signature == self._signature:
+            return False
+
+        self.close()
+        database_uri = pathlib.Path(os.path.abspath(self.database_file)).as_uri() + '?mode=ro'
+        self.connection = sqlite3.connect(database_uri, uri=True, check_same_thread=False)
+        self.connection.create_function('MONTHS_REMAINING', 1, sqlite_months_remaining, deterministic=False)
+        self.connection.create_function('REGEXP', 2, sqlite_regexp, deterministic=True)
+        self.tables = {row[0]: {'Source File': row[1], 'Source Modified': row[2], 'Rows': row[3]} for row in self.connection.execute('SELECT * FROM analytics_tables')}
+        self._signature = signature
+
+        return True
+
+    def close(self) -> None:
+        """
+        Close the connection to the database.
+        """
+        if self.connection is not None:
+            self.connection.close()
+        self.connection = None
+        self.tables = {}
+        self._signature = None
+
+    def is_current(self, table: str) -> bool:
+        """
+        Check if a table was loaded from the current version of its source file.
+
+        Args:
+        table (str): The table name, see analytics_database_tables.
+
+        Returns:
+        bool: True if the database exists and the table's source file has not changed since it was loaded, False otherwise.
+        """
+        self.refresh()
+        loaded = self.tables.get(table)
+        if loaded is None:
+            return False
+
+        definition = analytics_database_tables[table]
+        source_file = common_folders[definition['file']]
+        if definition['dataset']:
+            source_file = resolve_interim_file(source_file)
+
+        return os.path.abspath(source_file) == loaded['Source File'] and os.path.exists(source_file) and os.path.getmtime(source_file) == loaded['Source Modified']
+
+    def query(self, sql: str, params=()) -> pd.DataFrame:
+        """
+        Run a query against the database.
+
+        Args:
+        sql (str): The SQL query.  Column names with spaces are quoted, e.g. "Contract No".
+        params: The values of the ? placeholders in the query.
+
+        Returns:
+        pd.DataFrame: The query results.
+        """
+        self.refresh()
+        if self.connection is None:
+            raise FileNotFoundError(f"The analytics database does not exist: {self.database_file}.  Run build_analytics_database first.")
+
+        return pd.read_sql_query(sql, self.connection, params=params)
+
+    def count_sb_awards(self, naics, table: str = 'acc_ri_actions') -> int:
+        """
+        Count the awards made to small businesses under a NAICS.  Modifications, MATOCs, and SATOCs are not counted as awards.
+
+        Args:
+        naics: The NAICS value.
+        table (str): 'acc_ri_actions' or 'army_actions'.
+
+        Returns:
+        int: The number of SB awards.
+        """
+        self.refresh()
+        sql = f"""SELECT COUNT(*) FROM "{table}" WHERE "NAICS" = ? AND TRIM("Size Status") = 'SB' AND UPPER(COALESCE("Contract Action Type", '')) NOT IN ('MODIFICATION', 'MATOC', 'SATOC')"""
+        return self.connection.execute(sql, (normalize_naics(naics),)).fetchone()[0]
+
+    def sb_awards(self, naics, fiscal_years: int = 3, table: str = 'acc_ri_actions') -> pd.DataFrame:
+        """
+        Get the awards made to small businesses under a NAICS in the last fiscal years, e.g. all SB awards under 541330 in the last 3 FYs.
+
+        Args:
+        naics: The NAICS value.
+        fiscal_years (int): The number of fiscal years, counting the current fiscal year.
+        table (str): 'acc_ri_actions' or 'army_actions'.
+
+        Returns:
+        pd.DataFrame: The SB awards, newest first.
+        """
+        start_date = fiscal_years_start_date(fiscal_years).isoformat()
+
+        sql = f"""SELECT * FROM "{table}" WHERE "NAICS" = ? AND TRIM("Size Status") = 'SB' AND UPPER(COALESCE("Contract Action Type", '')) NOT IN ('MODIFICATION', 'MATOC', 'SATOC') AND "Award Date" >= ? ORDER BY "Award Date" DESC"""
+        return self.query(sql, (normalize_naics(naics), start_date))
+
+    def contract_actions(self, contract_no: str, order_no: str = None, table: str = 'acc_ri_actions') -> pd.DataFrame:
+        """
+        Get every action (awards and modifications) of a contract or an order.
+
+        Args:
+        contract_no (str): The contract number.
+        order_no (str): The order number.  Defaults to every order of the contract.
+        table (str): 'acc_ri_actions' or 'army_actions'.
+
+        Returns:
+        pd.DataFrame: The contract actions, oldest first.
+        """
+        if order_no is None:
+            return self.query(f'SELECT * FROM "{table}" WHERE "Contract No" = ? ORDER BY "Award Date"', (contract_no,))
+        return self.query(f'SELECT * FROM "{table}" WHERE "Contract No" = ? AND "Order No" = ? ORDER BY "Award Date"', (contract_no, order_no))
+
+    def awardee_actions(self, awardee: str, table: str = 'acc_ri_actions') -> pd.DataFrame:
+        """
+        Get every action of the awardees whose name starts with the given text (case is ignored).
+
+        Args:
+        awardee (str): The start of the awardee name.
+        table (str): 'acc_ri_actions' or 'army_actions'.
+
+        Returns:
+        pd.DataFrame: The awardee actions, newest first.
+        """
+        pattern = re.sub(r'([\\%_])', r'\\\1', awardee) + '%'
+        return self.query(f'SELECT * FROM "{table}" WHERE "Awardee" LIKE ? ESCAPE \'\\\' ORDER BY "Award Date" DESC', (pattern,))
+
+    def insight(self, name: str, table: str = 'acc_ri_actions') -> pd.DataFrame:
+        """
+        Build an insight target list with its indexed query.
+
+        Args:
+        name (str): The insight name, see insight_definitions.
+        table (str): The table to query.
+
+        Returns:
+        pd.DataFrame: The target list with the interim schema types, sorted the same as run_insights.
+        """
+        sort_by = insight_definitions[name]['sort_by']
+        sort_expression = 'MONTHS_REMAINING("Expiration")' if sort_by == 'Months Remaining' else f'"{sort_by}"'
+
+        # Missing values are sorted last and ties keep the data source order, the same as the stable pandas sort
+        target_df = self.query(f'SELECT * FROM "{table}" WHERE {insight_queries[name]} ORDER BY {sort_expression} IS NULL, {sort_expression}, rowid')
+        target_df = apply_interim_schema(target_df)
+        target_df['Months Remaining'] = calculate_months_remaining(target_df['Expiration'])
+
+        return target_df
+
+# Create the analytics database connection.  Nothing is opened until the first query, and the checks and insights only use it while it is current.
+analytics_database = AnalyticsDatabase(common_folders['analytics_database_file'])
+
+# This class is a lightweight view of one contract row.  The SB Profile Analysis checks receive it instead of the whole DataFrame so they can read a value by column name without scanning the frame.
+class ContractRecord:
+    """
+    Slot-based record view of one row in a ContractIndex.
+
+    Args:
+    columns (dict): The column arrays shared by every record of the index.
+    position (int): The row position of the contract.
+    """
+    __slots__ = ('_columns', '_position')
+
+    def __init__(self, columns: dict, position: int):
+        self._columns = columns
+        self._position = position
+
+    def __getitem__(self, column: str):
+        return self._columns[column][self._position]
+
+    def __contains__(self, column: str) -> bool:
+        return column in self._columns
+
+    def get(self, column: str, default=None):
+        """
+        Get the value of a column, or default if the column does not exist.
+        """
+        return self[column] if column in self._columns else default
+
+    def keys(self):
+        return self._columns.keys()
+
+    @property
+    def position(self) -> int:
+        return self._position
+
+    def __repr__(self) -> str:
+        return f"ContractRecord({self.get('Contract No')!r}, {self.get('Order No')!r})"
+
+# This class builds a hash index from Contract No (and Contract No + Order No) to the row position once, so each contract is found with a dictionary lookup instead of a boolean scan of the DataFrame.
+class ContractIndex:
+    """
+    Contract-number keyed index over a targets DataFrame.
+
+    Args:
+    df (pd.DataFrame): The DataFrame to index.  It must have a 'Contract No' column.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        # Keep each column as an array so the records share the data instead of copying rows
+        self.columns = {column: df[column].to_numpy() for column in df.columns}
+        self.length = len(df)
+
+        # Map each Contract No and each (Contract No, Order No) pair to its first row position
+        self.contract_positions = {}
+        self.order_positions = {}
+        order_numbers = self.columns['Order No'] if 'Order No' in self.columns else [None] * self.length
+        for position, (contract_no, order_no) in enumerate(zip(self.columns['Contract No'], order_numbers)):
+            self.contract_positions.setdefault(contract_no, position)
+            self.order_positions.setdefault((contract_no, order_no), position)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __iter__(self):
+        for position in range(self.length):
+            yield ContractRecord(self.columns, position)
+
+    def position(self, contract_no, order_no=None) -> int:
+        """
+        Get the row position of a contract.
+
+        Args:
+        contract_no (str): The contract number.
+        order_no (str): The order number.  If provided, the Contract No + Order No pair is looked up.
+
+        Returns:
+        int: The row position.  Raises KeyError if the contract is not in the index.
+        """
+        if order_no is not None:
+            return self.order_positions[(contract_no, order_no)]
+        return self.contract_positions[contract_no]
+
+    def record(self, contract_no, order_no=None) -> ContractRecord:
+        """
+        Get the record view of a contract.
+
+        Args:
+        contract_no (str): The contract number.
+        order_no (str): The order number.  If provided, the Contract No + Order No pair is looked up.
+
+        Returns:
+        ContractRecord: The record view.  Raises KeyError if the contract is not in the index.
+        """
+        return ContractRecord(self.columns, self.position(contract_no, order_no))
+
+    def record_at(self, position: int) -> ContractRecord:
+        """
+        Get the record view of the row at a position.
+        """
+        return ContractRecord(self.columns, position)
+
+def check_size_standard(record) -> str:
+    """
+    Check if the NAICS code value is present in the Size Standard listing (size_standard_list.xlsx).
+
+    Args:
+    record (ContractRecord): The record view of the contract being processed.
+
+    Returns:
+    str: Value from from the 'Size standards in millions of dollars' column.  If 'Size standards in millions of dollars' is not present, return value from 'Size standards in number of employees' column.  If the NAICS value is not present, return "No".
+    """
+    
+    # Select the 'NAICS' value from the record of the current contract being processed
+    naics = record['NAICS']
+    
+    # Look up the size standard from the NAICS reference index.  The listing is only read once and reloaded if it changes.
+    return naics_reference.size_standard(naics)
+     
+def check_wosb_naics(record) -> str:
+    """
+    Check if the NAICS code value is present in the Underrepresented WOSB NAICS listing (wosb_naics_list.xlsx).
+
+    Args:
+    record (ContractRecord): The record view of the contract being processed.  Should come from the insight_target.csv ContractIndex.
+
+    Returns:
+    str: "WOSB" or "EDWOSB" from the 'Set-Aside' column if the NAICS value is present, "No" otherwise.
+    """
+    
+    # Select the NAICS value from the record of the current contract being processed
+    naics = record['NAICS']
+
+    # Look up the WOSB set-aside type from the NAICS reference index.  If the NAICS is not present, "No" is returned.
+    return naics_reference.wosb_set_aside(naics)
+
+def check_if_awardee_sb(record) -> str:
+    """
+    Check if the awardee is a small business based on the 'Size Status' column.
+
+    Args:
+    record (ContractRecord): The record view of the contract being processed.
+
+    Returns:
+    str: "SB" if the awardee is a small business, "No" otherwise.
+    """
+    
+    # Select the 'Size Status' value from the record of the current contract being processed
+    size_status = record['Size Status']
+    
+    # Check if the 'Size Status' value is "SB". If yes, return "Yes". If no, return "No"
+    if size_status == "SB":
+        return "Yes"
+    else:
+        return "No"
+    
+def check_awardee_socioeconomic_status(record) -> str:
+    """
+    Check if the awardee is a socio-economic status based on the 'Socio Flags' column.
+
+    Args:
+    record (ContractRecord): The record view of the contract being processed.
+
+    Returns:
+    str: All socio categories they are identified as based on the "WOSB", "EDWOSB", "VOSB", "SDVOSB", "8(a)", "HUBZone", or "No" based on the socio-economic status.  If multiple categories are identified, they will be separated by a comma.
+    """
+    
+    # Select the 'Socio Flags' value from the record of the current contract being processed.  Older data without the column is encoded from the socio action columns and the set-aside description.
+    if 'Socio Flags' in record:
+        socio_flags = record['Socio Flags']
+    else:
+        columns = ['Size Status', 'Type Set Aside Description'] + list(socioeconomic_columns)
+        socio_flags = encode_socio_flags(pd.DataFrame({column: [record[column]] for column in columns if column in record})).iloc[0]
+    
+    # Decode the socio-economic categories the Awardee is.  If there are none, "None" is returned.
+    return socio_flag_labels[int(socio_flags) if pd.notna(socio_flags) else 0]
+ 
+def check_if_nmr_waiver_available(record) -> str:
+    """
+    Check if an NMR waiver exists based on the NAICS code from the current contract being processed.
+
+    Args:
+    record (ContractRecord): The record view of the contract being processed.
+
+    Returns:
+    str: "Yes" if an NMR waiver exists, "No" otherwise.
+    """
+    
+    # Select the 'NAICS' value from the record of the current contract being processed
+    naics = record['NAICS']
+        
+    # Check the NAICS reference index for an NMR waiver.  If yes, return "Yes". If no, return "No"
+    return naics_reference.nmr_waiver_available(naics)
+    
+def check_acc_ri_awards(record) -> str:
+    """
+    Get the number of awards made by ACC-RI to small businesses based on the NAICS code from the current contract being processed.
+
+    Args:
+    record (ContractRecord): The record view of the contract being processed.
+
+    Returns:
+    str: The number of awards made.
+    """
+    # Select the 'NAICS' value from the record of the current contract being processed
+    naics = normalize_naics(record['NAICS'])
+
+    # Count the awards with an indexed query when the analytics database holds the current ACC-RI data source
+    if analytics_database.is_current('acc_ri_actions'):
+        return str(analytics_database.count_sb_awards(naics, 'acc_ri_actions'))
+
+    # Look up the SB award count of the NAICS.  The counts of every NAICS are computed once per data source file.
+    award_counts = count_sb_awards_by_naics(common_folders['cleansed_data_source_file'])
+    return str(int(award_counts.get(naics, 0)))
+
+def check_all_acc_awards(record) -> str:
+    """
+    Get the number of awards made by the Army enterprise to small businesses based on the NAICS code from the current contract being processed.
+
+    Args:
+    record (ContractRecord): The record view of the contract being processed.
+
+    Returns:
+    str: The number of awards made.
+    """
+    # Select the 'NAICS' value from the record of the current contract being processed
+    naics = normalize_naics(record['NAICS'])
+
+    # Count the awards with an indexed query when the analytics database holds the current Army data source
+    if analytics_database.is_current('army_actions'):
+        return str(analytics_database.count_sb_awards(naics, 'army_actions'))
+
+    # Look up the SB award count of the NAICS.  The counts of every NAICS are computed once per data source file.
+    award_counts = count_sb_awards_by_naics(common_folders['cleansed_all_army_data_source_file'])
+    return str(int(award_counts.get(naics, 0)))
+
+# The financial risk thresholds computed by build_financial_risk_thresholds, keyed by the source file.
+financial_risk_thresholds_cache = {}
+
+# This function computes the 50th, 75th, and 90th percentiles of SB Dollars for every NAICS in one grouped pass over the army-wide data source file.  The thresholds are kept in memory and only recomputed when the file changes.
+def build_financial_risk_thresholds(source_file: str = None) -> pd.DataFrame:
+    """
+    Build the SB Dollars percentile thresholds for every NAICS.
+
+    Args:
+    source_file (str): The cleansed army-wide data source file.  Defaults to common_folders['cleansed_all_army_data_source_file'].
+
+    Returns:
+    pd.DataFrame: Indexed by the normalized NAICS with the 'P50', 'P75', and 'P90' columns.
+    """
+    source_file = source_file or common_folders['cleansed_all_army_data_source_file']
+
+    # Reuse the thresholds if the file has not changed since they were computed
+    signature = file_signature(resolve_interim_file(source_file))
+    cached = financial_risk_thresholds_cache.get(source_file)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    # Only read the columns needed for the percentiles.  SB Dollars is already numeric in the interim dataset.
+    cleansed_file_df = read_interim_dataset(source_file, columns=['NAICS', 'Size Status', 'SB Dollars'])
+    cleansed_file_df = cleansed_file_df.loc[cleansed_file_df['Size Status'] == "SB"]
+
+    # Group on the NAICS as plain strings so NAICS without SB awards are not carried along as empty categories
+    naics = cleansed_file_df['NAICS'].astype(str)
+    sb_dollars = cleansed_file_df['SB Dollars']
+
+    # Calculate the percentiles for every NAICS at once (linear interpolation, same as np.percentile)
+    thresholds_df = sb_dollars.groupby(naics).quantile([.5, .75, .9]).unstack()
+    thresholds_df.columns = ['P50', 'P75', 'P90']
+    thresholds_df.index.name = 'NAICS'
+
+    financial_risk_thresholds_cache[source_file] = (signature, thresholds_df)
+
+    return thresholds_df
+
+# This function assigns the financial risk to every target contract at once.  The percentile thresholds are joined onto the targets by NAICS and the risk level is set with vectorized comparisons.
+def assign_financial_risk(df: pd.DataFrame, thresholds_df: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Assign the Financial Risk to every row of the targets DataFrame.
+    Percentiles will be 50% for Low, 75% for Medium, and 90% and above for High.
+
+    Args:
+    df (pd.DataFrame): The targets DataFrame.  It is not modified.
+    thresholds_df (pd.DataFrame): The thresholds from build_financial_risk_thresholds.  Built from the army-wide file if not provided.
+
+    Returns:
+    pd.DataFrame: A copy of df with the 'P50', 'P75', 'P90' and 'Financial Risk' columns added.
+    """
+    if thresholds_df is None:
+        thresholds_df = build_financial_risk_thresholds()
+
+    # Join the thresholds onto the targets by the normalized NAICS
+    naics = normalize_naics_column(df['NAICS'])
+    joined_df = thresholds_df.reindex(naics.values)
+    joined_df.index = df.index
+    df = pd.concat([df, joined_df], axis=1)
+
+    # Compare each contract's SB Dollars against its NAICS percentiles.  If the NAICS has no SB awards, return "No".
+    sb_dollars = to_numeric_dollars(df['SB Dollars'])
+    df['Financial Risk'] = np.select(
+        [sb_dollars <= df['P50'], sb_dollars <= df['P75'], df['P50'].notna()],
+        ["Low Risk", "Medium Risk", "High Risk"],
+        default="No",
+    )
+
+    return df
+
+def check_financial_risk(record) -> str:
+    """
+    Check the financial risk to industry based on the distribution of SB dollars against the identified NAICS.
+    Percentiles will be 50% for Low, 75% for Medium, and 90% and above for High. 
+
+    Args:
+    record (ContractRecord): The record view of the contract being processed.
+
+    Returns:
+    str: "High", "Medium", "Low", or "No" based on the financial risk.
+    """
+    # Look up the percentiles for the contract's NAICS from the army-wide file.  They are only computed once per file.
+    thresholds_df = build_financial_risk_thresholds()
+    naics = normalize_naics(record['NAICS'])
+    if naics not in thresholds_df.index:
+        return "No"
+    p50, p75 = thresholds_df.loc[naics, 'P50'], thresholds_df.loc[naics, 'P75']
+
+    # Determine the risk level for the current contract's SB Dollars
+    sb_dollars = to_numeric_dollars(pd.Series([record['SB Dollars']])).values[0]
+    if sb_dollars <= p50:
+        return "Low Risk"
+    elif sb_dollars <= p75:
+        return "Medium Risk"
+    else:
+        return "High Risk"
+
+def check_targeted_naics(record) -> str:
+    """
+    Check if the NAICS code value is one of the Targeted Econcomic Sector (first two digits of NAICS) identified.
+
+    Args:
+    record (ContractRecord): The record view of the contract being processed.
+
+    Returns:
+    str:  If NAICS is present, return "Yes". Otherwise, return "No".
+    """
+    
+    # Select the 'NAICS' value from the record of the current contract being processed
+    naics = record['NAICS']
+    
+    # makre sure naics is a string and only the first two digits are used
+    naics = str(naics)[:2]
+    
+    # Define the targeted NAICS values.  Based on OSBP or Contracting goals.
+    targeted_naics = ['33', '51', '54']
+    
+    # Check if the 'NAICS' value is in the targeted_naics list. If yes, return "Yes". If no, return "No"
+    if naics in targeted_naics:
+        return "Yes"
+    else:
+        return "No"
+
+def check_top_naics(record) -> str:
+    """
+    Check if the NAICS code value is one of the Top 25 NAICS identified by the amount of SB Actions or SB Dollars.
+
+    Args:
+    record (ContractRecord): The record view of the contract being processed.
+
+    Returns:
+    str:  If NAICS is present, return "Yes". Otherwise, return "No".
+    """
+    
+    # Select the 'NAICS' value from the record of the current contract being processed
+    naics = record['NAICS']
+    
+    # Check the NAICS statistics table for the Top 25 NAICS by SB Dollars or SB Actions. If yes in either one, return "Yes". If not in either, return "No"
+    return naics_statistics.flag(naics, 'Top NAICS')
+    
+    # if naics in top_naics:
+    #     return "Yes"
+    # else:
+    #     return "No"
+
+def check_strong_naics(record) -> str:
+    """
+    Check if the NAICS code value is one of the Top 30% of unique NAICS identified by the amount of SB Actions or SB Dollars.
+
+    Args:
+    record (ContractRecord): The record view of the contract being processed.
+
+    Returns:
+    str:  If NAICS is present, return "Yes". Otherwise, return "No".
+    """
+    
+    # Select the 'NAICS' value from the record of the current contract being processed
+    naics = record['NAICS']
+    
+    # Check the NAICS statistics table for the top 30% of NAICS by SB Dollars or SB Actions. If yes in either one, return "Yes". If not in either, return "No"
+    return naics_statistics.flag(naics, 'Strong NAICS')
+    
+    # if naics in top_naics:
+    #     return "Yes"
+    # else:
+    #     return "No"
+
+def check_weak_naics(record) -> str:
+    """
+    Check if the NAICS code value is one of the Bottom 30% of unique NAICS identified by the amount of SB Actions or SB Dollars.
+
+    Args:
+    record (ContractRecord): The record view of the contract being processed.
+
+    Returns:
+    str:  If NAICS is present, return "Yes". Otherwise, return "No".
+    """
+    
+    # Select the 'NAICS' value from the record of the current contract being processed
+    naics = record['NAICS']
+    
+    # Check the NAICS statistics table for the bottom 30% of NAICS by SB Dollars or SB Actions. If yes in either one, return "Yes". If not in either, return "No"
+    return naics_statistics.flag(naics, 'Weak NAICS')
+    
+    # if naics in top_naics:
+    #     return "Yes"
+    # else:
+    #     return "No"
+       
+# def check_forecast(df, contract_no) -> str:
+    """
+    Check if the contract is a forecasted action.
+
+    Args:
+    df (pd.DataFrame): The DataFrame containing the data to be processed.
+    contract_no (str): The contract number being processed.
+
+    Returns:
+    str: "Yes" if the contract is a forecasted action, "No" otherwise.
+    """
+    forecast = df.loc[df['Contract No'] == contract_no, 'Forecast'].values[0]
+    
+    if forecast == 1:
+        return "Yes"
+    else:
+        return "No"
+
+# This helper function gives the path of the modification index stored next to a data source file, for example data_source_modifications.parquet.
+def modification_index_file(source_file: str) -> str:
+    """
+    Get the path of the modification index for a data source file.
+
+    Args:
+    source_file (str): The cleansed data source file.
+
+    Returns:
+    str: The path of the modification index.
+    """
+    return os.path.splitext(source_file)[0] + '_modifications.parquet'
+
+# This function summarizes the modifications of every contract in a single grouped pass.  The latest modification is the one with the most recent Award Date (a grouped arg-max).
+def summarize_modifications(modification_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Get the latest modification, the number of modifications, and the last modification date for every contract.
+
+    Args:
+    modification_df (pd.DataFrame): Rows with the 'Contract No', 'Modification No', 'Award Date', and 'Contract Action Type' columns.
+
+    Returns:
+    pd.DataFrame: One row per contract with the 'Contract No', 'Modification No', 'Modification Count', and 'Last Modification Date' columns.
+    """
+    # Only keep the modification rows
+    modification_df = modification_df.loc[modification_df['Contract Action Type'] == "MODIFICATION", ['Contract No', 'Modification No', 'Award Date']]
+    if modification_df.empty:
+        return pd.DataFrame({'Contract No': pd.Series(dtype='string'), 'Modification No': pd.Series(dtype='string'), 'Modification Count': pd.Series(dtype='int64'), 'Last Modification Date': pd.Series(dtype='datetime64[ns]')})
+
+    # Find the row with the latest Award Date for every contract.  Missing dates sort before every real date.
+    award_dates = modification_df['Award Date'].fillna(pd.Timestamp('1900-01-01'))
+    latest_rows = award_dates.groupby(modification_df['Contract No'], observed=True).idxmax()
+
+    grouped = modification_df.groupby('Contract No', observed=True)
+    modification_index_df = pd.DataFrame({
+        'Contract No': latest_rows.index.astype(str),
+        'Modification No': modification_df.loc[latest_rows.values, 'Modification No'].astype(str).values,
+        'Modification Count': grouped.size().loc[latest_rows.index].values,
+        'Last Modification Date': grouped['Award Date'].max().loc[latest_rows.index].values,
+    })
+
+    return modification_index_df
+
+# This function builds the modification index for a data source file and saves it next to the file.  If contracts are given, only those contracts are recomputed and merged into the stored index, which is how the incremental refresh keeps it up to date.
+def build_modification_index(source_file: str = None, contracts=None) -> pd.DataFrame:
+    """
+    Build (or update) the modification index of a data source file.
+
+    Args:
+    source_file (str): The cleansed data source file.  Defaults to common_folders['cleansed_data_source_file'].
+    contracts: The Contract Nos to recompute.  Defaults to every contract.
+
+    Returns:
+    pd.DataFrame: The modification index.
+    """
+    source_file = source_file or common_folders['cleansed_data_source_file']
+    index_file = modification_index_file(source_file)
+
+    # Only read the columns needed for the index
+    modification_df = read_interim_dataset(source_file, columns=['Contract No', 'Modification No', 'Award Date', 'Contract Action Type'])
+
+    if contracts is not None and os.path.exists(index_file):
+        # Recompute the given contracts and keep the stored rows of every other contract
+        contracts = pd.Index(contracts).astype(str).unique()
+        stored_index_df = pd.read_parquet(index_file)
+        stored_index_df = stored_index_df.loc[~stored_index_df['Contract No'].isin(contracts)]
+        modification_df = modification_df.loc[modification_df['Contract No'].isin(contracts)]
+        modification_index_df = pd.concat([stored_index_df, summarize_modifications(modification_df)], ignore_index=True)
+    else:
+        modification_index_df = summarize_modifications(modification_df)
+
+    modification_index_df.to_parquet(index_file, index=False)
+    print(f"Modification index for {len(modification_index_df)} contracts saved to: {index_file}")
+
+    return modification_index_df
+
+# This class loads the modification index once and keeps it as a dictionary keyed by the Contract No.  If the index does not exist or is older than the data source file it is rebuilt first.
+class ModificationIndex:
+    """
+    Load-once index of the latest modification of every contract.
+
+    Args:
+    source_file (str): The cleansed data source file the index is built from.
+    """
+
+    def __init__(self, source_file: str):
+        self.source_file = source_file
+        self.modifications = {}
+        self._signature = None
+
+    def refresh(self) -> bool:
+        """
+        Rebuild the index if it is missing or out of date and reload it if it changed.
+
+        Returns:
+        bool: True if the index was reloaded, False otherwise.
+        """
+        # Rebuild the index if the data source file is newer than it
+        index_file = modification_index_file(self.source_file)
+        source_file = resolve_interim_file(self.source_file)
+        if not os.path.exists(index_file) or (os.path.exists(source_file) and os.path.getmtime(source_file) > os.path.getmtime(index_file)):
+            build_modification_index(self.source_file)
+
+        signature = file_signature(index_file)
+        if signature == self._signature:
+            return False
+
+        modification_index_df = pd.read_parquet(index_file)
+        self.modifications = {row['Contract No']: row for row in modification_index_df.to_dict('records')}
+        self._signature = signature
+
+        return True
+
+    def lookup(self, contract_no) -> dict:
+        """
+        Get the modification summary of a contract.
+
+        Args:
+        contract_no: The Contract No to look up.
+
+        Returns:
+        dict: The 'Modification No', 'Modification Count', and 'Last Modification Date', or an empty dict if the contract has no modifications.
+        """
+        self.refresh()
+        return self.modifications.get(str(contract_no), {})
+
+# Create the modification index used by the modification checks.  Nothing is read until the first lookup.
+modification_index = ModificationIndex(common_folders['cleansed_data_source_file'])
+
+def check_modification(record) -> str:
+    '''
+    Check if the contract has a modification and get the most recent number identified by the award date.
+    
+    Args:
+    record (ContractRecord): The record view of the contract being processed.
+    
+    Returns:
+    str: The most recent modification number.
+    '''
+    # Select the 'Contract No' value from the record of the current contract being processed
+    contract_no = record['Contract No']
+    
+    # Get the most recent 'Modification Number' from the modification index
+    return modification_index.lookup(contract_no).get('Modification No', "No Modifications")
+
+def check_modification_count(record) -> str:
+    '''
+    Get the number of modifications of the contract.
+    
+    Args:
+    record (ContractRecord): The record view of the contract being processed.
+    
+    Returns:
+    str: The number of modifications.
+    '''
+    return str(modification_index.lookup(record['Contract No']).get('Modification Count', 0))
+
+def check_last_modification_date(record) -> str:
+    '''
+    Get the award date of the most recent modification of the contract.
+    
+    Args:
+    record (ContractRecord): The record view of the contract being processed.
+    
+    Returns:
+    str: The last modification date, or "No Modifications".
+    '''
+    last_modification_date = modification_index.lookup(record['Contract No']).get('Last Modification Date')
+    if last_modification_date is None or pd.isna(last_modification_date):
+        return "No Modifications"
+
+    return pd.Timestamp(last_modification_date).strftime('%Y-%m-%d')
+    
+# Awardee index.  The Awardee column is the legal business name with the UEI in parentheses, for example "ACME TECHNOLOGIES, LLC (ABCDEFGH1234)", so the same company shows up under every spelling of its name.  The awardee index resolves each awardee to one entity and keeps the award history of every entity across the ACC-RI and Army data sources, so the profiles can show the incumbent's history with a dictionary lookup.
+# An awardee is resolved by (1) the UEI in its name, (2) the Entity Unique Id column, (3) the UEI most of the actions under its normalized name were awarded to, and (4) a fuzzy match of its normalized name against the names in the same block.  The blocking key is the start of the name, so each name is only compared with a handful of others and the matching stays close to linear.
+# The data sources the awardee history is built from, in order.  The ACC-RI actions are also in the Army data source, so the actions are combined by their Row Key and each action is counted once.
+awardee_index_sources = {'ACC-RI': 'cleansed_data_source_file', 'Army': 'cleansed_all_army_data_source_file'}
+
+# The UEI at the end of the Awardee text.  SAM UEIs are 12 letters and digits and older pulls have 9 digit DUNS numbers.
+awardee_uei_pattern = r'^(?P<name>.*?)\s*\(\s*(?P<uei>[A-Za-z0-9]{9,13})\s*\)\s*$'
+
+# The business entity words dropped from the end of a name, so "Acme, Inc." and "ACME INC" are the same name
+awardee_name_suffixes = {'LLC', 'INC', 'INCORPORATED', 'CORP', 'CORPORATION', 'CO', 'COMPANY', 'LTD', 'LIMITED', 'LP', 'LLP', 'PLLC', 'PC', 'PLC'}
+
+# The number of characters of the normalized name (without spaces) in the blocking key
+awardee_blocking_key_length = 4
+
+# The number of names on either side of a name (in sorted order within its block) it is compared with.  The comparisons grow with the number of names, not with their square.
+awardee_match_window = 10
+
+# The similarity (difflib ratio) two names in the same block need to be the same awardee.  Names with different numbers in them ("VENDOR 1" and "VENDOR 2") never match.
+awardee_name_similarity = 0.92
+
+# The number of fiscal years, counting the current one, the Recent Wins are counted over
+awardee_recent_fiscal_years = 3
+
+# This helper function normalizes an awardee name so spelling differences in punctuation, case, and the business entity suffix do not split an awardee.
+def normalize_awardee_name(name) -> str:
+    """
+    Normalize an awardee name for matching.
+
+    Args:
+    name: The awardee name, without the UEI.
+
+    Returns:
+    str: The upper case name with "&" spelled out, the punctuation removed, the business entity suffixes and a leading "THE" dropped, and the whitespace collapsed.  An empty string if there is no name.
+    """
+    if name is None or pd.isna(name):
+        return ''
+
+    # Remove the periods and apostrophes inside words ("L.L.C.", "O'BRIEN") and turn the other punctuation into spaces
+    name = str(name).upper().replace('&', ' AND ')
+    name = re.sub(r"[.']", '', name)
+    words = re.sub(r'[^A-Z0-9]+', ' ', name).split()
+
+    # Drop the suffixes and "THE", but keep a name that is nothing but those words
+    core_words = list(words)
+    while core_words and core_words[-1] in awardee_name_suffixes:
+        core_words.pop()
+    if core_words and core_words[0] == 'THE':
+        core_words = core_words[1:]
+
+    return ' '.join(core_words or words)
+
+# This helper function gives the blocking key of a normalized awardee name.  Only names with the same blocking key are compared by the fuzzy match.
+def awardee_blocking_key(name: str) -> str:
+    """
+    Get the blocking key of a normalized awardee name.
+
+    Args:
+    name (str): The normalized awardee name.
+
+    Returns:
+    str: The first awardee_blocking_key_length characters of the name without its spaces.
+    """
+    return name.replace(' ', '')[:awardee_blocking_key_length]
+
+# This function splits the Awardee text into the name and the UEI.  It runs once per unique awardee, not once per row.
+def parse_awardee(awardee: pd.Series) -> pd.DataFrame:
+    """
+    Parse the name and the UEI out of the Awardee column.
+
+    Args:
+    awardee (pd.Series): The Awardee values, "NAME (UEI)".
+
+    Returns:
+    pd.DataFrame: The 'Awardee Name' and 'UEI' (upper case, or missing if there is none) of every value, indexed like awardee.
+    """
+    text = awardee.astype('string').str.strip()
+    parsed = text.str.extract(awardee_uei_pattern)
+
+    return pd.DataFrame({
+        'Awardee Name': parsed['name'].fillna(text),
+        'UEI': parsed['uei'].str.upper(),
+    }, index=awardee.index)
+
+# This function clusters the normalized names that could not be resolved through a UEI.  Within each block the names are sorted, so the spellings of one name sit next to each other, and each name is only compared with the awardee_match_window names on either side of it (a sorted neighborhood).  The names are first matched to the known names (the ones with a UEI), and the rest are grouped with each other by a union-find over the matching pairs.
+def cluster_awardee_names(names, known_names: dict) -> dict:
+    """
+    Resolve the normalized names without a UEI by fuzzy matching within their blocks.
+
+    Args:
+    names: The normalized names to resolve.
+    known_names (dict): The normalized names already resolved, mapped to their Awardee Key.
+
+    Returns:
+    dict: The Awardee Key of every name in names.  A name matched to a known name gets its key.  The other names get 'NAME:' and the first name (alphabetically) of their cluster.
+    """
+    matcher = difflib.SequenceMatcher(autojunk=False)
+    numbers = {}
+
+    def similar(name: str, other_name: str) -> bool:
+        # Names with different numbers in them never match, and the quick ratios are upper bounds of the ratio, so most pairs are rejected before the full comparison
+        if numbers.setdefault(name, re.findall(r'\d+', name)) != numbers.setdefault(other_name, re.findall(r'\d+', other_name)):
+            return False
+        matcher.set_seqs(name, other_name)
+        return matcher.real_quick_ratio() >= awardee_name_similarity and matcher.quick_ratio() >= awardee_name_similarity and matcher.ratio() >= awardee_name_similarity
+
+    blocks = {}
+    for name in known_names:
+        blocks.setdefault(awardee_blocking_key(name), set()).add(name)
+    for name in names:
+        blocks.setdefault(awardee_blocking_key(name), set()).add(name)
+
+    names = set(names)
+    parent = {}
+
+    def find(name: str) -> str:
+        while parent[name] != name:
+            parent[name] = parent[parent[name]]
+            name = parent[name]
+        return name
+
+    resolved = {}
+    for block_names in blocks.values():
+        block_names = sorted(block_names)
+        if not names.intersection(block_names):
+            continue
+
+        # Match each name to the most similar known name in its window
+        unmatched = []
+        for position, name in enumerate(block_names):
+            if name not in names:
+                continue
+            window = block_names[max(0, position - awardee_match_window):position + awardee_match_window + 1]
+            matches = [(matcher.ratio(), known_name) for known_name in window if known_name in known_names and similar(name, known_name)]
+            if matches:
+                resolved[name] = known_names[max(matches)[1]]
+            else:
+                unmatched.append(name)
+                parent[name] = name
+
+        # Group the remaining names with each other
+        for position, name in enumerate(unmatched):
+            for other_name in unmatched[position + 1:position + awardee_match_window + 1]:
+                if similar(name, other_name):
+                    first_root, second_root = sorted([find(name), find(other_name)])
+                    parent[second_root] = first_root
+
+    for name in parent:
+        resolved[name] = 'NAME:' + find(name)
+
+    return resolved
+
+# This function resolves every unique awardee to an Awardee Key.  Awardees with a UEI are keyed by it ('UEI:<uei>'), and the others are resolved by their normalized name.
+def resolve_awardees(awardees: pd.DataFrame) -> pd.Series:
+    """
+    Resolve awardees to entities.
+
+    Args:
+    awardees (pd.DataFrame): One row per unique awardee with the 'Awardee', 'Entity Unique Id', and 'Actions' (the number of rows) columns.
+
+    Returns:
+    pd.Series: The Awardee Key of every row, indexed like awardees.  Missing if the awardee has no name and no UEI.
+    """
+    parsed = parse_awardee(awardees['Awardee'])
+    entity_ids = awardees['Entity Unique Id'].astype('string').str.strip().str.upper().replace('', pd.NA)
+    ueis = parsed['UEI'].fillna(entity_ids)
+    names = parsed['Awardee Name'].map(normalize_awardee_name, na_action='ignore').fillna('').astype(object)
+
+    keys = ('UEI:' + ueis).astype(object)
+    keys = keys.where(ueis.notna(), None)
+
+    # A name without a UEI takes the UEI that name has the most actions under
+    with_uei = ueis.notna() & (names != '')
+    name_actions = pd.DataFrame({'name': names[with_uei], 'key': keys[with_uei], 'Actions': awardees.loc[with_uei, 'Actions']})
+    name_actions = name_actions.groupby(['name', 'key'])['Actions'].sum().sort_values(ascending=False, kind='stable').reset_index()
+    name_keys = name_actions.drop_duplicates('name').set_index('name')['key'].to_dict()
+    missing = keys.isna() & (names != '')
+    keys[missing] = names[missing].map(name_keys)
+
+    # The rest are matched by their names within their blocks
+    unresolved = keys.isna() & (names != '')
+    if unresolved.any():
+        keys[unresolved] = names[unresolved].map(cluster_awardee_names(names[unresolved].unique(), name_keys))
+
+    return keys
+
+# This function builds the awardee index from the cleansed ACC-RI and Army data sources.  Each action is read once, resolved through its (Awardee, Entity Unique Id) pair, and totaled per entity in a single grouping.
+def build_awardee_index(destination_file: str = None, aliases_file: str = None) -> pd.DataFrame:
+    """
+    Build the awardee history index and save it as a small Parquet file.
+
+    Awards are the actions that are not a MODIFICATION, MATOC, or SATOC.  The SB Dollars are the SB dollars of every action, modifications included.
+
+    Args:
+    destination_file (str): Where to save the index.  Defaults to common_folders['awardee_index_file'].
+    aliases_file (str): Where to save the Awardee Key of every unique (Awardee, Entity Unique Id) pair.  Defaults to common_folders['awardee_aliases_file'].
+
+    Returns:
+    pd.DataFrame: One row per entity with the 'Awardee Key', 'Awardee Name', 'UEI', 'Names', 'Actions', 'Awards', 'ACC-RI Awards', 'SB Dollars', 'Recent Wins', 'NAICS Count', 'Top NAICS', and 'Last Award Date' columns.
+    """
+    destination_file = destination_file or common_folders['awardee_index_file']
+    aliases_file = aliases_file or common_folders['awardee_aliases_file']
+
+    # Read the columns the history needs from every data source.  A file listed twice is only read once, and the actions of a later data source that are already in an earlier one (the same Row Key) are skipped, so an ACC-RI action is counted once, as an ACC-RI action.
+    columns = ['Row Key', 'Awardee', 'Entity Unique Id', 'NAICS', 'SB Dollars', 'Contract Action Type', 'Award Date']
+    source_frames = []
+    read_files = set()
+    for source, key in awardee_index_sources.items():
+        source_file = resolve_interim_file(common_folders[key])
+        if not os.path.exists(source_file) or os.path.abspath(source_file) in read_files:
+            continue
+        read_files.add(os.path.abspath(source_file))
+        try:
+            source_df = read_interim_dataset(source_file, columns=columns)
+        except ValueError:
+            # The Entity Unique Id column is dropped from a pull where it is empty.  The UEI in the Awardee name is used instead.
+            source_df = read_interim_dataset(source_file, columns=[column for column in columns if column != 'Entity Unique Id'])
+        if source_frames and 'Row Key' in source_df.columns:
+            read_row_keys = pd.concat([frame['Row Key'] for frame in source_frames if 'Row Key' in frame.columns])
+            source_df = source_df.loc[~source_df['Row Key'].isin(read_row_keys)]
+        source_df['ACC-RI'] = source == 'ACC-RI'
+        source_frames.append(source_df)
+    if not source_frames:
+        raise FileNotFoundError("No cleansed data source file found for the awardee index.")
+
+    actions_df = pd.concat(source_frames, ignore_index=True)
+    for column in columns:
+        if column not in actions_df.columns:
+            actions_df[column] = pd.NA
+
+    for column in ['Awardee', 'Entity Unique Id', 'Contract Action Type']:
+        actions_df[column] = actions_df[column].astype('category')
+    run_recorder.set_rows(rows_in=len(actions_df))
+
+    # Resolve every unique (Awardee, Entity Unique Id) pair once and give each action the key of its pair
+    pair_codes = actions_df.groupby(['Awardee', 'Entity Unique Id'], observed=True, dropna=False, sort=False).ngroup().to_numpy()
+    first_rows = ~pd.Series(pair_codes).duplicated().to_numpy()
+    aliases_df = pd.DataFrame({
+        'Awardee': actions_df['Awardee'].to_numpy()[first_rows],
+        'Entity Unique Id': actions_df['Entity Unique Id'].to_numpy()[first_rows],
+        'Actions': np.bincount(pair_codes)[pair_codes[first_rows]],
+    }, index=pair_codes[first_rows]).sort_index()
+    aliases_df['Awardee Key'] = resolve_awardees(aliases_df)
+    actions_df['Awardee Key'] = aliases_df['Awardee Key'].to_numpy()[pair_codes]
+    actions_df = actions_df.loc[actions_df['Awardee Key'].notna()]
+
+    # The name shown for an entity is the name most of its actions were awarded under
+    aliases_df['Awardee Name'] = parse_awardee(aliases_df['Awardee'])['Awardee Name']
+    display_names = aliases_df.sort_values('Actions', ascending=False, kind='stable').drop_duplicates('Awardee Key').set_index('Awardee Key')['Awardee Name']
+    name_counts = aliases_df.assign(**{'Normalized Name': aliases_df['Awardee Name'].map(normalize_awardee_name, na_action='ignore')}).groupby('Awardee Key')['Normalized Name'].nunique()
+
+    # Total the history of every entity in a single grouping
+    is_award = ~actions_df['Contract Action Type'].astype('string').str.upper().isin(["MODIFICATION", "MATOC", "SATOC"]).fillna(False).to_numpy()
+    award_dates = pd.to_datetime(actions_df['Award Date'], errors='coerce')
+    recent_start = pd.Timestamp(fiscal_years_start_date(awardee_recent_fiscal_years))
+    actions_df = actions_df.assign(**{
+        'Award': is_award,
+        'ACC-RI Award': is_award & actions_df['ACC-RI'].to_numpy(),
+        'Recent Win': is_award & (award_dates >= recent_start).to_numpy(),
+        'Award Date': award_dates.where(is_award),
+        'NAICS': actions_df['NAICS'].astype('string').where(is_award),
+        'SB Dollars': pd.to_numeric(actions_df['SB Dollars'], errors='coerce'),
+    })
+    awardee_index_df = actions_df.groupby('Awardee Key').agg(**{
+        'Actions': ('Award', 'size'),
+        'Awards': ('Award', 'sum'),
+        'ACC-RI Awards': ('ACC-RI Award', 'sum'),
+        'SB Dollars': ('SB Dollars', 'sum'),
+        'Recent Wins': ('Recent Win', 'sum'),
+        'NAICS Count': ('NAICS', 'nunique'),
+        'Last Award Date': ('Award Date', 'max'),
+    })
+
+    # The Top NAICS are the three NAICS with the most awards
+    naics_awards = actions_df.loc[is_award].groupby(['Awardee Key', 'NAICS']).size().rename('Count').reset_index()
+    naics_awards = naics_awards.sort_values(['Awardee Key', 'Count', 'NAICS'], ascending=[True, False, True], kind='stable').groupby('Awardee Key').head(3)
+    top_naics = naics_awards.groupby('Awardee Key')['NAICS'].agg(', '.join)
+
+    awardee_index_df.insert(0, 'Awardee Name', display_names.reindex(awardee_index_df.index).astype(object))
+    awardee_index_df.insert(1, 'UEI', pd.Series(awardee_index_df.index.where(awardee_index_df.index.str.startswith('UEI:')).str[4:], index=awardee_index_df.index, dtype=object))
+    awardee_index_df.insert(2, 'Names', name_counts.reindex(awardee_index_df.index).fillna(0).astype(int))
+    awardee_index_df['Top NAICS'] = top_naics.reindex(awardee_index_df.index).fillna('').astype(object)
+    awardee_index_df = awardee_index_df[['Awardee Name', 'UEI', 'Names', 'Actions', 'Awards', 'ACC-RI Awards', 'SB Dollars', 'Recent Wins', 'NAICS Count', 'Top NAICS', 'Last Award Date']].reset_index()
+
+    # Save the index and the aliases
+    destination_file = write_interim_dataset(awardee_index_df, destination_file)
+    aliases_df = aliases_df[['Awardee', 'Entity Unique Id', 'Actions', 'Awardee Key']].astype({'Awardee': object, 'Entity Unique Id': object})
+    aliases_file = write_interim_dataset(aliases_df.reset_index(drop=True), aliases_file)
+    print(f"Awardee index for {len(awardee_index_df)} awardees ({len(aliases_df)} awardee names) saved to: {destination_file}")
+    run_recorder.set_rows(rows_out=len(awardee_index_df))
+
+    return awardee_index_df
+
+# This class loads the awardee index once and keeps it as dictionaries keyed by the Awardee Key, the Awardee text, and the normalized name.  If the index does not exist or is older than one of the data source files it is rebuilt first.
+class AwardeeIndex:
+    """
+    Load-once index of the award history of every awardee for the awardee history checks.
+
+    Args:
+    index_file (str): The path to the awardee index.
+    aliases_file (str): The path to the Awardee Key of every unique (Awardee, Entity Unique Id) pair.
+    """
+
+    def __init__(self, index_file: str, aliases_file: str):
+        self.index_file = index_file
+        self.aliases_file = aliases_file
+        self.awardees = {}
+        self.aliases = {}
+        self.names = {}
+        self._signature = None
+
+    def refresh(self) -> bool:
+        """
+        Rebuild the index if it is missing or out of date and reload it if it changed.
+
+        Returns:
+        bool: True if the index was reloaded, False otherwise.
+        """
+        # Rebuild the index if a data source file is newer than it
+        index_file = resolve_interim_file(self.index_file)
+        aliases_file = resolve_interim_file(self.aliases_file)
+        source_files = [resolve_interim_file(common_folders[key]) for key in awardee_index_sources.values()]
+        if not os.path.exists(index_file) or not os.path.exists(aliases_file) or any(os.path.exists(source_file) and os.path.getmtime(source_file) > os.path.getmtime(index_file) for source_file in source_files):
+            build_awardee_index(self.index_file, self.aliases_file)
+            index_file = resolve_interim_file(self.index_file)
+            aliases_file = resolve_interim_file(self.aliases_file)
+
+        signature = (file_signature(index_file), file_signature(aliases_file))
+        if signature == self._signature:
+            return False
+
+        awardee_index_df = read_interim_dataset(index_file)
+        self.awardees = {row['Awardee Key']: row for row in awardee_index_df.to_dict('records')}
+
+        # The aliases are sorted by their number of actions, so a name used by two entities resolves to the bigger one
+        aliases_df = read_interim_dataset(aliases_file).sort_values('Actions', ascending=False, kind='stable')
+        awardees = aliases_df['Awardee'].astype('string').str.strip()
+        self.aliases = dict(zip(awardees.fillna(''), aliases_df['Awardee Key'].astype(str)))
+        normalized_names = parse_awardee(awardees)['Awardee Name'].map(normalize_awardee_name, na_action='ignore').fillna('')
+        self.names = {}
+        for name, key in zip(normalized_names, aliases_df['Awardee Key'].astype(str)):
+            if name:
+                self.names.setdefault(name, key)
+        self._signature = signature
+
+        return True
+
+    def resolve(self, awardee, entity_unique_id=None):
+        """
+        Get the Awardee Key of an awardee.
+
+        Args:
+        awardee: The Awardee value, "NAME (UEI)".
+        entity_unique_id: The Entity Unique Id of the contract, if there is one.
+
+        Returns:
+        str: The Awardee Key, or None if the awardee is not in the index.
+        """
+        self.refresh()
+        text = '' if awardee is None or pd.isna(awardee) else str(awardee).strip()
+        if text in self.aliases:
+            return self.aliases[text]
+
+        # An awardee that is not in the data sources is resolved like the index resolves them: by the UEI, then by the normalized name
+        parsed = re.match(awardee_uei_pattern, text)
+        for uei in [parsed.group('uei') if parsed else None, entity_unique_id]:
+            if uei is not None and not pd.isna(uei) and 'UEI:' + str(uei).strip().upper() in self.awardees:
+                return 'UEI:' + str(uei).strip().upper()
+
+        return self.names.get(normalize_awardee_name(parsed.group('name') if parsed else text))
+
+    def lookup(self, awardee, entity_unique_id=None) -> dict:
+        """
+        Get the award history of an awardee.
+
+        Args:
+        awardee: The Awardee value, "NAME (UEI)".
+        entity_unique_id: The Entity Unique Id of the contract, if there is one.
+
+        Returns:
+        dict: The awardee index row, or an empty dict if the awardee has no history.
+        """
+        awardee_key = self.resolve(awardee, entity_unique_id)
+        return self.awardees.get(awardee_key, {})
+
+    def join(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Look up the award history of every row of a DataFrame at once.
+
+        Args:
+        df (pd.DataFrame): Rows with the 'Awardee' and (optionally) 'Entity Unique Id' columns.
+
+        Returns:
+        pd.DataFrame: The awardee index row of every row of df, indexed like df.  Rows without a history are missing.
+        """
+        self.refresh()
+        entity_ids = df['Entity Unique Id'].astype(object) if 'Entity Unique Id' in df.columns else pd.Series(None, index=df.index, dtype=object)
+
+        # Each unique awardee is resolved once
+        pairs = list(zip(df['Awardee'].astype(object), entity_ids))
+        keys = {pair: self.resolve(*pair) for pair in set(pairs)}
+        history_df = pd.DataFrame([self.awardees.get(keys[pair], {}) for pair in pairs], index=df.index)
+
+        return history_df.reindex(columns=['Awardee Key', 'Awardee Name', 'UEI', 'Names', 'Actions', 'Awards', 'ACC-RI Awards', 'SB Dollars', 'Recent Wins', 'NAICS Count', 'Top NAICS', 'Last Award Date'])
+
+# Create the awardee index used by the awardee history checks.  Nothing is read until the first lookup.
+awardee_index = AwardeeIndex(common_folders['awardee_index_file'], common_folders['awardee_aliases_file'])
+
+# This helper function formats an awardee's SB dollar total for the profile.
+def format_awardee_sb_dollars(history: dict) -> str:
+    """
+    Format the Awardee SB Dollars element.
+
+    Args:
+    history (dict): The awardee index row.
+
+    Returns:
+    str: The SB dollars as currency, or "No History" if the awardee is not in the index.
+    """
+    if not history:
+        return "No History"
+
+    sb_dollars = history.get('SB Dollars')
+    return '${:,.2f}'.format(0 if sb_dollars is None or pd.isna(sb_dollars) else sb_dollars)
+
+# This helper function formats the number of NAICS an awardee won awards under and its top three NAICS.
+def format_awardee_naics_spread(history: dict) -> str:
+    """
+    Format the Awardee NAICS Spread element.
+
+    Args:
+    history (dict): The awardee index row.
+
+    Returns:
+    str: For example "12 NAICS (541330, 541611, 336411)", "0 NAICS" if the awardee has no awards, or "No History" if the awardee is not in the index.
+    """
+    if not history:
+        return "No History"
+
+    naics_count = int(history.get('NAICS Count', 0) or 0)
+    top_naics = history.get('Top NAICS') or ''
+    return f"{naics_count} NAICS ({top_naics})" if naics_count and top_naics else f"{naics_count} NAICS"
+
+# This helper function formats the number of awards an awardee won in the recent fiscal years.
+def format_awardee_recent_wins(history: dict) -> str:
+    """
+    Format the Awardee Recent Wins element.
+
+    Args:
+    history (dict): The awardee index row.
+
+    Returns:
+    str: The number of awards in the last awardee_recent_fiscal_years fiscal years, or "No History" if the awardee is not in the index.
+    """
+    if not history:
+        return "No History"
+
+    return str(int(history.get('Recent Wins', 0) or 0))
+
+def check_awardee_sb_dollars(record) -> str:
+    '''
+    Get the total SB dollars of the awardee across the ACC-RI and Army data sources.
+
+    Args:
+    record (ContractRecord): The record view of the contract being processed.
+
+    Returns:
+    str: The awardee's total SB dollars, or "No History".
+    '''
+    return format_awardee_sb_dollars(awardee_index.lookup(record['Awardee'], record.get('Entity Unique Id')))
+
+def check_awardee_naics_spread(record) -> str:
+    '''
+    Get the number of NAICS the awardee won awards under and its top three NAICS.
+
+    Args:
+    record (ContractRecord): The record view of the contract being processed.
+
+    Returns:
+    str: The NAICS count and the top NAICS, or "No History".
+    '''
+    return format_awardee_naics_spread(awardee_index.lookup(record['Awardee'], record.get('Entity Unique Id')))
+
+def check_awardee_recent_wins(record) -> str:
+    '''
+    Get the number of awards the awardee won in the last three fiscal years.
+
+    Args:
+    record (ContractRecord): The record view of the contract being processed.
+
+    Returns:
+    str: The number of recent awards, or "No History".
+    '''
+    return format_awardee_recent_wins(awardee_index.lookup(record['Awardee'], record.get('Entity Unique Id')))
+
+def check_forecast(record) -> str:
+    '''
+    Check if the contract is a forecasted action and return the VCE-PCF Cabinet Name.
+    
+    Args:
+    record (ContractRecord): The record view of the contract being processed.
+    
+    Returns:
+    str: The VCE-PCF Cabinet Name (or the AMC PAN, Solicitation, or Contract Number) of the forecast that follows on the contract.
+    '''
+    # Select the 'Contract No' value from the record of the current contract being processed
+    contract_no = record['Contract No']
+    
+    # Search the forecast index for a forecast that follows on the contract_no identified from the contract being processed
+    return forecast_index.lookup(contract_no).get('Forecast No', "No Forecast Identified")
+
+def check_forecasted_value(record) -> str:
+    '''
+    Get the forecasted contract value of the forecast that follows on the contract.
+    
+    Args:
+    record (ContractRecord): The record view of the contract being processed.
+    
+    Returns:
+    str: The forecasted contract value range (for example "$1M to $5M"), or "No Forecast Identified".
+    '''
+    return forecast_index.lookup(record['Contract No']).get('Forecasted Value', "No Forecast Identified")
+        
+# This helper function normalizes a contract or order number (PIID) so the VCE data and the PCF listing can be matched.  The listing stores contracts as W9098S21P0077 while the cabinet names use W9098S-21-P-0077.
+def normalize_piid(piid) -> str:
+    """
+    Normalize a contract or order number to its canonical PIID form.
+
+    Args:
+    piid: The contract or order number.
+
+    Returns:
+    str: The upper case PIID without dashes, spaces, or periods.  Missing values and "0" (no order) return an empty string.
+    """
+    if piid is None or (not isinstance(piid, str) and pd.isna(piid)):
+        return ''
+
+    piid = re.sub(r'[\s.\-]', '', str(piid)).upper()
+
+    # "0" is used for "no order" in both the VCE data and the PCF listing
+    if piid.strip('0') == '' or piid == 'NAN':
+        return ''
+
+    return piid
+
+# This class loads the PCF hyperlink listing once and keeps the cabinet links in dictionaries keyed by the normalized PIID.  Orders are looked up first, then contracts.
+class HyperlinkIndex:
+    """
+    Load-once index of the PCF cabinet links.
+
+    Each link is indexed by its cabinet name and its Contract, and by the (Contract, Order) pair when the listing has an order.  The first link listed for a key is kept.
+
+    Args:
+    hyperlinks_file (str): The path to the PCF hyperlink listing.
+    """
+
+    def __init__(self, hyperlinks_file: str):
+        self.hyperlinks_file = hyperlinks_file
+        self.piid_links = {}
+        self.order_links = {}
+        self._signature = None
+
+    def refresh(self) -> bool:
+        """
+        Reload the listing if its contents changed since it was last loaded.
+
+        Returns:
+        bool: True if the listing was reloaded, False otherwise.
+        """
+        mtime, _ = file_signature(self.hyperlinks_file)
+        if self._signature is not None and self._signature[0] == mtime:
+            return False
+
+        signature = file_signature(self.hyperlinks_file, include_hash=True)
+        if self._signature is not None and self._signature[1] == signature[1]:
+            self._signature = signature
+            return False
+
+        hyperlink_df = pd.read_csv(self.hyperlinks_file, usecols=['PCF Access', 'VCE-PCF Cabinet', 'Contract', 'Order'], dtype=str)
+        self.piid_links = {}
+        self.order_links = {}
+        for link, cabinet, contract, order in zip(hyperlink_df['PCF Access'], hyperlink_df['VCE-PCF Cabinet'], hyperlink_df['Contract'], hyperlink_df['Order']):
+            if pd.isna(link):
+                continue
+            cabinet, contract, order = normalize_piid(cabinet), normalize_piid(contract), normalize_piid(order)
+
+            # The cabinet name is the PIID of the award (a contract or an order)
+            if cabinet:
+                self.piid_links.setdefault(cabinet, link)
+
+            # Orders in the listing are usually call numbers (BA02) that only make sense with their contract.  Full order PIIDs (13 characters) are also indexed on their own.
+            if contract and order:
+                self.order_links.setdefault((contract, order), link)
+                if len(order) >= 13:
+                    self.piid_links.setdefault(order, link)
+            elif contract:
+                self.piid_links.setdefault(contract, link)
+
+        self._signature = signature
+
+        return True
+
+    def lookup(self, contract_no, order_no=None) -> str:
+        """
+        Get the PCF cabinet link of a contract or order.
+
+        Args:
+        contract_no: The Contract No.
+        order_no: The Order No.  "0" or blank means there is no order.
+
+        Returns:
+        str: The PCF cabinet link, or "No PCF cabinet link found".
+        """
+        self.refresh()
+        contract, order = normalize_piid(contract_no), normalize_piid(order_no)
+
+        if order and order in self.piid_links:
+            return self.piid_links[order]
+        if contract and order and (contract, order) in self.order_links:
+            return self.order_links[(contract, order)]
+        if contract and contract in self.piid_links:
+            return self.piid_links[contract]
+
+        return 'No PCF cabinet link found'
+
+    def join(self, df: pd.DataFrame) -> pd.Series:
+        """
+        Look up the PCF cabinet link of every row of a DataFrame at once.
+
+        Args:
+        df (pd.DataFrame): Rows with the 'Contract No' and (optionally) 'Order No' columns.
+
+        Returns:
+        pd.Series: The PCF cabinet link of every row, or "No PCF cabinet link found".
+        """
+        self.refresh()
+        contracts = df['Contract No'].map(normalize_piid).astype(object)
+        orders = df['Order No'].map(normalize_piid).astype(object) if 'Order No' in df.columns else pd.Series('', index=df.index, dtype=object)
+
+        # Orders first, then the (Contract, Order) pairs, then contracts
+        links = orders.map(self.piid_links)
+        links = links.fillna(pd.Series(list(zip(contracts, orders)), index=df.index).map(self.order_links))
+        links = links.fillna(contracts.map(self.piid_links))
+
+        return links.fillna('No PCF cabinet link found')
+
+# Create the PCF hyperlink index used by the PCF Cabinet check.  Nothing is read until the first lookup.
+hyperlink_index = HyperlinkIndex(common_folders['hyperlinks_file'])
+
+# Define how the columns of each forecast listing map to the forecast index.  The AMC listing has multi-line headers, so the headers are compared with their whitespace collapsed.  The OSBP listing is listed first and wins when both listings follow on the same contract.
+forecast_sources = {
+    'OSBP': {
+        'file': 'osbp_forecast_file',
+        'Forecast No': 'VCE-PCF Cabinet Name',
+        'Follow-on Contract': 'FOLLOWON CONTRACT',
+        'Forecasted Value': 'Forecasted Contract Value',
+    },
+    'AMC': {
+        'file': 'amc_forecast_file',
+        'Forecast No': 'PAN, Solicitation, or Contract Number',
+        'Follow-on Contract': 'If Follow-on, Provide Current Contract Number',
+        'Forecasted Value': 'Forecasted contract value',
+    },
+}
+
+# This class loads the OSBP and AMC forecast listings once and keeps the forecasts in a dictionary keyed by the normalized follow-on contract number.
+class ForecastIndex:
+    """
+    Load-once index of the forecasts that follow on a current contract.
+
+    Args:
+    sources (dict): The forecast sources, see forecast_sources.
+    """
+
+    def __init__(self, sources: dict):
+        self.sources = sources
+        self.forecasts = {}
+        self._signatures = {}
+
+    def refresh(self) -> bool:
+        """
+        Reload the listings if any of them changed since they were last loaded.
+
+        Returns:
+        bool: True if the listings were reloaded, False otherwise.
+        """
+        signatures = {name: file_signature(common_folders[source['file']]) for name, source in self.sources.items() if os.path.exists(common_folders[source['file']])}
+        if signatures == self._signatures:
+            return False
+
+        self.forecasts = {}
+        for name, source in self.sources.items():
+            forecast_file = common_folders[source['file']]
+            if not os.path.exists(forecast_file):
+                continue
+
+            forecast_df = pd.read_csv(forecast_file, dtype=str)
+            forecast_df.columns = [' '.join(str(column).split()) for column in forecast_df.columns]
+
+            for forecast_no, follow_on, forecasted_value in zip(forecast_df[source['Forecast No']], forecast_df[source['Follow-on Contract']], forecast_df[source['Forecasted Value']]):
+                if pd.isna(follow_on) or pd.isna(forecast_no):
+                    continue
+
+                # A forecast can follow on more than one contract
+                for contract_no in re.split(r'[,;\n]+', follow_on):
+                    contract_no = normalize_piid(contract_no)
+                    if contract_no:
+                        self.forecasts.setdefault(contract_no, {
+                            'Forecast No': str(forecast_no).strip(),
+                            'Forecasted Value': str(forecasted_value).strip() if pd.notna(forecasted_value) else "Not Provided",
+                            'Forecast Source': name,
+                        })
+
+        self._signatures = signatures
+
+        return True
+
+    def lookup(self, contract_no) -> dict:
+        """
+        Get the forecast that follows on a contract.
+
+        Args:
+        contract_no: The Contract No.
+
+        Returns:
+        dict: The 'Forecast No', 'Forecasted Value', and 'Forecast Source', or an empty dict if no forecast follows on the contract.
+        """
+        self.refresh()
+        return self.forecasts.get(normalize_piid(contract_no), {})
+
+    def join(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Attach the forecast of every row of a DataFrame at once.
+
+        Args:
+        df (pd.DataFrame): Rows with the 'Contract No' column.
+
+        Returns:
+        pd.DataFrame: The 'Forecast No', 'Forecasted Value', and 'Forecast Source' of every row, indexed like df.  Rows without a forecast are "No Forecast Identified".
+        """
+        self.refresh()
+        forecast_df = pd.DataFrame.from_dict(self.forecasts, orient='index', columns=['Forecast No', 'Forecasted Value', 'Forecast Source'])
+        contracts = df['Contract No'].map(normalize_piid).astype(object)
+
+        joined_df = forecast_df.reindex(contracts.values).fillna("No Forecast Identified")
+        joined_df.index = df.index
+
+        return joined_df
+
+# Create the forecast index used by the forecast checks.  Nothing is read until the first lookup.
+forecast_index = ForecastIndex(forecast_sources)
+
+def check_pcf_cabinet_link(record) -> str:
+    '''
+    Check the file and determine if there is a link to the identified contract being processes.
+    
+    Args:
+    record (ContractRecord): The record view of the contract being processed.
+    
+    Returns:
+    str: The hyperlink to the PCF Cabinet.
+    '''
+    #Define Contract No and Order No from the record argument
+    contract_no = record['Contract No']
+    order_no = record.get('Order No')
+
+    # Check the order no first, then the contract no, against the normalized PCF hyperlink index.  Otherwise, return the not found message.
+    return hyperlink_index.lookup(contract_no, order_no)
+
+# Define the IT Buy keywords and the description columns they are searched in
+it_buy_keywords = ['IT', 'INFORMATION TECHNOLOGY', 'TECHNOLOGY', 'SOFTWARE', 'HARDWARE', 'COMPUTER', 'NETWORK', 'CYBERSECURITY', 'CLOUD', 'DATA', 'ANALYTICS', 'AI', 'ARTIFICIAL INTELLIGENCE', 'MACHINE LEARNING', 'ML', 'IOT', 'INTERNET OF THINGS', 'BLOCKCHAIN', 'CRYPTO', 'CRYPTOCURRENCY', 'DIGITAL', 'ELECTRONIC', 'TELECOMMUNICATIONS', 'TELECOMM', 'TELECOM', 'TELEPHONE', 'TELEPHONY', 'TELEPHONIC', 'TELEPHONICS']
+it_buy_columns = ['NAICS Description', 'PSC Description', 'OMB Level 1', 'OMB Level 2']
+
+# This class compiles the IT Buy keyword pattern once and remembers the keywords matched for every combination of descriptions.  There are only a few thousand distinct descriptions, so the whole dataset is classified by matching each distinct combination once.
+class ITClassifier:
+    """
+    Memoized IT Buy keyword classifier.
+
+    Args:
+    keywords (list): The IT Buy keywords.  They are matched as whole words, ignoring case.
+    columns (list): The description columns to search.
+    """
+
+    def __init__(self, keywords: list, columns: list):
+        self.columns = columns
+
+        # Longer keywords are listed first so "INFORMATION TECHNOLOGY" is reported instead of "TECHNOLOGY"
+        self.pattern = re.compile(r'\b(?:' + '|'.join(re.escape(keyword) for keyword in sorted(keywords, key=len, reverse=True)) + r')\b', re.IGNORECASE)
+        self._matches = {}
+
+    def matched_keywords(self, descriptions: tuple) -> tuple:
+        """
+        Get the IT Buy keywords found in a combination of descriptions.
+
+        Args:
+        descriptions (tuple): One value per description column.  Missing values are skipped.
+
+        Returns:
+        tuple: The matched keywords in upper case, in the order they were found, without repeats.
+        """
+        matches = self._matches.get(descriptions)
+        if matches is None:
+            found = []
+            for description in descriptions:
+                if isinstance(description, str):
+                    found.extend(keyword.upper() for keyword in self.pattern.findall(description))
+            matches = tuple(dict.fromkeys(found))
+            self._matches[descriptions] = matches
+
+        return matches
+
+    def classify(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Classify every row of a DataFrame as an IT Buy or not.
+
+        Args:
+        df (pd.DataFrame): Rows with the description columns.  Missing columns are treated as blank.
+
+        Returns:
+        pd.DataFrame: The boolean 'IT Buy' column and the 'IT Keywords' that were matched (comma separated), indexed like df.
+        """
+        descriptions = df.reindex(columns=self.columns).astype(object)
+        descriptions = descriptions.where(descriptions.notna(), None)
+
+        # Match each distinct combination of descriptions once and spread the result back to the rows
+        codes, unique_descriptions = pd.factorize(pd.MultiIndex.from_frame(descriptions))
+        keywords = np.array([', '.join(self.matched_keywords(tuple(combination))) for combination in unique_descriptions], dtype=object)
+        keywords = keywords[codes] if len(codes) else np.array([], dtype=object)
+
+        return pd.DataFrame({'IT Buy': keywords != '', 'IT Keywords': keywords}, index=df.index)
+
+# Create the IT Buy classifier used by the IT Buy check
+it_classifier = ITClassifier(it_buy_keywords, it_buy_columns)
+
+def check_it_buy(record) -> str:
+    """
+    Check the NAICS Description, PSC Description, OMB Level 1 and OMB Level 2 columns for certain combinations and keywords to determine if it is an IT buy.
+
+    Args:
+    record (ContractRecord): The record view of the contract being processed.
+
+    Returns:
+    str: "Yes" if the NAICS description contains specific keywords, "No" otherwise.
+    """
+    # Use columns 'NAICS Description', 'PSC Decription', 'OMB Level 1', and 'OMB Level 2' to check for IT Buy keywords.  Missing columns and blank descriptions are skipped.
+    descriptions = tuple(record.get(column) for column in it_buy_columns)
+    descriptions = tuple(None if description is None or pd.isna(description) else description for description in descriptions)
+
+    # Check if any of the IT Buy keywords are present in the descriptions
+    if it_classifier.matched_keywords(descriptions):
+        return "Yes"
+    else:
+        return "No"
+
+def check_it_keywords(record) -> str:
+    """
+    Get the IT Buy keywords found in the descriptions of the contract.
+
+    Args:
+    record (ContractRecord): The record view of the contract being processed.
+
+    Returns:
+    str: The matched keywords (comma separated), or "None" if no keyword was found.
+    """
+    descriptions = tuple(record.get(column) for column in it_buy_columns)
+    descriptions = tuple(None if description is None or pd.isna(description) else description for description in descriptions)
+
+    return ', '.join(it_classifier.matched_keywords(descriptions)) or "None"
+
+def check_socio_sole_source_eligible(record) -> str:
+    """
+    Check if the contract is eligible for sole source award based on the dollar value.
+
+    Args:
+    record (ContractRecord): The record view of the contract being processed.
+
+    Returns:
+    str: "Yes" if the contract is eligible for sole source award based on the $4M threshold for SDVOSB and $4.5M for all others, "No" otherwise.
+    """
+    # Select the 'Socio-Economic Status' value from the record of the current contract being processed
+    sdvosb_sole_source_threshold = 4000000
+    all_others_sole_source_threshold = 4500000
+    
+    # create a list of all other sole source thresholds
+    all_eligible_sole_source_categories = ['8(a)', 'HUBZone', 'WOSB', 'EDWOSB', 'SDVOSB']
+    eligible_sole_sole_categories_above_sdvosb_threshold = ['8(a)', 'HUBZone', 'WOSB', 'EDWOSB']
+    eligible_sole_source_categories_above_sdvosb_not_wosb_naics_list = ['8(a)', 'HUBZone']
+    eligible_sole_sole_categories_not_on_wosb_naics_list = ['8(a)', 'HUBZone', 'SDVOSB']
+    
+    # Get the 'SB Dollars' value from the record argument.  The interim schema already stores it as a number.
+    sb_dollars = pd.to_numeric(record['SB Dollars'], errors='coerce')
+        
+    # # If the SB dollars less than sdvosb_sole_source_threshold AND the WOSB NAICS list is "Yes", return all_eligible_sole_source_categories as str
+    # if sb_dollars > all_others_sole_source_threshold:
+    #     return 'No'
+    # elif sb_dollars >= sdvosb_sole_source_threshold and check_wosb_naics(record) == "No":
+    #     return ', '.join(eligible_sole_source_categories_above_sdvosb_not_wosb_naics_list)
+    # elif sb_dollars <= sdvosb_sole_source_threshold and check_wosb_naics(record) == "No":
+    #     return ', '.join(eligible_sole_sole_categories_not_on_wosb_naics_list)
+    # elif sb_dollars >= sdvosb_sole_source_threshold and check_wosb_naics(record) != "No":
+    #     return ', '.join(eligible_sole_sole_categories_above_sdvosb_threshold)
+    # elif sb_dollars <= sdvosb_sole_source_threshold and check_wosb_naics(record) != "No":
+    #     return ', '.join(all_eligible_sole_source_categories)
+
+sb_profile_analysis_functions = {
+    "IT Buy" : check_it_buy, # Check NAICS desription to determine if it is an IT buy, search for specific keywords and return yes or no
+    "IT Keywords" : check_it_keywords, # The IT Buy keywords that were found
+    # "Strong Competition" : check_strong_competition, # Get a sense of average number of offerors against this NAICS (use all army data source file)
+    "Size Standard" : check_size_standard,
+    "Top NAICS" : check_top_naics, #Top 25 NIACS either by SB Dollars or SB Actions
+    "Target NAICS" : check_targeted_naics, #NAICS identified by specific needs or objectives or rationales/logic
+    "WOSB Eligible" : check_wosb_naics, # Check if the NAICS code value is present in the Underrepresented WOSB NAICS listing
+    "Strong NAICS" : check_strong_naics, #Top 30% of NAICS based on SB Dollars or SB Actions
+    "Weak NAICS" : check_weak_naics, #10th percentile of SB Dollars or SB Actions
+    # "Socio SS Eligible" : check_socio_sole_source_eligible, # Check if the $ value is below the threshold ($4M SDVOSB, $4.5M all others)
+    "ACC RI Awards" : check_acc_ri_awards, #Awards that went to SB under the identified NAICS
+    "All ACC Awards" : check_all_acc_awards, #All awards made by ACC across the enterprise
+    "Awardee SB" : check_if_awardee_sb,
+    "Awardee Socio" : check_awardee_socioeconomic_status,
+    "Awardee SB Dollars" : check_awardee_sb_dollars, #Total SB dollars of the awardee from the awardee index
+    "Awardee NAICS Spread" : check_awardee_naics_spread, #NAICS count and top NAICS of the awardee from the awardee index
+    "Awardee Recent Wins" : check_awardee_recent_wins, #Awards of the awardee in the last three fiscal years from the awardee index
+    "NMR Waiver Available" : check_if_nmr_waiver_available, #Does an NMR waiver exist based on NAICS
+    "Financial Risk" : check_financial_risk, #Financial risk to industry based on distribution of SB awards under identified NAICS"
+    "Modification No" : check_modification, #Check if the contract is a modification and get the most recent number
+    "Modification Count" : check_modification_count, #Number of modifications of the contract
+    "Last Modification Date" : check_last_modification_date, #Award date of the most recent modification
+    "PCF Cabinet" : check_pcf_cabinet_link, #Provide link to PCF Cabinet and return a str or hyperlink
+    "Forecast No" : check_forecast, # Identify the forecast solicitation/PANCOC number
+    "Forecasted Value" : check_forecasted_value # Forecasted contract value of the follow-on
+}
+
+# Batch SB Profile Analysis.  Each element in sb_profile_analysis_functions can register a vectorized implementation that takes the whole targets DataFrame and returns a Series.  run_profile_analysis computes every element as a column in one pass, and elements without a batch implementation fall back to calling their check function for each record.
+sb_profile_analysis_batch_functions = {}
+
+# This decorator registers a vectorized implementation of an SB Profile Analysis element.
+def register_batch_analysis(element: str):
+    """
+    Register a function as the batch implementation of an SB Profile Analysis element.
+
+    Args:
+    element (str): The element name, matching the key in sb_profile_analysis_functions.
+
+    Returns:
+    function: The decorator.  The decorated function takes the targets DataFrame and returns a Series aligned to its index.
+    """
+    def decorator(func):
+        sb_profile_analysis_batch_functions[element] = func
+        return func
+    return decorator
+
+# The SB award counts computed by count_sb_awards_by_naics, keyed by the source file.
+sb_award_counts_cache = {}
+
+# This function counts the awards made to small businesses for every NAICS in one pass over a data source file.  Modifications, MATOCs, and SATOCs are not counted as awards.
+def count_sb_awards_by_naics(source_file: str) -> pd.Series:
+    """
+    Count the SB awards for every NAICS in a data source file.
+
+    Args:
+    source_file (str): The cleansed data source file (ACC-RI or army-wide).
+
+    Returns:
+    pd.Series: The number of SB awards indexed by the normalized NAICS.
+    """
+    # Reuse the counts if the file has not changed since they were computed
+    signature = file_signature(resolve_interim_file(source_file))
+    cached = sb_award_counts_cache.get(source_file)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    # Only read the columns needed to count the awards
+    awards_df = read_interim_dataset(source_file, columns=['NAICS', 'Size Status', 'Contract Action Type'])
+
+    # Remove "MODIFICATION", "MATOC", and "SATOC" and keep the SB awards
+    awards_df = awards_df[~awards_df['Contract Action Type'].str.upper().isin(["MODIFICATION", "MATOC", "SATOC"])]
+    awards_df = awards_df[awards_df['Size Status'].astype(str).str.strip() == "SB"]
+
+    award_counts = awards_df['NAICS'].astype(str).value_counts()
+    sb_award_counts_cache[source_file] = (signature, award_counts)
+
+    return award_counts
+
+# This helper function gets the IT Buy classification of the targets.  transform_contract_data already stores 'IT Buy' and 'IT Keywords' on every row of the data source, so those columns are used and only the rows without them are classified.
+def it_classification(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Get the IT Buy classification of every row.
+
+    Args:
+    df (pd.DataFrame): The targets.
+
+    Returns:
+    pd.DataFrame: The boolean 'IT Buy' column and the 'IT Keywords' that were matched (comma separated), indexed like df.
+    """
+    if 'IT Buy' not in df.columns or 'IT Keywords' not in df.columns:
+        return it_classifier.classify(df)
+
+    # The stored IT Buy is boolean in the data source and "Yes" or "No" in a saved profile analysis
+    it_buy = df['IT Buy']
+    if not pd.api.types.is_bool_dtype(it_buy):
+        it_buy = it_buy.astype(object).where(it_buy.notna(), None).map(lambda value: None if value is None else str(value).strip().lower() in ['true', '1', 'yes'])
+    keywords = df['IT Keywords'].astype(object).where(df['IT Keywords'].notna(), '').replace('None', '')
+    classification = pd.DataFrame({'IT Buy': it_buy.astype(object), 'IT Keywords': keywords}, index=df.index)
+
+    # Classify the rows that have no stored IT Buy
+    missing = classification['IT Buy'].isna()
+    if missing.any():
+        classification.loc[missing, ['IT Buy', 'IT Keywords']] = it_classifier.classify(df.loc[missing]).astype(object).to_numpy()
+
+    return classification.astype({'IT Buy': bool, 'IT Keywords': str})
+
+@register_batch_analysis("IT Buy")
+def batch_it_buy(df: pd.DataFrame) -> pd.Series:
+    """
+    Batch version of check_it_buy.
+    """
+    return pd.Series(np.where(it_classification(df)['IT Buy'], "Yes", "No"), index=df.index)
+
+@register_batch_analysis("IT Keywords")
+def batch_it_keywords(df: pd.DataFrame) -> pd.Series:
+    """
+    Batch version of check_it_keywords.
+    """
+    return it_classification(df)['IT Keywords'].replace('', "None")
+
+@register_batch_analysis("Size Standard")
+def batch_size_standard(df: pd.DataFrame) -> pd.Series:
+    """
+    Batch version of check_size_standard.
+    """
+    naics_reference.refresh()
+    naics = normalize_naics_column(df['NAICS'])
+    return naics.map(naics_reference.size_standards).fillna(naics + ' not found')
+
+@register_batch_analysis("WOSB Eligible")
+def batch_wosb_naics(df: pd.DataFrame) -> pd.Series:
+    """
+    Batch version of check_wosb_naics.
+    """
+    naics_reference.refresh()
+    return normalize_naics_column(df['NAICS']).map(naics_reference.wosb_naics).fillna("No")
+
+@register_batch_analysis("NMR Waiver Available")
+def batch_nmr_waiver_available(df: pd.DataFrame) -> pd.Series:
+    """
+    Batch version of check_if_nmr_waiver_available.
+    """
+    naics_reference.refresh()
+    return pd.Series(np.where(normalize_naics_column(df['NAICS']).isin(naics_reference.nmr_waivers.keys()), "Yes", "No"), index=df.index)
+
+@register_batch_analysis("Target NAICS")
+def batch_targeted_naics(df: pd.DataFrame) -> pd.Series:
+    """
+    Batch version of check_targeted_naics.
+    """
+    # The targeted NAICS sectors are the same as check_targeted_naics
+    targeted_naics = ['33', '51', '54']
+    return pd.Series(np.where(normalize_naics_column(df['NAICS']).str[:2].isin(targeted_naics), "Yes", "No"), index=df.index)
+
+def batch_naics_statistics_flag(df: pd.DataFrame, flag_column: str) -> pd.Series:
+    """
+    Map a Top, Strong, or Weak NAICS flag from the NAICS statistics table onto every row as "Yes" or "No".
+    """
+    naics_statistics.refresh()
+    flags = pd.Series({naics: bool(row[flag_column]) for naics, row in naics_statistics.statistics.items()}, dtype=bool)
+    flagged = normalize_naics_column(df['NAICS']).map(flags).fillna(False).astype(bool)
+    return pd.Series(np.where(flagged, "Yes", "No"), index=df.index)
+
+@register_batch_analysis("Top NAICS")
+def batch_top_naics(df: pd.DataFrame) -> pd.Series:
+    """
+    Batch version of check_top_naics.
+    """
+    return batch_naics_statistics_flag(df, 'Top NAICS')
+
+@register_batch_analysis("Strong NAICS")
+def batch_strong_naics(df: pd.DataFrame) -> pd.Series:
+    """
+    Batch version of check_strong_naics.
+    """
+    return batch_naics_statistics_flag(df, 'Strong NAICS')
+
+@register_batch_analysis("Weak NAICS")
+def batch_weak_naics(df: pd.DataFrame) -> pd.Series:
+    """
+    Batch version of check_weak_naics.
+    """
+    return batch_naics_statistics_flag(df, 'Weak NAICS')
+
+@register_batch_analysis("ACC RI Awards")
+def batch_acc_ri_awards(df: pd.DataFrame) -> pd.Series:
+    """
+    Batch version of check_acc_ri_awards.
+    """
+    award_counts = count_sb_awards_by_naics(common_folders['cleansed_data_source_file'])
+    return normalize_naics_column(df['NAICS']).map(award_counts).fillna(0).astype(int).astype(str)
+
+@register_batch_analysis("All ACC Awards")
+def batch_all_acc_awards(df: pd.DataFrame) -> pd.Series:
+    """
+    Batch version of check_all_acc_awards.
+    """
+    award_counts = count_sb_awards_by_naics(common_folders['cleansed_all_army_data_source_file'])
+    return normalize_naics_column(df['NAICS']).map(award_counts).fillna(0).astype(int).astype(str)
+
+@register_batch_analysis("Awardee SB")
+def batch_if_awardee_sb(df: pd.DataFrame) -> pd.Series:
+    """
+    Batch version of check_if_awardee_sb.
+    """
+    return pd.Series(np.where(df['Size Status'] == "SB", "Yes", "No"), index=df.index)
+
+@register_batch_analysis("Awardee Socio")
+def batch_awardee_socioeconomic_status(df: pd.DataFrame) -> pd.Series:
+    """
+    Batch version of check_awardee_socioeconomic_status.
+    """
+    socio_flags = df['Socio Flags'] if 'Socio Flags' in df.columns else encode_socio_flags(df)
+    return decode_socio_flags(socio_flags)
+
+@register_batch_analysis("Financial Risk")
+def batch_financial_risk(df: pd.DataFrame) -> pd.Series:
+    """
+    Batch version of check_financial_risk.
+    """
+    return assign_financial_risk(df[['NAICS', 'SB Dollars']])['Financial Risk']
+
+@register_batch_analysis("PCF Cabinet")
+def batch_pcf_cabinet_link(df: pd.DataFrame) -> pd.Series:
+    """
+    Batch version of check_pcf_cabinet_link.
+    """
+    return hyperlink_index.join(df)
+
+@register_batch_analysis("Forecast No")
+def batch_forecast(df: pd.DataFrame) -> pd.Series:
+    """
+    Batch version of check_forecast.
+    """
+    return forecast_index.join(df)['Forecast No']
+
+@register_batch_analysis("Forecasted Value")
+def batch_forecasted_value(df: pd.DataFrame) -> pd.Series:
+    """
+    Batch version of check_forecasted_value.
+    """
+    return forecast_index.join(df)['Forecasted Value']
+
+@register_batch_analysis("Modification No")
+def batch_modification(df: pd.DataFrame) -> pd.Series:
+    """
+    Batch version of check_modification.
+    """
+    modification_index.refresh()
+    return df['Contract No'].astype(str).map({contract_no: row['Modification No'] for contract_no, row in modification_index.modifications.items()}).fillna("No Modifications")
+
+@register_batch_analysis("Modification Count")
+def batch_modification_count(df: pd.DataFrame) -> pd.Series:
+    """
+    Batch version of check_modification_count.
+    """
+    modification_index.refresh()
+    return df['Contract No'].astype(str).map({contract_no: row['Modification Count'] for contract_no, row in modification_index.modifications.items()}).fillna(0).astype(int).astype(str)
+
+@register_batch_analysis("Last Modification Date")
+def batch_last_modification_date(df: pd.DataFrame) -> pd.Series:
+    """
+    Batch version of check_last_modification_date.
+    """
+    modification_index.refresh()
+    last_modification_dates = pd.to_datetime(df['Contract No'].astype(str).map({contract_no: row['Last Modification Date'] for contract_no, row in modification_index.modifications.items()}))
+    return last_modification_dates.dt.strftime('%Y-%m-%d').fillna("No Modifications")
+
+# This helper function gives the awardee index row of every target as a list of dictionaries for the awardee history formatters.  A target without a history gets an empty dictionary.
+def awardee_history_records(df: pd.DataFrame) -> list:
+    """
+    Get the award history of every target contract.
+
+    Args:
+    df (pd.DataFrame): The targets.
+
+    Returns:
+    list: The awardee index row of every target, in the order of df.
+    """
+    history_df = awardee_index.join(df)
+    return [{} if pd.isna(history['Awardee Key']) else history for history in history_df.to_dict('records')]
+
+@register_batch_analysis("Awardee SB Dollars")
+def batch_awardee_sb_dollars(df: pd.DataFrame) -> pd.Series:
+    """
+    Batch version of check_awardee_sb_dollars.
+    """
+    return pd.Series([format_awardee_sb_dollars(history) for history in awardee_history_records(df)], index=df.index)
+
+@register_batch_analysis("Awardee NAICS Spread")
+def batch_awardee_naics_spread(df: pd.DataFrame) -> pd.Series:
+    """
+    Batch version of check_awardee_naics_spread.
+    """
+    return pd.Series([format_awardee_naics_spread(history) for history in awardee_history_records(df)], index=df.index)
+
+@register_batch_analysis("Awardee Recent Wins")
+def batch_awardee_recent_wins(df: pd.DataFrame) -> pd.Series:
+    """
+    Batch version of check_awardee_recent_wins.
+    """
+    return pd.Series([format_awardee_recent_wins(history) for history in awardee_history_records(df)], index=df.index)
+
+# Profile cache.  Each target contract's SB Profile Analysis values and rendered document are kept with the hashes of the inputs they were built from, so a contract that carries over from the last run is neither analyzed nor rendered again.  A profile is rebuilt when one of its inputs changes:
+# contract row: the contract's own row in the target list (Months Remaining is left out because it only moves with today's date)
+# NAICS aggregates: the NAICS statistics, the ACC-RI and Army SB award counts, and the financial risk thresholds of the contract's NAICS
+# modifications: the modification summary of the contract
+# awardee history: the awardee index row of the contract's awardee
+# reference lists: the size standard, WOSB, NMR waiver, hyperlink, and forecast listings
+# code: this module, which holds the checks and the element dictionaries
+# template: the contract profile template (rendering only)
+profile_cache_excluded_columns = ['Months Remaining', 'Profile Key']
+
+# This helper function hashes any JSON-compatible value for the profile cache.  Values JSON does not know (numpy numbers, timestamps) are hashed as text.
+def hash_profile_input(value) -> str:
+    """
+    Get a short hash of a value.
+
+    Args:
+    value: The value to hash.
+
+    Returns:
+    str: The first 16 characters of the MD5 hash of the value as sorted JSON.
+    """
+    return hashlib.md5(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+# This class keeps the profile cache as a JSON file keyed by the profile id of each target contract.
+class ProfileCache:
+    """
+    Per-contract cache of the SB Profile Analysis values and the rendered documents.
+
+    Each entry holds the input hashes of the contract ('components'), the 'Profile Key' built from them, the inputs that 'changes' since the previous entry, the SB Profile Analysis values ('analysis'), and what was last rendered ('rendered': the profile key, template version, document, and Contract Details and SB Profile Analysis display values).
+
+    Args:
+    cache_file (str): The path to the JSON cache.
+    """
+
+    def __init__(self, cache_file: str):
+        self.cache_file = cache_file
+        self.sources = {}
+        self.profiles = {}
+        if os.path.exists(cache_file):
+            with open(cache_file, 'r') as file:
+                self.profiles = json.load(file)
+
+    def save(self) -> None:
+        """
+        Save the cache.
+        """
+        os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+        with open(self.cache_file, 'w') as file:
+            json.dump(self.profiles, file, default=str)
+
+    def code_version(self, roots: dict) -> str:
+        """
+        Hash the code that the profiles are analyzed or rendered with.
+
+        Args:
+        roots (dict): The functions and settings to start from, keyed by their name (see code_dependencies).
+
+        Returns:
+        str: The hash of the source of the roots and the functions, classes, and settings they use.
+        """
+        return hash_profile_input(code_dependencies(roots, globals(), self.sources))
+
+    def profile_ids(self, df: pd.DataFrame) -> pd.Series:
+        """
+        Get the profile id of every target contract.
+
+        Args:
+        df (pd.DataFrame): The targets.
+
+        Returns:
+        pd.Series: The Row Key of each target (or its Contract No and Order No if there is no Row Key).  A repeated id is numbered so every target has its own entry.
+        """
+        if 'Row Key' in df.columns:
+            profile_ids = df['Row Key'].astype(str)
+        else:
+            profile_ids = df['Contract No'].astype(str) + '|' + (df['Order No'].astype(str) if 'Order No' in df.columns else '')
+
+        repeats = profile_ids.groupby(profile_ids).cumcount()
+        return profile_ids.where(repeats == 0, profile_ids + '#' + repeats.astype(str))
+
+    def profile_components(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Hash the analysis inputs of every target contract.
+
+        Args:
+        df (pd.DataFrame): The targets, before the SB Profile Analysis columns are added.
+
+        Returns:
+        pd.DataFrame: One column per input ('contract row', 'NAICS aggregates', 'modifications', 'awardee history', 'reference lists', 'code'), indexed like df.
+        """
+        contract_columns = [column for column in df.columns if column not in profile_cache_excluded_columns]
+        contract_row = pd.util.hash_pandas_object(df[contract_columns], index=False).map('{:016x}'.format)
+
+        # The NAICS aggregates are hashed once per NAICS
+        naics = normalize_naics_column(df['NAICS'])
+        acc_ri_award_counts = count_sb_awards_by_naics(common_folders['cleansed_data_source_file'])
+        army_award_counts = count_sb_awards_by_naics(common_folders['cleansed_all_army_data_source_file'])
+        thresholds_df = build_financial_risk_thresholds()
+        naics_aggregates = {code: hash_profile_input([
+            naics_statistics.lookup(code),
+            int(acc_ri_award_counts.get(code, 0)),
+            int(army_award_counts.get(code, 0)),
+            thresholds_df.loc[code].tolist() if code in thresholds_df.index else None,
+        ]) for code in naics.unique()}
+
+        # The modification summary is hashed once per contract
+        contract_numbers = df['Contract No'].astype(str)
+        modifications = {contract_no: hash_profile_input(modification_index.lookup(contract_no)) for contract_no in contract_numbers.unique()}
+
+        # The awardee history is hashed once per awardee
+        awardee_history = pd.Series([hash_profile_input(history) for history in awardee_history_records(df)], index=df.index)
+
+        # The reference lists and the code are the same for every contract.  The code is only the code the SB Profile Analysis elements and their display values run, so an unrelated edit does not analyze every contract again.
+        reference_files = [common_folders[key] for key in ['size_standard_list', 'wosb_naics_list', 'nmr_waiver_list', 'hyperlinks_file', 'osbp_forecast_file', 'amc_forecast_file']]
+        reference_lists = hash_profile_input([file_signature(file_path, include_hash=True)[1] if os.path.exists(file_path) else "missing" for file_path in reference_files])
+        code = self.code_version({
+            'sb_profile_analysis_functions': sb_profile_analysis_functions,
+            'sb_profile_analysis_batch_functions': sb_profile_analysis_batch_functions,
+            'build_profile_values': build_profile_values,
+        })
+
+        return pd.DataFrame({
+            'contract row': contract_row.to_numpy(),
+            'NAICS aggregates': naics.map(naics_aggregates).to_numpy(),
+            'modifications': contract_numbers.map(modifications).to_numpy(),
+            'awardee history': awardee_history.to_numpy(),
+            'reference lists': reference_lists,
+            'code': code,
+        }, index=df.index)
+
+    def changes(self, profile_id: str, components: dict) -> list:
+        """
+        Get the inputs of a contract that changed since its cache entry was saved.
+
+        Args:
+        profile_id (str): The profile id.
+        components (dict): The current input hashes of the contract.
+
+        Returns:
+        list: The names of the changed inputs, ['new contract'] if the contract is not in the cache, or [] if nothing changed.
+        """
+        entry = self.profiles.get(profile_id)
+        if entry is None or 'analysis' not in entry:
+            return ['new contract']
+
+        return [name for name, value in components.items() if entry['components'].get(name) != value]
+
+# Create the profile cache used by the SB Profile Analysis and the rendering
+profile_cache = ProfileCache(common_folders['profile_cache_file'])
+
+# This function computes every SB Profile Analysis element for all of the target contracts in a single pass and saves the enriched targets as profile_analysis.csv.  The Word rendering reads the precomputed columns.
+def run_profile_analysis(df: pd.DataFrame, destination_file: str = None, use_cache: bool = True) -> pd.DataFrame:
+    """
+    Compute every SB Profile Analysis element as a column of the targets DataFrame.
+
+    Args:
+    df (pd.DataFrame): The targets DataFrame.  It is not modified.
+    destination_file (str): Where to save the enriched targets.  Defaults to common_folders['profile_analysis_file'].  Pass False to skip saving.
+    use_cache (bool): If True, the contracts whose inputs are unchanged since the last run reuse their values from the profile cache and only the other contracts are analyzed.  If False, every contract is analyzed and the profile cache is neither read nor updated.
+
+    Returns:
+    pd.DataFrame: A copy of df with one column per element in sb_profile_analysis_functions and, when the cache is used, the 'Profile Key' of the inputs of each contract.
+    """
+    if destination_file is None:
+        destination_file = common_folders['profile_analysis_file']
+
+    df = df.reset_index(drop=True)
+    run_recorder.set_rows(rows_in=len(df))
+
+    # Find the contracts whose inputs are unchanged since their cache entry was saved.  The inputs are only hashed when the cache is used.
+    if use_cache:
+        profile_ids = profile_cache.profile_ids(df)
+        components_df = profile_cache.profile_components(df)
+        components = components_df.to_dict('records')
+        changes = [profile_cache.changes(profile_id, contract_components) for profile_id, contract_components in zip(profile_ids, components)]
+    else:
+        changes = [['cache not used']] * len(df)
+    unchanged = np.array([not contract_changes for contract_changes in changes], dtype=bool)
+    analyze_df = df.loc[~unchanged]
+
+    # Compute every element against the original values before any of them are added to the DataFrame.  Only the changed contracts are analyzed.
+    analysis_columns = {}
+    contract_index = None
+    for element, check_function in sb_profile_analysis_functions.items():
+        if analyze_df.empty:
+            analysis_columns[element] = pd.Series(dtype=object)
+        elif element in sb_profile_analysis_batch_functions:
+            with run_recorder.check(element, calls=1, rows=len(analyze_df)):
+                analysis_columns[element] = sb_profile_analysis_batch_functions[element](analyze_df)
+        else:
+            # No batch implementation yet.  Call the check for each record from the contract index.
+            if contract_index is None:
+                contract_index = ContractIndex(analyze_df)
+            with run_recorder.check(element, calls=len(analyze_df), rows=len(analyze_df)):
+                analysis_columns[element] = pd.Series([check_function(record) for record in contract_index], index=analyze_df.index)
+
+    # Fill in the unchanged contracts from the profile cache
+    if unchanged.any():
+        cached_analysis = [profile_cache.profiles[profile_id]['analysis'] for profile_id in profile_ids[unchanged]]
+        for element in analysis_columns:
+            cached_values = pd.Series([analysis[element] for analysis in cached_analysis], index=df.index[unchanged], dtype=object)
+            analysis_columns[element] = pd.concat([analysis_columns[element].astype(object), cached_values]).reindex(df.index) if not analyze_df.empty else cached_values
+
+    # Add (or replace) the element columns in one step
+    df = df.drop(columns=[element for element in analysis_columns if element in df.columns] + [column for column in ['Profile Key'] if column in df.columns])
+    df = pd.concat([df, pd.DataFrame(analysis_columns, index=df.index)], axis=1)
+
+    # Save the analysis of the changed contracts.  What was last rendered is kept so the rendering can tell why a profile changed.
+    if use_cache:
+        df['Profile Key'] = components_df.apply(lambda row: hash_profile_input(row.to_list()), axis=1).to_numpy() if len(df) else pd.Series(dtype=object)
+        for position in np.flatnonzero(~unchanged):
+            profile_id = profile_ids.iloc[position]
+            entry = profile_cache.profiles.get(profile_id, {})
+            profile_cache.profiles[profile_id] = {
+                'components': components[position],
+                'Profile Key': df['Profile Key'].iloc[position],
+                'changes': changes[position],
+                'analysis': {element: analysis_columns[element].iloc[position] for element in analysis_columns},
+                'rendered': entry.get('rendered'),
+            }
+        profile_cache.save()
+
+    # Report which contracts were analyzed and why
+    change_counts = pd.Series([name for contract_changes in changes for name in contract_changes], dtype=object).value_counts()
+    print(f"SB Profile Analysis: {int(unchanged.sum())} of {len(df)} contracts are unchanged and were reused from the profile cache.  {int((~unchanged).sum())} were analyzed" + (" (" + ", ".join(f"{name}: {count}" for name, count in change_counts.items()) + ")" if len(change_counts) else "") + ".")
+
+    # Save the enriched targets
+    if destination_file:
+        os.makedirs(os.path.dirname(destination_file), exist_ok=True)
+        destination_file = write_interim_dataset(df, destination_file, schema=profile_analysis_schema)
+        print(f"SB Profile Analysis for {len(df)} contracts saved to: {destination_file}")
+    run_recorder.set_rows(rows_out=len(df))
+
+    return df
+
+# This function collects the display value of every Contract Details and SB Profile Analysis element for one target row.  The values are plain strings so they can be sent to the worker processes that render the documents.
+def build_profile_values(row: pd.Series, columns) -> dict:
+    """
+    Get the display values of the contract profile elements for one target contract.
+
+    Args:
+    row (pd.Series): The target row from run_profile_analysis.
+    columns: The columns of the targets DataFrame.
+
+    Returns:
+    dict: {'Contract Details': {element: value}, 'SB Profile Analysis': {element: value}}.  Missing Contract Details are "Data Gap" and missing SB Profile Analysis values are blank.
+    """
+    return {
+        'Contract Details': {element: format_profile_value(element, row[element]) if element in columns else 'Data Gap' for element in contract_profile_data_elements.values()},
+        'SB Profile Analysis': {element: format_profile_value(element, row[element]) if element in columns else '' for element in sb_profile_analysis_elements.values()},
+    }
+
+# This helper function formats one value for the contract profile tables.  The interim datasets keep dates and dollars typed, so they are formatted here instead of when the data is saved.
+def format_profile_value(element: str, value) -> str:
+    """
+    Format a contract profile value for display.
+
+    Args:
+    element (str): The column name of the value.
+    value: The value from the target row.
+
+    Returns:
+    str: Dates as YYYY-MM-DD, dollar columns as currency, and everything else as text.
+    """
+    if isinstance(value, pd.Timestamp):
+        return value.strftime('%Y-%m-%d')
+    if interim_schema.get(element) == 'float64' and isinstance(value, (int, float)) and not pd.isna(value):
+        return '${:,.2f}'.format(value)
+
+    return str(value)
+
+# The template documents read by load_template_bytes, keyed by the template path.  Each worker process keeps its own copy.
+template_cache = {}
+
+# This function reads the template document into memory once per process.  Every profile is opened from the cached bytes instead of saving the template to the output path and re-opening it.
+def load_template_bytes(template_file: str) -> bytes:
+    """
+    Get the contents of the template document, reading the file only if it changed.
+
+    Args:
+    template_file (str): The path to the template document.
+
+    Returns:
+    bytes: The template .docx contents.
+    """
+    signature = file_signature(template_file)
+    cached = template_cache.get(template_file)
+    if cached is None or cached[0] != signature:
+        with open(template_file, 'rb') as file:
+            cached = (signature, file.read())
+        template_cache[template_file] = cached
+
+    return cached[1]
+
+# This function renders one contract profile Word document from the template and the precomputed profile values.  It is a top level function so it can run in a worker process.
+def render_contract_profile(profile_values: dict, template_file: str, new_filepath: str) -> str:
+    """
+    Render the Contract Details and Small Business Profile Analysis tables for one contract and save the document.
+
+    Args:
+    profile_values (dict): The display values from build_profile_values.
+    template_file (str): The path to the template document.
+    new_filepath (str): Where to save the completed document.
+
+    Returns:
+    str: The path to the completed document.
+    """
+    # Open a copy of the template from the in-memory buffer.  The document is only written to disk once, when it is complete.
+    doc = Document(io.BytesIO(load_template_bytes(template_file)))
+
+    # Create a uniform table for the Contract Details information in the document with four columns
+    table1 = doc.add_table(rows=1, cols=4)
+    table1.style = 'Table Grid'
+    
+    # Remove the first (and only) row which was added by default.  This will be replaced by the header row.  This may break if libraries are updated so be aware.    
+    if len(table1.rows) > 1:
+        table1._tbl.remove(table1.rows[0]._tr)
+    
+    # Add a header row and merge cells and center align for the "Contract Details" header
+    hdr_cells = table1.rows[0].cells
+    hdr_cells[0].merge(hdr_cells[1]).merge(hdr_cells[2]).merge(hdr_cells[3])
+    hdr_cells[0].text = 'Contract Details'
+    hdr_cells[0].paragraphs[0].alignment = 1  # Center alignment
+    set_cell_font(hdr_cells[0], font_size=11, bold=True)
+    
+    # Populate the table with all values from contract_profile_data_elements based on the table1 structure defined above
+    contract_details = profile_values['Contract Details']
+    values = list(contract_details.keys())
+    for i in range(0, len(values), 2):
+        row_cells = table1.add_row().cells
+        row_cells[0].text = values[i]
+        row_cells[1].text = contract_details[values[i]]
+        if i + 1 < len(values):
+            row_cells[2].text = values[i + 1]
+            row_cells[3].text = contract_details[values[i + 1]]
+        else:
+            row_cells[2].text = ''
+            row_cells[3].text = ''
+        for cell in row_cells:
+            set_cell_font(cell)
     
-    # top_naics = ['541611', '541512', '541330']
+    # # Add a row titled "PCF Cabinet" in the first cell and the remaining 3 cells are merge and left blank
+    # row_cells = table1.add_row().cells
+    # row_cells[0].text = 'PCF Cabinet'
+    # row_cells[1].merge(row_cells[2]).merge(row_cells[3])
+    # row_cells[1].text = contract_details['PCF Cabinet']
+    # for cell in row_cells:
+    #     set_cell_font(cell)
+    
+    # # Add a row titled "Forecast No" in the first cell and the remaining 3 cells are merge and left blank    
+    # row_cells = table1.add_row().cells
+    # row_cells[0].text = 'Forecast No'
+    # row_cells[1].merge(row_cells[2]).merge(row_cells[3])
+    # row_cells[1].text = contract_details['Forecast No']
+    # for cell in row_cells:
+    #    set_cell_font(cell)
+                     
+    # Add a paragraph break to ensure the next table is not connected to the previous one
+    doc.add_paragraph()
+    
+    # Create a uniform table for the Small Business Profile Analysis information in the document with four columns
+    table2 = doc.add_table(rows=1, cols=6)
+    table2.style = 'Table Grid'
+
+    # Add a header row and merge cells and center align for the "Small Business Profile Analysis" header
+    hdr_cells = table2.rows[0].cells
+    hdr_cells[0].merge(hdr_cells[1]).merge(hdr_cells[2]).merge(hdr_cells[3].merge(hdr_cells[4]).merge(hdr_cells[5]))
+    hdr_cells[0].text = 'Small Business Profile Analysis'
+    hdr_cells[0].paragraphs[0].alignment = 1  # Center alignment
+    set_cell_font(hdr_cells[0], font_size=11, bold=True)
+
+    # Populate the table with all values from sb_profile_analysis_elements based on the table1 structure defined above.  The values with a function were precomputed by run_profile_analysis.
+    sb_profile_analysis = profile_values['SB Profile Analysis']
+    values = list(sb_profile_analysis.keys())
+    for i in range(0, len(values), 3): 
+        row_cells = table2.add_row().cells
+        row_cells[0].text = values[i]
+        row_cells[1].text = sb_profile_analysis[values[i]]
+        if i + 1 < len(values):
+            row_cells[2].text = values[i + 1]
+            row_cells[3].text = sb_profile_analysis[values[i + 1]]
+        else:
+            row_cells[2].text = ''
+            row_cells[3].text = ''
+        if i + 2 < len(values):
+            row_cells[4].text = values[i + 2]
+            row_cells[5].text = sb_profile_analysis[values[i + 2]]
+        else:
+            row_cells[4].text = ''
+            row_cells[5].text = ''
+        for cell in row_cells:
+            set_cell_font(cell)
     
-    # Check if the 'NAICS' value is in either top_naics_by_actions or top_naics_by_actions. If yes in either one, return "Yes". If not in either, return "No"
-    if naics in top_naics_by_dollars or naics in top_naics_by_actions:
-        return "Yes"
-    else:
-        return "No"    
+    # Add a final row titled "Remarks" in the first cell and the remaining 3 cells are mergec and left blank
+    row_cells = table2.add_row().cells
+    row_cells[0].text = 'Remarks'
+    row_cells[1].merge(row_cells[2]).merge(row_cells[3].merge(row_cells[4]).merge(row_cells[5]))
+    for cell in row_cells:
+        set_cell_font(cell)
     
-    # if naics in top_naics:
-    #     return "Yes"
-    # else:
-    #     return "No"
+    # Add a paragraph break to ensure the sections is not connected to the previous one
+    doc.add_paragraph()
+    
+    # Save the populated document
+    doc.save(new_filepath)
+
+    return new_filepath
+
+# Direct OOXML rendering.  The python-docx object model is slow for the profile tables: every add_row, merge, and set_cell_font call walks the XML tree.  The fast renderer writes the same two tables as WordprocessingML text with the formatting already in each run and splices them into the template's word/document.xml.
+# The run properties set_cell_font gives the table text (Calibri 9) and the table headers (Calibri 11, bold)
+ooxml_run_properties = '<w:rPr><w:rFonts w:ascii="Calibri" w:hAnsi="Calibri"/><w:b w:val="0"/><w:sz w:val="18"/></w:rPr>'
+ooxml_header_run_properties = '<w:rPr><w:rFonts w:ascii="Calibri" w:hAnsi="Calibri"/><w:b/><w:sz w:val="22"/></w:rPr>'
+
+# The width of the text area (8.5" page with 1" margins) in twentieths of a point, used when the template's section properties do not give the page size or margins
+ooxml_default_text_width = 9360
+
+# The characters that are not allowed in XML.  They are removed from the values.
+ooxml_invalid_characters = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+# The template parts read by load_template_skeleton, keyed by the template path.  Each worker process keeps its own copy.
+template_skeleton_cache = {}
+
+# This function reads the template once per process and splits its document.xml where the tables are inserted, which is before the section properties at the end of the body (where doc.add_table adds them).
+def load_template_skeleton(template_file: str) -> tuple:
+    """
+    Get the parts of the template document, reading the file only if it changed.
+
+    Args:
+    template_file (str): The path to the template document.
+
+    Returns:
+    tuple: (the other parts as a list of (ZipInfo, bytes), the ZipInfo of word/document.xml, the document.xml text before the tables, the document.xml text after the tables, the width of the text area in twentieths of a point).
+    """
+    signature = file_signature(template_file)
+    cached = template_skeleton_cache.get(template_file)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    parts = []
+    with zipfile.ZipFile(io.BytesIO(load_template_bytes(template_file))) as template:
+        for info in template.infolist():
+            if info.filename == 'word/document.xml':
+                document_info = info
+                document_xml = template.read(info).decode('utf-8')
+            else:
+                parts.append((info, template.read(info)))
+
+    insert_at = document_xml.rfind('<w:sectPr')
+    if insert_at == -1:
+        insert_at = document_xml.rfind('</w:body>')
+
+    skeleton = (parts, document_info, document_xml[:insert_at], document_xml[insert_at:], template_text_width(document_xml[insert_at:]))
+    template_skeleton_cache[template_file] = (signature, skeleton)
+
+    return skeleton
+
+# This helper function reads the width of the text area from the last section properties of the template, which are the ones doc.add_table uses: the page width minus the left and right margins.
+def template_text_width(section_properties: str) -> int:
+    """
+    Get the width of the text area of the template.
+
+    Args:
+    section_properties (str): The document.xml text starting at the last <w:sectPr>.
+
+    Returns:
+    int: The page width minus the left and right margins, in twentieths of a point.
+    """
+    page_width = re.search(r'<w:pgSz\b[^>]*?\bw:w="(\d+)"', section_properties)
+    left_margin = re.search(r'<w:pgMar\b[^>]*?\bw:left="(-?\d+)"', section_properties)
+    right_margin = re.search(r'<w:pgMar\b[^>]*?\bw:right="(-?\d+)"', section_properties)
+    if not (page_width and left_margin and right_margin):
+        return ooxml_default_text_width
+
+    return int(page_width.group(1)) - int(left_margin.group(1)) - int(right_margin.group(1))
+
+# This helper function splits the text area equally between the table columns, rounding the same way as doc.add_table (which divides the width in EMUs and converts each column back to twentieths of a point).
+def ooxml_column_width(text_width: int, columns: int) -> int:
+    """
+    Get the width of one table column.
+
+    Args:
+    text_width (int): The width of the text area in twentieths of a point.
+    columns (int): The number of columns.
+
+    Returns:
+    int: The column width in twentieths of a point.
+    """
+    return int(round(text_width * 635 // columns / 635))
+
+# This helper function writes the text of a cell as WordprocessingML.  Tabs and line breaks become <w:tab/> and <w:br/>, the same as setting cell.text.
+def ooxml_run(text: str, run_properties: str) -> str:
+    """
+    Build the run of a table cell.
+
+    Args:
+    text (str): The cell text.
+    run_properties (str): The <w:rPr> of the run.
+
+    Returns:
+    str: The <w:r> element.
+    """
+    pieces = []
+    for piece in re.split(r'(\t|\r\n|\n|\r)', ooxml_invalid_characters.sub('', text)):
+        if piece == '\t':
+            pieces.append('<w:tab/>')
+        elif piece in ('\r\n', '\n', '\r'):
+            pieces.append('<w:br/>')
+        elif piece:
+            pieces.append('<w:t xml:space="preserve">' + xml_escape(piece) + '</w:t>')
+
+    return '<w:r>' + run_properties + ''.join(pieces) + '</w:r>'
+
+# This helper function writes one table cell.  A cell spanning several grid columns has a gridSpan, which is how a merged cell is stored.
+def ooxml_cell(text, width: int, span: int = 1, header: bool = False) -> str:
+    """
+    Build a table cell.
+
+    Args:
+    text (str): The cell text, or None for a cell without a run (the Remarks cell).
+    width (int): The width of one grid column.
+    span (int): The number of grid columns the cell spans.
+    header (bool): If True, the text is centered and uses the header font.
+
+    Returns:
+    str: The <w:tc> element.
+    """
+    cell_properties = f'<w:tcPr><w:tcW w:type="dxa" w:w="{width * span}"/>' + (f'<w:gridSpan w:val="{span}"/>' if span > 1 else '') + '</w:tcPr>'
+    if text is None:
+        return '<w:tc>' + cell_properties + '<w:p/></w:tc>'
+    if header:
+        return '<w:tc>' + cell_properties + '<w:p><w:pPr><w:jc w:val="center"/></w:pPr>' + ooxml_run(text, ooxml_header_run_properties) + '</w:p></w:tc>'
+    return '<w:tc>' + cell_properties + '<w:p>' + ooxml_run(text, ooxml_run_properties) + '</w:p></w:tc>'
+
+# This function writes a profile table: a merged header row, then the elements and their values side by side, pairs_per_row pairs to a row.
+def ooxml_profile_table(title: str, values: dict, pairs_per_row: int, remarks: bool = False, text_width: int = ooxml_default_text_width) -> str:
+    """
+    Build a Contract Details or Small Business Profile Analysis table.
+
+    Args:
+    title (str): The header text.
+    values (dict): The display value of every element.
+    pairs_per_row (int): The number of element and value pairs in a row.
+    remarks (bool): If True, a Remarks row with an empty merged cell is added at the end.
+    text_width (int): The width of the text area of the template, shared equally by the columns.
+
+    Returns:
+    str: The <w:tbl> element.
+    """
+    columns = pairs_per_row * 2
+    width = ooxml_column_width(text_width, columns)
+
+    rows = ['<w:tr>' + ooxml_cell(title, width, span=columns, header=True) + '</w:tr>']
+    elements = list(values.keys())
+    for i in range(0, len(elements), pairs_per_row):
+        cells = []
+        for element in elements[i:i + pairs_per_row]:
+            cells += [ooxml_cell(element, width), ooxml_cell(values[element], width)]
+        cells += [ooxml_cell('', width)] * (columns - len(cells))
+        rows.append('<w:tr>' + ''.join(cells) + '</w:tr>')
+
+    if remarks:
+        rows.append('<w:tr>' + ooxml_cell('Remarks', width) + ooxml_cell(None, width, span=columns - 1) + '</w:tr>')
+
+    return (
+        '<w:tbl><w:tblPr><w:tblStyle w:val="TableGrid"/><w:tblW w:type="auto" w:w="0"/>'
+        '<w:tblLook w:firstColumn="1" w:firstRow="1" w:lastColumn="0" w:lastRow="0" w:noHBand="0" w:noVBand="1" w:val="04A0"/></w:tblPr>'
+        '<w:tblGrid>' + f'<w:gridCol w:w="{width}"/>' * columns + '</w:tblGrid>'
+        + ''.join(rows) + '</w:tbl>'
+    )
+
+# This function renders one contract profile by writing the tables straight into the template's document.xml.  It produces the same document as render_contract_profile and can run in a worker process.
+def render_contract_profile_xml(profile_values: dict, template_file: str, new_filepath: str) -> str:
+    """
+    Render the Contract Details and Small Business Profile Analysis tables for one contract and save the document.
+
+    Args:
+    profile_values (dict): The display values from build_profile_values.
+    template_file (str): The path to the template document.
+    new_filepath (str): Where to save the completed document.
+
+    Returns:
+    str: The path to the completed document.
+    """
+    parts, document_info, document_head, document_tail, text_width = load_template_skeleton(template_file)
+
+    # Each table is followed by an empty paragraph so the tables are not joined
+    tables = (
+        ooxml_profile_table('Contract Details', profile_values['Contract Details'], 2, text_width=text_width) + '<w:p/>'
+        + ooxml_profile_table('Small Business Profile Analysis', profile_values['SB Profile Analysis'], 3, remarks=True, text_width=text_width) + '<w:p/>'
+    )
+
+    # Copy the other template parts as they are and write the new document.xml
+    with zipfile.ZipFile(new_filepath, 'w', zipfile.ZIP_DEFLATED) as document:
+        for info, data in parts:
+            document.writestr(info, data)
+        document.writestr(document_info, (document_head + tables + document_tail).encode('utf-8'))
+
+    return new_filepath
 
-def check_strong_naics(df, contract_no) -> str:
+# The profile renderers.  'ooxml' writes the tables directly and 'python-docx' builds them with the python-docx object model.
+profile_renderers = {
+    'ooxml': render_contract_profile_xml,
+    'python-docx': render_contract_profile,
+}
+
+# The WordprocessingML namespace, for reading the tables back out of a rendered document
+ooxml_namespace = {'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'}
+
+# This helper function reads the layout and formatting of every table in a rendered document: the grid, and for every cell its span, width, alignment, text, and run fonts.
+def read_document_tables(document_file: str) -> list:
     """
-    Check if the NAICS code value is one of the Top 30% of unique NAICS identified by the amount of SB Actions or SB Dollars.
+    Read the tables of a .docx document for comparison.
 
     Args:
-    df (pd.DataFrame): The DataFrame containing the data to be processed.
-    contract_no (str): The contract number being processed.
+    document_file (str): The path to the document.
 
     Returns:
-    str:  If NAICS is present, return "Yes". Otherwise, return "No".
+    list: One dict per table with its 'style', 'grid' (the column widths), and 'rows' (a list of rows, each a list of cell dicts).
     """
-    
-    cleansed_file_df = pd.read_csv(common_folders['cleansed_data_source_file'], usecols=['NAICS', 'Size Status', 'SB Dollars'])
-    
-    # Select the 'NAICS' value from the DataFrame based on the current contract number being processed
-    naics = df.loc[df['Contract No'] == contract_no, 'NAICS'].values[0]
-    
-    # makre sure naics is a string and only the first six digits are used
-    naics = str(naics)[:6]
-    
-    # Idnentify the number of uniqe values in the 'NAICS' column by count !!MAY HAVE TO ALSO KEEP IT THE LAST 3 YEARS OF DATA!!
-    naics_count = cleansed_file_df['NAICS'].nunique()
-    # print("Number of unique NAICS values:", naics_count)
-    # print("")
-    
-    # Get the count for top 30% of NAICS based on SB Dollars or SB actions
-    strong_naics_count = int(naics_count * .3)
-    # print("Top 30% of NAICS count:", strong_naics_count)
-    # print("")
-    
-    # Make sure the 'SB Dollars' column is numeric from the DataFrame argument (NOT THE FULL RAW CLEANSED FILE).  This value will be used to compare against the percentiles from the cleansed_file_df.
-    # Ensure 'SB Dollars' column is string before removing currency formatting
-    cleansed_file_df['SB Dollars'] = cleansed_file_df['SB Dollars'].astype(str)
+    w = '{' + ooxml_namespace['w'] + '}'
+    with zipfile.ZipFile(document_file) as document:
+        body = ElementTree.fromstring(document.read('word/document.xml')).find('w:body', ooxml_namespace)
 
-    # Remove currency formatting from the SB Dollars column
-    cleansed_file_df['SB Dollars'] = cleansed_file_df['SB Dollars'].str.replace('$', '').str.replace(',', '')
+    tables = []
+    for table in body.findall('w:tbl', ooxml_namespace):
+        style = table.find('w:tblPr/w:tblStyle', ooxml_namespace)
+        rows = []
+        for row in table.findall('w:tr', ooxml_namespace):
+            cells = []
+            for cell in row.findall('w:tc', ooxml_namespace):
+                span = cell.find('w:tcPr/w:gridSpan', ooxml_namespace)
+                width = cell.find('w:tcPr/w:tcW', ooxml_namespace)
+                merge = cell.find('w:tcPr/w:vMerge', ooxml_namespace)
+                paragraphs = cell.findall('w:p', ooxml_namespace)
+                alignment = [paragraph.find('w:pPr/w:jc', ooxml_namespace) for paragraph in paragraphs]
+                fonts = []
+                text = []
+                for run in cell.iter(w + 'r'):
+                    run_properties = run.find('w:rPr', ooxml_namespace)
+                    fonts.append({} if run_properties is None else {child.tag.replace(w, ''): {key.replace(w, ''): value for key, value in child.attrib.items()} for child in run_properties})
+                    for child in run:
+                        if child.tag == w + 't':
+                            text.append(child.text or '')
+                        elif child.tag == w + 'tab':
+                            text.append('\t')
+                        elif child.tag == w + 'br':
+                            text.append('\n')
+                cells.append({
+                    'span': int(span.get(w + 'val')) if span is not None else 1,
+                    'width': width.get(w + 'w') if width is not None else None,
+                    'vertical merge': merge.get(w + 'val', 'continue') if merge is not None else None,
+                    'paragraphs': len(paragraphs),
+                    'alignment': [jc.get(w + 'val') if jc is not None else None for jc in alignment],
+                    'fonts': fonts,
+                    'text': ''.join(text),
+                })
+            rows.append(cells)
+        tables.append({
+            'style': style.get(w + 'val') if style is not None else None,
+            'grid': [column.get(w + 'w') for column in table.findall('w:tblGrid/w:gridCol', ooxml_namespace)],
+            'rows': rows,
+        })
 
-    # Convert the SB Dollars column to numeric
-    cleansed_file_df['SB Dollars'] = pd.to_numeric(cleansed_file_df['SB Dollars'], errors='coerce')
-    
-    # Ensure the 'NAICS' column is of the same type as naics and only six digits are used
-    cleansed_file_df['NAICS'] = cleansed_file_df['NAICS'].astype(str).str[:6].astype(type(naics))
-    
-    # Filter the cleased_file_df based on the naics identified from the contract being processed and print the filtered result to check if it matches the expected rows
-    # filtered_df = cleansed_file_df.loc[(cleansed_file_df['NAICS'] == naics) & (cleansed_file_df['Size Status'] == "SB")]
-    filtered_df = cleansed_file_df.loc[(cleansed_file_df['Size Status'] == "SB")]
-    # print("Filtered DataFrame based on NAICS and Size Status:", filtered_df)
-    # print("")
-    
-    # Define the targeted NAICS values based on the top 30% of unique NAICS based on total SB Dollars
-    filtered_df = filtered_df.groupby('NAICS').agg({'SB Dollars': 'sum'}).reset_index()
-    filtered_df = filtered_df.sort_values(by=['SB Dollars'], ascending=False)
-    strong_naics_by_dollars = filtered_df['NAICS'].head(strong_naics_count).tolist()
-    # print("Top NAICS by SB Dollars:", strong_naics_by_dollars)
-    # print("")
-    
-    # Define the targeted NAICS values based on the top 30% of unique NAICS based on total SB Actions (determined by "Size Status" column).
-    filtered_df = cleansed_file_df.loc[(cleansed_file_df['Size Status'] == "SB")]
-    filtered_df = filtered_df.groupby('NAICS').agg({'Size Status': 'count'}).reset_index()
-    filtered_df = filtered_df.sort_values(by=['Size Status'], ascending=False)
-    strong_naics_by_actions = filtered_df['NAICS'].head(strong_naics_count).tolist()
-    # print("Top NAICS by SB Actions:", strong_naics_by_actions)
-    # print("")
-    
-    # top_naics = ['541611', '541512', '541330']
-    
-    # Check if the 'NAICS' value is in either top_naics_by_actions or top_naics_by_actions. If yes in either one, return "Yes". If not in either, return "No"
-    if naics in strong_naics_by_dollars or naics in strong_naics_by_actions:
-        return "Yes"
-    else:
-        return "No"    
-    
-    # if naics in top_naics:
-    #     return "Yes"
-    # else:
-    #     return "No"
+    return tables
 
-# def check_weak_naics(df, contract_no) -> str:
+# This function checks that the fast renderer still produces the same tables as python-docx for a template.  It renders one profile with both renderers and compares the table grid, the cell merges, widths, alignment, and text, and the fonts of every run, including the header rows.
+def compare_profile_renderers(template_file: str, profile_values: dict = None) -> list:
     """
-    Check if the NAICS code value is one of the Weak NAICS in ACC-RI by 10th percentile of SB Dollars or SB Actions.
-    
+    Render one contract profile with the 'python-docx' and 'ooxml' renderers and compare the tables.
+
     Args:
-    df (pd.DataFrame): The DataFrame containing the data to be processed.
-    contract_no (str): The contract number being processed.
-    
-    returns:
-    str:  If NAICS is present in the 10th percentile, return "Yes". Otherwise, return "No".
+    template_file (str): The path to the template document.
+    profile_values (dict): The display values to render, as from build_profile_values.  Defaults to a sample value for every element, with a tab, a line break, and XML special characters in the first value.
+
+    Returns:
+    list: The differences, one message each.  An empty list means the 'ooxml' renderer can be used with this template.
     """
-    # Read into df the data source file that will be used to develop the percentiles from the  Dollars column
-    df = pd.read_csv(common_folders['cleansed_data_source_file'], usecols=['Contract No', 'NAICS', 'Size Status'])
-        
-    # Select the 'NAICS' value from the DataFrame based on the current contract number being processed
-    naics = df.loc[df['Contract No'] == contract_no, 'NAICS'].values[0]
-    
-    # makre sure naics is a string and only the first six digits are used
-    naics = str(naics)[:6]
-    
-    # Filter the DataFrame for rows where 'Size Status' is "SB"
-    filtered_df = df[df['Size Status'] == "SB"]
+    if profile_values is None:
+        profile_values = {
+            'Contract Details': {element: f'{element} sample' for element in contract_profile_data_elements.values()},
+            'SB Profile Analysis': {element: 'Yes' for element in sb_profile_analysis_elements.values()},
+        }
+        first_element = next(iter(profile_values['Contract Details']))
+        profile_values['Contract Details'][first_element] = 'A & B <Sample>\tTab\nLine "2"'
 
-    # Group by 'NAICS' and count the occurrences
-    naics_count_df = filtered_df.groupby('NAICS').size().reset_index(name='count')
-    
-    # Calculate the 10th percentile of the 'count' column
-    tenth_percentile = np.percentile(naics_count_df['count'], 10)
-    
-    # Filter the 'NAICS' values that fall within the 10th percentile
-    weak_naics = naics_count_df[naics_count_df['count'] <= tenth_percentile]['NAICS'].values
-    # print("Weak NAICS:", weak_naics)
-    # print("")
-    
-    if naics in weak_naics:
-        return "Yes"
-    else:
-        return "No"
+    with tempfile.TemporaryDirectory() as folder:
+        rendered = {}
+        for renderer in ['python-docx', 'ooxml']:
+            document_file = os.path.join(folder, f'{renderer}.docx')
+            profile_renderers[renderer](profile_values, template_file, document_file)
+            rendered[renderer] = read_document_tables(document_file)
+
+    expected, actual = rendered['python-docx'], rendered['ooxml']
+    if len(expected) != len(actual):
+        return [f"The documents have {len(expected)} (python-docx) and {len(actual)} (ooxml) tables"]
+
+    differences = []
+    for table_number, (expected_table, actual_table) in enumerate(zip(expected, actual), start=1):
+        for part in ['style', 'grid']:
+            if expected_table[part] != actual_table[part]:
+                differences.append(f"Table {table_number} {part}: python-docx {expected_table[part]}, ooxml {actual_table[part]}")
+        if len(expected_table['rows']) != len(actual_table['rows']):
+            differences.append(f"Table {table_number} rows: python-docx {len(expected_table['rows'])}, ooxml {len(actual_table['rows'])}")
+        for row_number, (expected_row, actual_row) in enumerate(zip(expected_table['rows'], actual_table['rows']), start=1):
+            if len(expected_row) != len(actual_row):
+                differences.append(f"Table {table_number} row {row_number} cells: python-docx {len(expected_row)}, ooxml {len(actual_row)}")
+            for cell_number, (expected_cell, actual_cell) in enumerate(zip(expected_row, actual_row), start=1):
+                for part, expected_value in expected_cell.items():
+                    if expected_value != actual_cell[part]:
+                        differences.append(f"Table {table_number} row {row_number} cell {cell_number} {part}: python-docx {expected_value!r}, ooxml {actual_cell[part]!r}")
 
-def check_weak_naics(df, contract_no) -> str:
+    return differences
+
+# This function is the unit of work for the worker processes.  It renders one profile and returns the error instead of raising it, so one bad contract does not abort the batch.
+def render_contract_profile_task(task: tuple) -> tuple:
     """
-    Check if the NAICS code value is one of the Top 30% of unique NAICS identified by the amount of SB Actions or SB Dollars.
+    Render one contract profile and capture any error.
 
     Args:
-    df (pd.DataFrame): The DataFrame containing the data to be processed.
-    contract_no (str): The contract number being processed.
+    task (tuple): (contract_no, profile_values, template_file, new_filepath, renderer), where renderer is a key of profile_renderers.
 
     Returns:
-    str:  If NAICS is present, return "Yes". Otherwise, return "No".
+    tuple: (contract_no, new_filepath, error message or None).
     """
-    
-    cleansed_file_df = pd.read_csv(common_folders['cleansed_data_source_file'], usecols=['NAICS', 'Size Status', 'SB Dollars'])
-    
-    # Select the 'NAICS' value from the DataFrame based on the current contract number being processed
-    naics = df.loc[df['Contract No'] == contract_no, 'NAICS'].values[0]
-    
-    # makre sure naics is a string and only the first six digits are used
-    naics = str(naics)[:6]
-    
-    # Idnentify the number of uniqe values in the 'NAICS' column by count !!MAY HAVE TO ALSO KEEP IT THE LAST 3 YEARS OF DATA!!
-    naics_count = cleansed_file_df['NAICS'].nunique()
-    # print("Number of unique NAICS values:", naics_count)
-    # print("")
-    
-    # Get the count for top 30% of NAICS based on SB Dollars or SB actions
-    weak_naics_count = int(naics_count * .3)
-    # print("Top 30% of NAICS count:", strong_naics_count)
-    # print("")
-    
-    # Make sure the 'SB Dollars' column is numeric from the DataFrame argument (NOT THE FULL RAW CLEANSED FILE).  This value will be used to compare against the percentiles from the cleansed_file_df.
-    # Ensure 'SB Dollars' column is string before removing currency formatting
-    cleansed_file_df['SB Dollars'] = cleansed_file_df['SB Dollars'].astype(str)
+    contract_no, profile_values, template_file, new_filepath, renderer = task
+    try:
+        profile_renderers[renderer](profile_values, template_file, new_filepath)
+        return (contract_no, new_filepath, None)
+    except Exception as error:
+        return (contract_no, new_filepath, f"{type(error).__name__}: {error}")
 
-    # Remove currency formatting from the SB Dollars column
-    cleansed_file_df['SB Dollars'] = cleansed_file_df['SB Dollars'].str.replace('$', '').str.replace(',', '')
+# This function renders the contract profiles for every target across a pool of worker processes.  Each worker produces its own .docx and errors are collected per document.
+def render_contract_profiles(df: pd.DataFrame, completed_folder: str, template_file: str, workers: int = None, max_rows: int = None, use_cache: bool = False, renderer: str = 'python-docx') -> dict:
+    """
+    Render a contract profile for every row of the targets DataFrame in parallel.
 
-    # Convert the SB Dollars column to numeric
-    cleansed_file_df['SB Dollars'] = pd.to_numeric(cleansed_file_df['SB Dollars'], errors='coerce')
-    
-    # Ensure the 'NAICS' column is of the same type as naics and only six digits are used
-    cleansed_file_df['NAICS'] = cleansed_file_df['NAICS'].astype(str).str[:6].astype(type(naics))
-    
-    # Filter the cleased_file_df based on the naics identified from the contract being processed and print the filtered result to check if it matches the expected rows
-    # filtered_df = cleansed_file_df.loc[(cleansed_file_df['NAICS'] == naics) & (cleansed_file_df['Size Status'] == "SB")]
-    filtered_df = cleansed_file_df.loc[(cleansed_file_df['Size Status'] == "SB")]
-    # print("Filtered DataFrame based on NAICS and Size Status:", filtered_df)
-    # print("")
-    
-    # Define the targeted NAICS values based on the top 30% of unique NAICS based on total SB Dollars
-    filtered_df = filtered_df.groupby('NAICS').agg({'SB Dollars': 'sum'}).reset_index()
-    filtered_df = filtered_df.sort_values(by=['SB Dollars'], ascending=True)
-    weak_naics_by_dollars = filtered_df['NAICS'].head(weak_naics_count).tolist()
-    # print("Top NAICS by SB Dollars:", strong_naics_by_dollars)
-    # print("")
-    
-    # Define the targeted NAICS values based on the top 30% of unique NAICS based on total SB Actions (determined by "Size Status" column).
-    filtered_df = cleansed_file_df.loc[(cleansed_file_df['Size Status'] == "SB")]
-    filtered_df = filtered_df.groupby('NAICS').agg({'Size Status': 'count'}).reset_index()
-    filtered_df = filtered_df.sort_values(by=['Size Status'], ascending=True)
-    weak_naics_by_actions = filtered_df['NAICS'].head(weak_naics_count).tolist()
-    # print("Top NAICS by SB Actions:", strong_naics_by_actions)
-    # print("")
-    
-    # top_naics = ['541611', '541512', '541330']
-    
-    # Check if the 'NAICS' value is in either top_naics_by_actions or top_naics_by_actions. If yes in either one, return "Yes". If not in either, return "No"
-    if naics in weak_naics_by_dollars or naics in weak_naics_by_actions:
-        return "Yes"
+    Filenames are deterministic: Target_<row number>_<Contract No>_<date>.docx, numbered by the row position in df.
+
+    On Windows the worker processes re-import the calling script, so the call must be inside an `if __name__ == '__main__':` block.
+
+    Args:
+    df (pd.DataFrame): The targets from run_profile_analysis.
+    completed_folder (str): The folder where the completed documents will be saved.
+    template_file (str): The path to the template document.
+    workers (int): The number of worker processes.  Defaults to the number of CPUs.  Use 1 to render in this process.
+    max_rows (int): Only render the first max_rows targets.  Defaults to all targets.
+    use_cache (bool): If True, a profile whose Profile Key, template, and values match what was last rendered for it is not rendered again.  Its last document is copied to this run's filename.
+    renderer (str): 'python-docx' or 'ooxml' (the fast direct XML renderer), see profile_renderers.  Check the template with compare_profile_renderers before using 'ooxml'.
+
+    Returns:
+    dict: {'completed': [file paths], 'errors': {file path: error message}, 'unchanged': [file paths], 'report': [one dict per profile with its 'Status' and the 'Changes' that caused it to be rendered]}.
+    """
+    if max_rows is not None:
+        df = df.head(max_rows)
+
+    use_cache = use_cache and 'Profile Key' in df.columns
+    profile_ids = profile_cache.profile_ids(df) if use_cache else None
+    # A profile is rendered again when the template, the renderer, or the renderer's code changes
+    template_version = renderer + ':' + file_signature(template_file, include_hash=True)[1] + ':' + profile_cache.code_version({profile_renderers[renderer].__name__: profile_renderers[renderer]}) if use_cache else None
+
+    # Build the task for every target.  The "/" in the Contract No is only replaced for the filename.
+    today_date = datetime.datetime.now().strftime('%Y-%m-%d')
+    tasks = []
+    unchanged = []
+    copies = []
+    report = []
+    task_profiles = {}
+    for position, (index, row) in enumerate(df.iterrows()):
+        file_contract_no = str(row["Contract No"]).replace('/', '_')
+        new_filepath = os.path.join(completed_folder, f'Target_{position+1}_{file_contract_no}_{today_date}.docx')
+        profile_values = build_profile_values(row, df.columns)
+
+        # Reuse the document when nothing it was rendered from has changed
+        changes = ['cache not used']
+        if use_cache:
+            profile_id = profile_ids.iloc[position]
+            entry = profile_cache.profiles.get(profile_id) or {}
+            rendered = entry.get('rendered')
+            if rendered is None:
+                changes = ['new contract']
+            else:
+                changes = list(entry.get('changes') or ['profile inputs']) if rendered['Profile Key'] != row['Profile Key'] else []
+                if rendered['template'] != template_version:
+                    changes.append('template')
+                if rendered['values'] != profile_values:
+                    changes.append('profile values')
+                if not os.path.exists(rendered['document']):
+                    changes.append('document missing')
+
+            if not changes:
+                copies.append((rendered, new_filepath))
+                unchanged.append(new_filepath)
+                report.append({'Contract No': row["Contract No"], 'Order No': row.get("Order No"), 'Document': new_filepath, 'Status': 'Unchanged', 'Changes': ''})
+                continue
+            task_profiles[new_filepath] = (profile_id, row['Profile Key'], profile_values)
+
+        report.append({'Contract No': row["Contract No"], 'Order No': row.get("Order No"), 'Document': new_filepath, 'Status': 'Rendered', 'Changes': ', '.join(changes)})
+        tasks.append((row["Contract No"], profile_values, template_file, new_filepath, renderer))
+
+    # Copy the unchanged documents to this run's filenames before anything is rendered.  The filenames are numbered by position, so a filename can be the last document of another unchanged profile (two orders of one contract that swapped places).  Those are copied to a staged file first and only moved into place after every last document has been read.
+    cached_documents = {rendered['document'] for rendered, new_filepath in copies}
+    staged_copies = []
+    for rendered, new_filepath in copies:
+        if rendered['document'] == new_filepath:
+            continue
+        if new_filepath in cached_documents:
+            shutil.copy2(rendered['document'], new_filepath + '.staged')
+            staged_copies.append(new_filepath)
+        else:
+            shutil.copy2(rendered['document'], new_filepath)
+        rendered['document'] = new_filepath
+    for new_filepath in staged_copies:
+        os.replace(new_filepath + '.staged', new_filepath)
+
+    workers = workers or os.cpu_count() or 1
+    results = {'completed': list(unchanged), 'errors': {}, 'unchanged': unchanged, 'report': report}
+
+    # Collect the result of each document and report progress as they finish
+    def collect(result):
+        contract_no, new_filepath, error = result
+        if error is None:
+            results['completed'].append(new_filepath)
+        else:
+            results['errors'][new_filepath] = error
+        # The completed list starts with the unchanged documents, which are not part of the tasks
+        done = len(results['completed']) - len(unchanged) + len(results['errors'])
+        print(f"[{done}/{len(tasks)}] {'Populated contract details saved to: ' + new_filepath if error is None else 'Failed ' + os.path.basename(new_filepath) + ': ' + error}")
+
+    if workers == 1 or len(tasks) <= 1:
+        for task in tasks:
+            collect(render_contract_profile_task(task))
     else:
-        return "No"    
-    
-    # if naics in top_naics:
-    #     return "Yes"
-    # else:
-    #     return "No"
-       
-# def check_forecast(df, contract_no) -> str:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+            for future in concurrent.futures.as_completed([executor.submit(render_contract_profile_task, task) for task in tasks]):
+                collect(future.result())
+
+    # Keep the completed files in target order
+    document_order = {entry['Document']: position for position, entry in enumerate(report)}
+    results['completed'].sort(key=document_order.get)
+
+    # Record what each rendered document was built from
+    if use_cache:
+        for new_filepath in results['completed']:
+            if new_filepath in task_profiles:
+                profile_id, profile_key, profile_values = task_profiles[new_filepath]
+                profile_cache.profiles.setdefault(profile_id, {})['rendered'] = {'Profile Key': profile_key, 'template': template_version, 'document': new_filepath, 'values': profile_values}
+        profile_cache.save()
+
+    return results
+
+# Bulk export.  Instead of (or as well as) one document per contract, every target's Contract Details and SB Profile Analysis values are written to one workbook or one HTML report for review.  Both are written one contract at a time from the same values the documents are rendered from, so they stay small in memory with thousands of contracts.
+# The widths of the export workbook columns that hold long text.  The other columns are 16 characters wide.
+profile_export_column_widths = {'Requirements Description': 60, 'Awardee': 36, 'Type Set Aside Description': 30, 'IT Keywords': 30, 'PCF Cabinet': 18, 'Remarks': 40}
+
+# Excel does not allow more text than this in one cell
+excel_max_cell_characters = 32767
+
+# This helper function gets the PCF cabinet link of a profile, which is only a link when the hyperlink listing has one for the contract.
+def profile_pcf_link(profile_values: dict) -> str:
     """
-    Check if the contract is a forecasted action.
+    Get the PCF cabinet link of a profile.
 
     Args:
-    df (pd.DataFrame): The DataFrame containing the data to be processed.
-    contract_no (str): The contract number being processed.
+    profile_values (dict): The display values from build_profile_values.
 
     Returns:
-    str: "Yes" if the contract is a forecasted action, "No" otherwise.
+    str: The link, or None if the contract has no PCF cabinet link.
     """
-    forecast = df.loc[df['Contract No'] == contract_no, 'Forecast'].values[0]
-    
-    if forecast == 1:
-        return "Yes"
-    else:
-        return "No"
+    link = profile_values['Contract Details'].get('PCF Cabinet', '')
+    return link if link.lower().startswith(('http://', 'https://')) else None
+
+# This function writes every target's profile values to one workbook, one contract per row.  The workbook is written with openpyxl's write-only mode, which streams the rows to the file instead of keeping the sheet in memory.
+def export_profiles_workbook(df: pd.DataFrame, export_file: str) -> str:
+    """
+    Export the contract profiles to an .xlsx workbook.
 
-def check_modification(df,contract_no) -> str:
-    '''
-    Check if the contract has a modification and get the most recent number identified by the award date.
-    
     Args:
-    df (pd.DataFrame): The DataFrame containing the data to be processed.
-    contract_no (str): The contract number being processed.
-    
+    df (pd.DataFrame): The targets from run_profile_analysis.
+    export_file (str): Where to save the workbook.
+
     Returns:
-    str: The most recent modification number.
-    '''
-    #Define the modifications file which will be the cleansed data source file
-    modification_df = pd.read_csv(common_folders['cleansed_data_source_file'], usecols=['Contract No', 'Modification No', 'Award Date', 'Contract Action Type'])
-    
-    # Select the 'Contract No' value from the DataFrame based on the current contract number being processed
-    contract_no = df.loc[df['Contract No'] == contract_no, 'Contract No'].values[0]
-    
-    # Filter the modifications_df based on the contract_no identified from the contract being processed where Contract Action Type is "MODIFICATION"
-    modification_df = modification_df.loc[(modification_df['Contract No'] == contract_no) & (modification_df['Contract Action Type'] == "MODIFICATION")]
-    
-    # Sort the modifications_df by 'Award Date' in descending order
-    modification_df = modification_df.sort_values(by='Award Date', ascending=False)
-    
-    # Get the most recent 'Modification Number' from the modifications_df
-    if modification_df.empty:
-        return "No Modifications"
-    else:
-        return modification_df['Modification No'].values[0]
-    
-def check_forecast(df, contract_no) -> str:
-        '''
-        Check if the contract is a forecasted action and return the VCE-PCF Cabinet Name.
-        
-        Args:
-        df (pd.DataFrame): The DataFrame containing the data to be processed.
-        contract_no (str): The contract number being processed.
-        
-        Returns:
-        str: The VCE-PCF Cabinet Name.
-        '''
-        # Define the forecast file which will be the cleansed data source file
-        forecast_df = pd.read_csv(common_folders['forecast_file'], usecols=['VCE-PCF Cabinet Name', 'FOLLOWON CONTRACT'])
-        
-        # Search the "FOLLOWON CONTRACT" column in the forecast_df for the contract_no identified from the contract being processed
-        forecast_df = forecast_df.loc[forecast_df['FOLLOWON CONTRACT'] == contract_no]
-        if contract_no in forecast_df['FOLLOWON CONTRACT'].values:
-            return str(forecast_df['VCE-PCF Cabinet Name'].values[0])
-        else:
-            return "No Forecast Identified"
-        
-def check_pcf_cabinet_link(df, contract_no) -> str:
-    '''
-    Check the file and determine if there is a link to the identified contract being processes.
-    
+    str: The path to the workbook.
+    """
+    columns = list(contract_profile_data_elements.values()) + list(sb_profile_analysis_elements.values()) + ['Remarks']
+    header_font = Font(name='Calibri', size=11, bold=True)
+    link_font = Font(name='Calibri', size=11, color='0563C1', underline='single')
+
+    workbook = openpyxl.Workbook(write_only=True)
+    worksheet = workbook.create_sheet('Contract Profiles')
+
+    # The sheet settings must be set before the first row is written
+    worksheet.freeze_panes = 'C2'
+    for position, column in enumerate(columns, start=1):
+        worksheet.column_dimensions[get_column_letter(position)].width = profile_export_column_widths.get(column, 16)
+    worksheet.auto_filter.ref = f"A1:{get_column_letter(len(columns))}{len(df) + 1}"
+
+    header_cells = []
+    for column in columns:
+        cell = WriteOnlyCell(worksheet, value=column)
+        cell.font = header_font
+        header_cells.append(cell)
+    worksheet.append(header_cells)
+
+    for index, row in df.iterrows():
+        profile_values = build_profile_values(row, df.columns)
+        values = {**profile_values['Contract Details'], **profile_values['SB Profile Analysis'], 'Remarks': ''}
+
+        # Characters XML does not allow are removed, the same as in the documents
+        cells = [ooxml_invalid_characters.sub('', values[column])[:excel_max_cell_characters] for column in columns]
+        link = profile_pcf_link(profile_values)
+        if link is not None:
+            cell = WriteOnlyCell(worksheet, value='PCF Cabinet')
+            cell.hyperlink = link
+            cell.font = link_font
+            cells[columns.index('PCF Cabinet')] = cell
+        worksheet.append(cells)
+
+    workbook.save(export_file)
+    print(f"Contract profiles for {len(df)} contracts exported to: {export_file}")
+
+    return export_file
+
+# The page layout of the HTML report.  The tables use the same layout and fonts as the documents.
+profile_report_head = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ font-family: Calibri, Arial, sans-serif; font-size: 11pt; margin: 1.5em; }}
+details {{ border-bottom: 1px solid #ccc; padding: 0.3em 0; }}
+summary {{ cursor: pointer; }}
+table {{ border-collapse: collapse; width: 100%; max-width: 60em; margin: 0.6em 0; font-size: 9pt; }}
+th, td {{ border: 1px solid #000; padding: 2px 5px; text-align: left; vertical-align: top; }}
+th {{ font-size: 11pt; text-align: center; }}
+#filter {{ width: 30em; padding: 0.3em; }}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+<p>{count} target contracts.  Generated {generated}.</p>
+<p><input id="filter" type="search" placeholder="Filter by contract, awardee, NAICS, or any value"> <button onclick="toggleAll(true)">Expand all</button> <button onclick="toggleAll(false)">Collapse all</button></p>
+"""
+
+profile_report_tail = """<script>
+var profiles = document.querySelectorAll('details.profile');
+document.getElementById('filter').addEventListener('input', function () {
+    var text = this.value.toLowerCase();
+    profiles.forEach(function (profile) { profile.hidden = text && profile.textContent.toLowerCase().indexOf(text) === -1; });
+});
+function toggleAll(open) { profiles.forEach(function (profile) { if (!profile.hidden) { profile.open = open; } }); }
+</script>
+</body>
+</html>
+"""
+
+# This helper function writes one profile table of the HTML report: a header row, then the elements and their values side by side, pairs_per_row pairs to a row.
+def profile_report_table(title: str, values: dict, pairs_per_row: int, links: dict = None, remarks: bool = False) -> str:
+    """
+    Build a Contract Details or Small Business Profile Analysis table of the HTML report.
+
     Args:
-    df (pd.DataFrame): The DataFrame containing the data to be processed.
-    contract_no (str): The contract number being processed.
-    
+    title (str): The header text.
+    values (dict): The display value of every element.
+    pairs_per_row (int): The number of element and value pairs in a row.
+    links (dict): The link of any element whose value is shown as a link.
+    remarks (bool): If True, a Remarks row with an empty merged cell is added at the end.
+
     Returns:
-    str: The hyperlink to the PCF Cabinet.
-    '''
-    # Define the file where hyperlinks are stored
-    hyperlink_df = pd.read_csv(common_folders['hyperlinks_file'], usecols= ['PCF Access', 'Contract', 'Order'])
-    
-    #Define Order No from argument df
-    order_no = df.loc[df['Contract No'] == contract_no, 'Order No'].values[0] 
-        
-    # Define the base URL for the PCF Cabinet
-    base_url = "https://pcf.army.mil/pcf/login.htm?t=1460636157811&cabinetName="
-
-    # Construct the full URL by appending the contract number to the base URL
-    # hyperlink = f"{base_url}{contract_no}"
-
-    # Check if order no is in the hyperlink_df['Order'] column. If a value exists, return the value from the PCF Access column from the hyperlink_df.  If no, check if contract_no is in the hyperlink_df['Contract"] column. If a value exists, return the value of PCF Access column from hyperlink_df.  Otherwise, return naics not found message.
-    if order_no in hyperlink_df['Order'].values:
-        return hyperlink_df.loc[hyperlink_df['Order'] == order_no, 'PCF Access'].values[0]
-        # return f"{base_url}{order_no}"
-    elif contract_no in hyperlink_df['Contract'].values:
-        return hyperlink_df.loc[hyperlink_df['Contract'] == contract_no, 'PCF Access'].values[0]
-        # return f"{base_url}{contract_no}"
-    else:
-        return f'No PCF cabinet link found'
-    
-  
-    return hyperlink
+    str: The <table> element.
+    """
+    links = links or {}
+    rows = [f'<tr><th colspan="{pairs_per_row * 2}">{html.escape(title)}</th></tr>']
+    elements = list(values.keys())
+    for i in range(0, len(elements), pairs_per_row):
+        cells = []
+        for element in elements[i:i + pairs_per_row]:
+            value = html.escape(values[element])
+            if element in links:
+                value = f'<a href="{html.escape(links[element])}" target="_blank" rel="noopener">{html.escape(element)}</a>'
+            cells.append(f'<td>{html.escape(element)}</td><td>{value}</td>')
+        cells += ['<td></td><td></td>'] * (pairs_per_row - len(cells))
+        rows.append('<tr>' + ''.join(cells) + '</tr>')
+
+    if remarks:
+        rows.append(f'<tr><td>Remarks</td><td colspan="{pairs_per_row * 2 - 1}"></td></tr>')
 
-def check_it_buy(df, contract_no) -> str:
+    return '<table>' + ''.join(rows) + '</table>'
+
+# This function writes every target's profile to one static HTML page.  Each contract is a collapsed section with its PCF cabinet link in the heading, and a filter box narrows the page to the matching contracts.
+def export_profiles_html(df: pd.DataFrame, export_file: str) -> str:
     """
-    Check the NAICS Description, PSC Description, OMB Level 1 and OMB Level 2 columns for certain combinations and keywords to determine if it is an IT buy.
+    Export the contract profiles to an HTML report.
 
     Args:
-    df (pd.DataFrame): The DataFrame containing the data to be processed.
-    contract_no (str): The contract number being processed.
+    df (pd.DataFrame): The targets from run_profile_analysis.
+    export_file (str): Where to save the report.
 
     Returns:
-    str: "Yes" if the NAICS description contains specific keywords, "No" otherwise.
+    str: The path to the report.
     """
-    # Define the IT Buy keywords
-    it_buy_keywords = ['IT', 'INFORMATION TECHNOLOGY', 'TECHNOLOGY', 'SOFTWARE', 'HARDWARE', 'COMPUTER', 'NETWORK', 'CYBERSECURITY', 'CLOUD', 'DATA', 'ANALYTICS', 'AI', 'ARTIFICIAL INTELLIGENCE', 'MACHINE LEARNING', 'ML', 'IOT', 'INTERNET OF THINGS', 'BLOCKCHAIN', 'CRYPTO', 'CRYPTOCURRENCY', 'DIGITAL', 'ELECTRONIC', 'TELECOMMUNICATIONS', 'TELECOMM', 'TELECOM', 'TELEPHONE', 'TELEPHONY', 'TELEPHONIC', 'TELEPHONICS']
-    
-    # Use columns 'NAICS', 'NAICS Description', 'PSC Decription', 'OMB Level 1', and 'OMB Level 2' to check for IT Buy keywords from df argument
-    naics_description = df.loc[df['Contract No'] == contract_no, 'NAICS Description'].values[0]
-    psc_description = df.loc[df['Contract No'] == contract_no, 'PSC Description'].values[0]
-    omb_level_1 = df.loc[df['Contract No'] == contract_no, 'OMB Level 1'].values[0]
-    omb_level_2 = df.loc[df['Contract No'] == contract_no, 'OMB Level 2'].values[0]
-    
-    # # Check if any of the IT Buy keywords are present in the 'NAICS Description', 'PSC Description', 'OMB Level 1', or 'OMB Level 2' columns
-    # if any(keyword in naics_description.upper() for keyword in it_buy_keywords) or any(keyword in psc_description.upper() for keyword in it_buy_keywords) or any(keyword in omb_level_1.upper() for keyword in it_buy_keywords) or any(keyword in omb_level_2.upper() for keyword in it_buy_keywords):
-    #     return "Yes"
-    # else:
-    #     return "No"
-    
-    # Create a regex pattern to match whole words only
-    pattern = r'\b(?:' + '|'.join(re.escape(keyword) for keyword in it_buy_keywords) + r')\b'
-    
-    # Check if any of the IT Buy keywords are present in the 'NAICS Description', 'PSC Description', 'OMB Level 1', or 'OMB Level 2' columns
-    if (re.search(pattern, naics_description, re.IGNORECASE) or
-        re.search(pattern, psc_description, re.IGNORECASE) or
-        re.search(pattern, omb_level_1, re.IGNORECASE) or
-        re.search(pattern, omb_level_2, re.IGNORECASE)):
-        return "Yes"
-    else:
-        return "No"
+    generated = datetime.datetime.now().strftime('%Y-%m-%d %H:%M')
+    with open(export_file, 'w', encoding='utf-8') as report:
+        report.write(profile_report_head.format(title='Contract Profiles', count=len(df), generated=generated))
+
+        for position, (index, row) in enumerate(df.iterrows(), start=1):
+            profile_values = build_profile_values(row, df.columns)
+            contract_details = profile_values['Contract Details']
+            link = profile_pcf_link(profile_values)
+            links = {'PCF Cabinet': link} if link is not None else {}
+
+            # The heading shows the contract, the awardee, and the expiration so the list can be scanned without opening the sections
+            heading = ' | '.join(html.escape(contract_details.get(element, '')) for element in ['Contract No', 'Order No', 'Awardee', 'NAICS', 'Expiration'])
+            if link is not None:
+                heading += f' | <a href="{html.escape(link)}" target="_blank" rel="noopener">PCF Cabinet</a>'
+
+            report.write(
+                f'<details class="profile" id="profile-{position}"><summary>{position}. {heading}</summary>'
+                + profile_report_table('Contract Details', contract_details, 2, links=links)
+                + profile_report_table('Small Business Profile Analysis', profile_values['SB Profile Analysis'], 3, remarks=True)
+                + '</details>\n'
+            )
+
+        report.write(profile_report_tail)
+
+    print(f"Contract profiles for {len(df)} contracts exported to: {export_file}")
 
-def check_socio_sole_source_eligible(df, contract_no) -> str:
+    return export_file
+
+# The bulk export formats of create_contract_profiles
+profile_exporters = {
+    'xlsx': export_profiles_workbook,
+    'html': export_profiles_html,
+}
+
+def analyze_target_contracts(use_cache: bool = True) -> pd.DataFrame:
     """
-    Check if the contract is eligible for sole source award based on the dollar value.
+    Compute the SB Profile Analysis for the insights_target1 contracts and save it to common_folders['profile_analysis_file'].
 
     Args:
-    df (pd.DataFrame): The DataFrame containing the data to be processed.
-    contract_no (str): The contract number being processed.
+    use_cache (bool): If True, the contracts that are unchanged since the last run reuse their values from the profile cache.  Pass False to analyze every contract again.
 
     Returns:
-    str: "Yes" if the contract is eligible for sole source award based on the $4M threshold for SDVOSB and $4.5M for all others, "No" otherwise.
+    pd.DataFrame: The targets with one column per SB Profile Analysis element.
     """
-    # Select the 'Socio-Economic Status' value from the DataFrame based on the current contract number being processed
-    sdvosb_sole_source_threshold = 4000000
-    all_others_sole_source_threshold = 4500000
-    
-    # create a list of all other sole source thresholds
-    all_eligible_sole_source_categories = ['8(a)', 'HUBZone', 'WOSB', 'EDWOSB', 'SDVOSB']
-    eligible_sole_sole_categories_above_sdvosb_threshold = ['8(a)', 'HUBZone', 'WOSB', 'EDWOSB']
-    eligible_sole_source_categories_above_sdvosb_not_wosb_naics_list = ['8(a)', 'HUBZone']
-    eligible_sole_sole_categories_not_on_wosb_naics_list = ['8(a)', 'HUBZone', 'SDVOSB']
-    
-    #Get dollar value from the 'SB Dollars' from df argument based on the contract_no being processed
-    sb_dollars = df.loc[df['Contract No'] == contract_no, 'SB Dollars'].values[0]
-    #Remove currency formatting from sb_dollars
-    sb_dollars = sb_dollars.replace('$', '').replace(',', '')
+    # Define the file to needed to create the dataframe (df)
+    insights_target1_file = os.path.join(common_folders['insights_target1_folder'], 'insights_target1.parquet')
     
-    # Convert the 'SB Dollars' value to numeric
-    sb_dollars = pd.to_numeric(sb_dollars, errors='coerce')    
-        
-    # # If the SB dollars less than sdvosb_sole_source_threshold AND the WOSB NAICS list is "Yes", return all_eligible_sole_source_categories as str
-    # if sb_dollars > all_others_sole_source_threshold:
-    #     return 'No'
-    # elif sb_dollars >= sdvosb_sole_source_threshold and check_wosb_naics(df, contract_no) == "No":
-    #     return ', '.join(eligible_sole_source_categories_above_sdvosb_not_wosb_naics_list)
-    # elif sb_dollars <= sdvosb_sole_source_threshold and check_wosb_naics(df, contract_no) == "No":
-    #     return ', '.join(eligible_sole_sole_categories_not_on_wosb_naics_list)
-    # elif sb_dollars >= sdvosb_sole_source_threshold and check_wosb_naics(df, contract_no) != "No":
-    #     return ', '.join(eligible_sole_sole_categories_above_sdvosb_threshold)
-    # elif sb_dollars <= sdvosb_sole_source_threshold and check_wosb_naics(df, contract_no) != "No":
-    #     return ', '.join(all_eligible_sole_source_categories)
+    # Select the insights_target1 file from the insights_target1_folder
+    df = read_interim_dataset(insights_target1_file)
 
-sb_profile_analysis_functions = {
-    "IT Buy" : check_it_buy, # Check NAICS desription to determine if it is an IT buy, search for specific keywords and return yes or no
-    # "Strong Competition" : check_strong_competition, # Get a sense of average number of offerors against this NAICS (use all army data source file)
-    "Size Standard" : check_size_standard,
-    "Top NAICS" : check_top_naics, #Top 25 NIACS either by SB Dollars or SB Actions
-    "Target NAICS" : check_targeted_naics, #NAICS identified by specific needs or objectives or rationales/logic
-    "WOSB Eligible" : check_wosb_naics, # Check if the NAICS code value is present in the Underrepresented WOSB NAICS listing
-    "Strong NAICS" : check_strong_naics, #Top 30% of NAICS based on SB Dollars or SB Actions
-    "Weak NAICS" : check_weak_naics, #10th percentile of SB Dollars or SB Actions
-    # "Socio SS Eligible" : check_socio_sole_source_eligible, # Check if the $ value is below the threshold ($4M SDVOSB, $4.5M all others)
-    "ACC RI Awards" : check_acc_ri_awards, #Awards that went to SB under the identified NAICS
-    "All ACC Awards" : check_all_acc_awards, #All awards made by ACC across the enterprise
-    "Awardee SB" : check_if_awardee_sb,
-    "Awardee Socio" : check_awardee_socioeconomic_status,
-    "NMR Waiver Available" : check_if_nmr_waiver_available, #Does an NMR waiver exist based on NAICS
-    "Financial Risk" : check_financial_risk, #Financial risk to industry based on distribution of SB awards under identified NAICS"
-    "Modification No" : check_modification, #Check if the contract is a modification and get the most recent number
-    "PCF Cabinet" : check_pcf_cabinet_link, #Provide link to PCF Cabinet and return a str or hyperlink
-    "Forecast No" : check_forecast # Identify the forecast solicitation/PANCOC number
-}   
-                          
-def create_contract_profiles():
+    # Compute every SB Profile Analysis element for all of the targets in one pass
+    return run_profile_analysis(df, use_cache=use_cache)
+
+def create_contract_profiles(workers: int = None, max_rows: int = None, use_saved_analysis: bool = False, renderer: str = 'python-docx', outputs: list = None, use_cache: bool = True) -> dict:
     """
     Populate the Contract Details tables based on the Contract Profile Data Elements dictionary.
 
     Args:
-    df (pd.DataFrame): The DataFrame containing the data to be processed.
-    template_path (str): The path to the template document.
-    completed_folder (str): The path to the folder where completed documents will be saved.
+    workers (int): The number of worker processes used to render the documents.  Defaults to the number of CPUs.
+    max_rows (int): Only render the first max_rows targets (for testing).  Defaults to all targets.
+    use_saved_analysis (bool): If True, render from the saved profile analysis file instead of recomputing the SB Profile Analysis.
+    renderer (str): 'python-docx' or 'ooxml' (the fast direct XML renderer), see profile_renderers.  Check the template with compare_profile_renderers before using 'ooxml'.
+    outputs (list): The outputs to write: 'docx' (one document per contract), 'xlsx' (one workbook with a row per contract), and 'html' (one report with a section per contract).  Defaults to ['docx'].
+    use_cache (bool): If True, the profiles that are unchanged since the last run are not analyzed or rendered again.  Pass False to analyze and render every profile.
 
     Returns:
-    None
+    dict: {'completed': [file paths], 'errors': {file path: error message}, 'unchanged': [file paths], 'report': [profile changes], 'exports': {output: file path}}.
     """
-    # Define the file to needed to create the dataframe (df)
-    insights_target1_file = find_latest_file(common_folders['insights_target1_folder'], '*.csv')
-    
-    # Select the insights_target1.csv file from the insights_target1_folder
-    df = pd.read_csv(insights_target1_file)
+    outputs = outputs or ['docx']
+    unknown_outputs = [output for output in outputs if output != 'docx' and output not in profile_exporters]
+    if unknown_outputs:
+        raise ValueError(f"Unknown contract profile outputs: {unknown_outputs}.  Use 'docx', 'xlsx', or 'html'.")
+
+    # Compute (or load) every SB Profile Analysis element for all of the targets.  The tables below only read the precomputed columns.
+    if use_saved_analysis:
+        df = read_interim_dataset(common_folders['profile_analysis_file'], schema=profile_analysis_schema)
+    else:
+        df = analyze_target_contracts(use_cache=use_cache)
      
     # Define the completed folder location
     completed_profiles = common_folders["completed_profiles_folder"]
@@ -1290,147 +5084,43 @@ def create_contract_profiles():
     if not os.path.exists(completed_profiles):
         os.makedirs(completed_profiles)
 
-    # Iterate over each row in the DataFrame
-    # Set the maximum number of rows to process for testing
-    max_rows = 10  
-    row_count = 0
+    run_recorder.set_rows(rows_in=len(df))
+    results = {'completed': [], 'errors': {}, 'unchanged': [], 'report': [], 'exports': {}}
 
-    for index, row in df.iterrows():
-        # Activate the following for testing see max row above
-        if row_count >= max_rows:
-            break
-
-        # Load the template document
-        template = Document(template_file)
-
-        # Create a copy of the template. !!!!!Eventually remove "Target row and date" from the filename and simply replace the file when the script is rerun.  This will ensure that every contract profile is updated quarterly with any new data that can be autopopulated.  Make sure it only updates the tables and not the entire document.
-        contract_no = row["Contract No"].replace('/', '_')
-        today_date = datetime.datetime.now().strftime('%Y-%m-%d')
-        new_filename = f'Target_{index+1}_{contract_no}_{today_date}.docx'
-        new_filepath = os.path.join(completed_profiles, new_filename)
-        template.save(new_filepath)
-
-        # Load the copied template document and start populating the contract details
-        doc = Document(new_filepath)
-
-        # Create a uniform table for the Contract Details information in the document with four columns
-        table1 = doc.add_table(rows=1, cols=4)
-        table1.style = 'Table Grid'
-        
-        # Remove the first (and only) row which was added by default.  This will be replaced by the header row.  This may break if libraries are updated so be aware.    
-        if len(table1.rows) > 1:
-            table1._tbl.remove(table1.rows[0]._tr)
-        
-        # Add a header row and merge cells and center align for the "Contract Details" header
-        hdr_cells = table1.rows[0].cells
-        hdr_cells[0].merge(hdr_cells[1]).merge(hdr_cells[2]).merge(hdr_cells[3])
-        hdr_cells[0].text = 'Contract Details'
-        hdr_cells[0].paragraphs[0].alignment = 1  # Center alignment
-        set_cell_font(hdr_cells[0], font_size=11, bold=True)
-        
-        # Populate the table with all values from contract_profile_data_elements based on the table1 structure defined above
-        values = list(contract_profile_data_elements.values())
-        for i in range(0, len(values), 2):
-            row_cells = table1.add_row().cells
-            row_cells[0].text = values[i]
-            if values[i] in sb_profile_analysis_functions:
-                row_cells[1].text = sb_profile_analysis_functions[values[i]](df, contract_no)
-            else:
-                row_cells[1].text = str(row[values[i]]) if values[i] in df.columns else 'Data Gap'
-            if i + 1 < len(values):
-                row_cells[2].text = values[i + 1]
-                if values[i + 1] in sb_profile_analysis_functions:
-                    row_cells[3].text = sb_profile_analysis_functions[values[i + 1]](df, contract_no)
-                else:
-                    row_cells[3].text = str(row[values[i + 1]]) if values[i + 1] in df.columns else 'Data Gap'
-            else:
-                row_cells[2].text = ''
-                row_cells[3].text = ''
-            for cell in row_cells:
-                set_cell_font(cell)
-        
-        # # Add a row titled "PCF Cabinet" in the first cell and the remaining 3 cells are merge and left blank
-        # row_cells = table1.add_row().cells
-        # row_cells[0].text = 'PCF Cabinet'
-        # row_cells[1].merge(row_cells[2]).merge(row_cells[3])
-        # row_cells[1].text = sb_profile_analysis_functions['PCF Cabinet'](df, contract_no)
-        # for cell in row_cells:
-        #     set_cell_font(cell)
-        
-        # # Add a row titled "Forecast No" in the first cell and the remaining 3 cells are merge and left blank    
-        # row_cells = table1.add_row().cells
-        # row_cells[0].text = 'Forecast No'
-        # row_cells[1].merge(row_cells[2]).merge(row_cells[3])
-        # row_cells[1].text = sb_profile_analysis_functions['Forecast No'](df, contract_no)
-        # for cell in row_cells:
-        #    set_cell_font(cell)
-                         
-        # Add a paragraph break to ensure the next table is not connected to the previous one
-        doc.add_paragraph()
-        
-        # Create a uniform table for the Small Business Profile Analysis information in the document with four columns
-        table2 = doc.add_table(rows=1, cols=6)
-        table2.style = 'Table Grid'
-
-        # Add a header row and merge cells and center align for the "Small Business Profile Analysis" header
-        hdr_cells = table2.rows[0].cells
-        hdr_cells[0].merge(hdr_cells[1]).merge(hdr_cells[2]).merge(hdr_cells[3].merge(hdr_cells[4]).merge(hdr_cells[5]))
-        hdr_cells[0].text = 'Small Business Profile Analysis'
-        hdr_cells[0].paragraphs[0].alignment = 1  # Center alignment
-        set_cell_font(hdr_cells[0], font_size=11, bold=True)
-
-        # Populate the table with all values from contract_profile_data_elements based on the table1 structure defined above.  Also, check to see if the specific value has a function to populate the cell.
-        values = list(sb_profile_analysis_elements.values())  
-        for i in range(0, len(values), 3): 
-            row_cells = table2.add_row().cells
-            row_cells[0].text = values[i]
-            # Check if the value has a function associated with it to populate the cell
-            if values[i] in sb_profile_analysis_functions:
-                row_cells[1].text = sb_profile_analysis_functions[values[i]](df, contract_no)
-            else:
-                row_cells[1].text = str(row[values[i]]) if values[i] in df.columns else ''
-            # Check if the value + 1 has a function associated with it to populate the cell
-            if i + 1 < len(values):
-                row_cells[2].text = values[i + 1]
-                if values[i + 1] in sb_profile_analysis_functions:
-                    row_cells[3].text = sb_profile_analysis_functions[values[i + 1]](df, contract_no)
-                else:
-                    row_cells[3].text = str(row[values[i + 1]]) if values[i + 1] in df.columns else ''
-            else:
-                row_cells[2].text = ''
-                row_cells[3].text = ''
-            # Check if the value +2 has a function associated with it to populate the cell
-            if i + 2 < len(values):
-                row_cells[4].text = values[i + 2]
-                if values[i + 2] in sb_profile_analysis_functions:
-                    row_cells[5].text = sb_profile_analysis_functions[values[i + 2]](df, contract_no)
-                else:
-                    row_cells[5].text = str(row[values[i + 2]]) if values[i + 2] in df.columns else ''
-            else:
-                row_cells[4].text = ''
-                row_cells[5].text = ''
-            for cell in row_cells:
-                set_cell_font(cell)
-        
-        # Add a final row titled "Remarks" in the first cell and the remaining 3 cells are mergec and left blank
-        row_cells = table2.add_row().cells
-        row_cells[0].text = 'Remarks'
-        row_cells[1].merge(row_cells[2]).merge(row_cells[3].merge(row_cells[4]).merge(row_cells[5]))
-        for cell in row_cells:
-            set_cell_font(cell)
-        
-        # Add a paragraph break to ensure the sections is not connected to the previous one
-        doc.add_paragraph()
-        
-        # Save the populated document
-        doc.save(new_filepath)
-        print(f"Populated contract details saved to: {new_filepath}")
+    # Render the documents across the worker processes.  With the cache, the profiles that are unchanged since the last run are not rendered again.
+    if 'docx' in outputs:
+        results.update(render_contract_profiles(df, completed_profiles, template_file, workers=workers, max_rows=max_rows, use_cache=use_cache, renderer=renderer))
+
+        # Report which profiles were rendered and why
+        report_file = os.path.join(completed_profiles, 'profile_changes.csv')
+        pd.DataFrame(results['report'], columns=['Contract No', 'Order No', 'Document', 'Status', 'Changes']).to_csv(report_file, index=False)
+        print(f"{len(results['unchanged'])} profiles are unchanged since the last run and were not rendered again.  The changed profiles and why they changed are listed in: {report_file}")
+
+    # Export every profile to one workbook or report from the same values
+    today_date = datetime.datetime.now().strftime('%Y-%m-%d')
+    for output in outputs:
+        if output in profile_exporters:
+            export_file = os.path.join(completed_profiles, f'contract_profiles_{today_date}.{output}')
+            results['exports'][output] = profile_exporters[output](df if max_rows is None else df.head(max_rows), export_file)
+
+    # The rows out are the documents rendered, or the profiles exported when no documents were asked for
+    profile_count = len(df) if max_rows is None else min(max_rows, len(df))
+    run_recorder.set_rows(rows_out=len(results['completed']) - len(results['unchanged']) if 'docx' in outputs else profile_count)
 
-        row_count += 1
     # Create a log of completed contracts and check the amount of documents compared to the amount of rows in the DataFrame
     log_file = os.path.join(completed_profiles, 'completed_profiles_log.txt')
     with open(log_file, 'a') as log:
-        log.write(f"Completed profiles on {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\nCompleted contracts location: {completed_profiles}\n\n")  
+        log.write(f"Completed profiles on {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\nCompleted contracts location: {completed_profiles}\n")
+        if 'docx' in outputs:
+            log.write(f"Completed {len(results['completed'])} of {profile_count} profiles\n")
+            log.write(f"Unchanged since the last run: {len(results['unchanged'])} profiles\n")
+        for output, export_file in results['exports'].items():
+            log.write(f"Exported all profiles to: {export_file}\n")
+        for new_filepath, error in results['errors'].items():
+            log.write(f"Failed {os.path.basename(new_filepath)}: {error}\n")
+        log.write("\n")
+
+    return results
 
 # def update_contract_profiles_tables():
     # TBD